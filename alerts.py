@@ -0,0 +1,494 @@
+"""Alert rules evaluated against the live bar stream.
+
+Users register rules on symbols:
+
+    engine = AlertEngine()
+    engine.add_rule('INFY', 'rsi_above', 70, owner='alice', cooldown=900)
+    engine.add_rule('INFY', 'near_support', 0.5)        # within 0.5% of support
+    engine.add_sink(QueueSink())
+    engine.attach(pipeline)                              # a ticks.TickPipeline
+
+Per-symbol state is kept in NumPy arrays indexed by a symbol -> row map
+(Wilder RSI, a 20-bar volume window, the last three candles, the nearest
+support/resistance levels), so a batch of bars from the pipeline updates
+every symbol in one vectorized pass. Rules are compiled per kind into
+arrays of (row, threshold) and each kind is one predicate over the rows
+that got a bar: the cost is a few array operations per batch however many
+symbol x rule pairs there are.
+
+A rule fires when its condition becomes true (not on every bar it stays
+true), at most once per `cooldown` seconds of bar time; a repeated or late
+bar for a symbol is ignored. Fired alerts go to the sinks: QueueSink for a
+consumer in the same process, WebhookSink to POST them as JSON.
+"""
+import itertools
+import json
+import queue
+import threading
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from levels import find_levels
+from patterns import NO_PATTERN, PATTERN_NAMES, PATTERNS, pattern_masks
+
+RSI_WINDOW = 14
+VOLUME_WINDOW = 20
+MAX_LEVELS = 8
+DEFAULT_COOLDOWN = 900   # seconds of bar time
+
+Rule = namedtuple('Rule', ['rule_id', 'symbol', 'kind', 'value', 'cooldown', 'owner'])
+Alert = namedtuple('Alert', ['rule_id', 'owner', 'symbol', 'kind', 'value', 'time', 'price', 'observed'])
+
+
+# ------ rule predicates ------
+#
+# Each takes the engine, the rows its rules are on and the rule thresholds,
+# and returns (fired, observed value) arrays aligned with the rules.
+
+def _rsi_above(state, rows, values):
+    """RSI crossed up through `value`"""
+    rsi = state.rsi[rows]
+    return (state.prev_rsi[rows] < values) & (rsi >= values), rsi
+
+
+def _rsi_below(state, rows, values):
+    """RSI crossed down through `value`"""
+    rsi = state.rsi[rows]
+    return (state.prev_rsi[rows] > values) & (rsi <= values), rsi
+
+
+def _volume_ratio(state, rows, values):
+    """Bar volume at least `value` times its 20-bar average"""
+    ratio = state.volume_ratio[rows]
+    return ratio >= values, ratio
+
+
+def _near_support(state, rows, values):
+    """Close within `value` percent above the nearest support"""
+    distance = state.support_pct[rows]
+    return distance <= values, distance
+
+
+def _near_resistance(state, rows, values):
+    """Close within `value` percent below the nearest resistance"""
+    distance = state.resistance_pct[rows]
+    return distance <= values, distance
+
+
+def _pattern(state, rows, values):
+    """Last bar completes pattern code `value` (0: any pattern)"""
+    codes = state.pattern[rows]
+    return np.where(values == NO_PATTERN, codes != NO_PATTERN, codes == values), codes
+
+
+PREDICATES = {
+    'rsi_above': _rsi_above,
+    'rsi_below': _rsi_below,
+    'volume_ratio': _volume_ratio,
+    'near_support': _near_support,
+    'near_resistance': _near_resistance,
+    'pattern': _pattern,
+}
+PATTERN_CODES = {name.lower(): code for code, name in PATTERN_NAMES.items()}
+
+
+def pattern_code(value):
+    """A pattern rule's value: a code, a name from patterns.PATTERNS, or None/'any'"""
+    if value is None or value == 'any':
+        return NO_PATTERN
+    if isinstance(value, str):
+        code = PATTERN_CODES.get(value.lower())
+        if code is None:
+            raise ValueError(f"Unknown pattern: {value}")
+        return code
+    if int(value) not in PATTERN_NAMES and int(value) != NO_PATTERN:
+        raise ValueError(f"Unknown pattern code: {value}")
+    return int(value)
+
+
+def describe(alert):
+    """One-line text of an alert"""
+    kind, value, observed = alert.kind, alert.value, alert.observed
+    if kind == 'rsi_above':
+        text = f"RSI crossed above {value:g} ({observed:.1f})"
+    elif kind == 'rsi_below':
+        text = f"RSI crossed below {value:g} ({observed:.1f})"
+    elif kind == 'volume_ratio':
+        text = f"Volume {observed:.1f}x its average (alert at {value:g}x)"
+    elif kind in ('near_support', 'near_resistance'):
+        text = f"{observed:.2f}% from {kind[5:]} (alert within {value:g}%)"
+    else:
+        text = f"{PATTERN_NAMES.get(int(observed), 'Pattern')} formed"
+    return f"{alert.symbol} @ ₹{alert.price:.2f}: {text}"
+
+
+class AlertEngine:
+    """Symbol state and compiled rules, evaluated per batch of bars"""
+
+    def __init__(self, timeframe='1m', capacity=64):
+        self.timeframe = timeframe
+        self.symbols = []
+        self._rows = {}        # symbol -> row
+        self._tokens = {}      # instrument_token -> row, for pipeline bars
+        self._rules = {}       # rule_id -> Rule
+        self._ids = itertools.count(1)
+        self._compiled = None
+        self.sinks = []
+        self.evaluations = 0   # symbol x rule checks so far
+        self.fired = 0
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+
+    # ------ symbol state ------
+    def _allocate(self, capacity):
+        n = len(self.symbols)
+        shapes = {
+            'count': ((), np.int64, 0), 'bar_time': ((), np.float64, -np.inf),
+            'prev_close': ((), np.float64, np.nan), 'close': ((), np.float64, np.nan),
+            'up': ((), np.float64, 0.0), 'down': ((), np.float64, 0.0),
+            'rsi': ((), np.float64, np.nan), 'prev_rsi': ((), np.float64, np.nan),
+            'volumes': ((VOLUME_WINDOW,), np.float64, 0.0), 'volume_ratio': ((), np.float64, np.nan),
+            'candles': ((3, 4), np.float64, np.nan), 'pattern': ((), np.int8, NO_PATTERN),
+            'levels': ((MAX_LEVELS,), np.float64, np.nan),
+            'support_pct': ((), np.float64, np.inf), 'resistance_pct': ((), np.float64, np.inf),
+        }
+        for name, (shape, dtype, fill) in shapes.items():
+            values = np.full((capacity,) + shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                values[:n] = old[:n]
+            setattr(self, name, values)
+
+    def _row(self, symbol):
+        row = self._rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == len(self.count):
+                self._allocate(2 * row)
+            self.symbols.append(symbol)
+            self._rows[symbol] = row
+        return row
+
+    def set_tokens(self, tokens):
+        """{symbol: instrument_token} so pipeline bars find their symbol"""
+        with self._lock:
+            for symbol, token in tokens.items():
+                self._tokens[token] = self._row(symbol)
+
+    def set_levels(self, symbol, prices):
+        """Support/resistance prices of a symbol (the strongest MAX_LEVELS are kept)"""
+        prices = np.sort(np.asarray(prices, dtype=np.float64)[:MAX_LEVELS])
+        with self._lock:
+            row = self._row(symbol)
+            self.levels[row] = np.nan
+            self.levels[row, :len(prices)] = prices
+            self._distances(np.array([row]))
+
+    def seed(self, symbol, df, levels=None):
+        """Start a symbol from its recent bars (OHLCV frame) without firing alerts
+
+        Levels default to levels.find_levels() of the frame.
+        """
+        if levels is None and len(df):
+            levels = find_levels(df)['price'].to_numpy()
+        with self._lock:
+            row = self._row(symbol)
+            history = df.iloc[:-1]
+            if len(history):
+                engine = IndicatorEngine.from_frame(history)
+                self.count[row] = len(history)
+                self.prev_close[row] = engine.rsi.prev_close
+                self.close[row] = engine.rsi.prev_close
+                self.up[row], self.down[row] = engine.rsi.up.state, engine.rsi.down.state
+                self.rsi[row] = engine.rsi.value
+                volume = history['Volume'].to_numpy(dtype=np.float64)[-VOLUME_WINDOW:]
+                self.volumes[row] = 0.0
+                self.volumes[row, (len(history) - len(volume) + np.arange(len(volume))) % VOLUME_WINDOW] = volume
+                candles = history[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=np.float64)[-3:]
+                self.candles[row] = np.nan
+                self.candles[row, 3 - len(candles):] = candles
+                self.bar_time[row] = _seconds(history.index[-1:])[0]
+        if levels is not None:
+            self.set_levels(symbol, np.asarray(levels)[:MAX_LEVELS])
+        if len(df):
+            last = df.iloc[-1:]
+            with self._lock:
+                self._update(np.array([row]), *(last[name].to_numpy(dtype=np.float64)
+                                                 for name in ('Open', 'High', 'Low', 'Close', 'Volume')),
+                             _seconds(last.index))
+
+    def _update(self, rows, o, h, l, c, v, t):
+        """Fold one bar into each of `rows` (unique)"""
+        count = self.count[rows] + 1
+        self.count[rows] = count
+        diff = np.where(count == 1, 0.0, c - self.prev_close[rows])
+        self.prev_close[rows] = c
+        self.close[rows] = c
+        self.bar_time[rows] = t
+
+        # Wilder smoothing, as indicators.RSI
+        alpha = 1.0 / RSI_WINDOW
+        gain, loss = np.maximum(diff, 0.0), np.maximum(-diff, 0.0)
+        up = np.where(count == 1, gain, self.up[rows] + alpha * (gain - self.up[rows]))
+        down = np.where(count == 1, loss, self.down[rows] + alpha * (loss - self.down[rows]))
+        self.up[rows], self.down[rows] = up, down
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+        self.prev_rsi[rows] = self.rsi[rows]
+        self.rsi[rows] = np.where(count >= RSI_WINDOW, rsi, np.nan)
+
+        # Volume against the mean of the last VOLUME_WINDOW bars (this one included)
+        self.volumes[rows, (count - 1) % VOLUME_WINDOW] = v
+        average = self.volumes[rows].mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.volume_ratio[rows] = np.where(count >= VOLUME_WINDOW, v / average, np.nan)
+
+        # Last three candles, flattened so the pattern masks' one- and two-bar
+        # shifts stay within a symbol at each third position
+        candles = self.candles[rows]
+        candles[:, :2] = candles[:, 1:]
+        candles[:, 2] = np.column_stack((o, h, l, c))
+        self.candles[rows] = candles
+        flat = candles.reshape(-1, 4)
+        masks = pattern_masks(flat[:, 0], flat[:, 1], flat[:, 2], flat[:, 3])
+        codes = np.zeros(len(rows), dtype=np.int8)
+        for code, _, _ in reversed(PATTERNS):
+            codes[masks[code][2::3]] = code
+        codes[count < 3] = NO_PATTERN
+        self.pattern[rows] = codes
+
+        self._distances(rows)
+
+    def _distances(self, rows):
+        """Percent from the close down to the nearest support and up to the nearest resistance"""
+        close = self.close[rows][:, None]
+        levels = self.levels[rows]
+        with np.errstate(invalid='ignore'):
+            support = np.where(levels <= close, levels, -np.inf).max(axis=1)
+            resistance = np.where(levels >= close, levels, np.inf).min(axis=1)
+            close = close[:, 0]
+            self.support_pct[rows] = np.where(np.isfinite(support), (close - support) / support * 100, np.inf)
+            self.resistance_pct[rows] = np.where(np.isfinite(resistance),
+                                                 (resistance - close) / close * 100, np.inf)
+
+    # ------ rules ------
+    def add_rule(self, symbol, kind, value=None, cooldown=DEFAULT_COOLDOWN, owner=None):
+        """Register a rule; returns its id"""
+        if kind not in PREDICATES:
+            raise ValueError(f"Unknown rule kind: {kind}")
+        value = pattern_code(value) if kind == 'pattern' else float(value)
+        with self._lock:
+            self._row(symbol)
+            rule = Rule(next(self._ids), symbol, kind, value, float(cooldown), owner)
+            self._rules[rule.rule_id] = rule
+            self._compiled = None
+        return rule.rule_id
+
+    def remove_rule(self, rule_id):
+        """Drop a rule; False if there was none with that id"""
+        with self._lock:
+            if self._rules.pop(rule_id, None) is None:
+                return False
+            self._compiled = None
+            return True
+
+    def rules(self, owner=None):
+        return [rule for rule in self._rules.values() if owner is None or rule.owner == owner]
+
+    def _compile(self):
+        """Rules as per-kind arrays, keeping the fire state of rules compiled before"""
+        old = self._compiled
+        rules = sorted(self._rules.values(), key=lambda rule: (rule.kind, rule.rule_id))
+        compiled = {
+            'rules': rules,
+            'rows': np.array([self._rows[rule.symbol] for rule in rules], dtype=np.int64),
+            'values': np.array([rule.value for rule in rules], dtype=np.float64),
+            'cooldown': np.array([rule.cooldown for rule in rules], dtype=np.float64),
+            'active': np.zeros(len(rules), dtype=bool),
+            'last_fired': np.full(len(rules), -np.inf),
+            'kinds': [],   # (predicate, start, end) over the rules sorted by kind
+        }
+        if old is not None:
+            state = {rule.rule_id: (old['active'][i], old['last_fired'][i])
+                     for i, rule in enumerate(old['rules'])}
+            for i, rule in enumerate(rules):
+                if rule.rule_id in state:
+                    compiled['active'][i], compiled['last_fired'][i] = state[rule.rule_id]
+        start = 0
+        for kind, group in itertools.groupby(rule.kind for rule in rules):
+            end = start + sum(1 for _ in group)
+            compiled['kinds'].append((PREDICATES[kind], start, end))
+            start = end
+        self._compiled = compiled
+        return compiled
+
+    # ------ evaluation ------
+    def on_bars(self, bars):
+        """Fold in a batch of ticks.Bar (other timeframes and unknown tokens are skipped)"""
+        rows, values = [], []
+        tokens, symbols = self._tokens, self._rows
+        for bar in bars:
+            if bar.timeframe != self.timeframe:
+                continue
+            row = tokens.get(bar.token)
+            if row is None:
+                row = symbols.get(bar.token)
+            if row is not None:
+                rows.append(row)
+                values.append(bar[2:])   # start, open, high, low, close, volume
+        if not rows:
+            return []
+        values = np.fromiter(itertools.chain.from_iterable(values), dtype=np.float64, count=6 * len(values))
+        return self.evaluate(np.array(rows, dtype=np.int64), values.reshape(-1, 6))
+
+    def __call__(self, bar):
+        """Single-bar subscriber form of on_bars"""
+        return self.on_bars([bar])
+
+    def evaluate(self, rows, bars):
+        """Fold in bars (rows x [start, open, high, low, close, volume]) and fire rules"""
+        alerts = []
+        with self._lock:
+            compiled = self._compiled if self._compiled is not None else self._compile()
+            # A symbol with several bars in the batch takes them one round at a time
+            while len(rows):
+                unique, first = np.unique(rows, return_index=True)
+                batch = bars[first]
+                # Repeated or late bars are dropped
+                fresh = batch[:, 0] > self.bar_time[unique]
+                if fresh.any():
+                    updated = unique[fresh]
+                    t, o, h, l, c, v = batch[fresh].T
+                    self._update(updated, o, h, l, c, v, t)
+                    alerts.extend(self._fire(compiled, updated))
+                rest = np.ones(len(rows), dtype=bool)
+                rest[first] = False
+                rows, bars = rows[rest], bars[rest]
+        for sink in self.sinks:
+            if alerts:
+                sink(alerts)
+        return alerts
+
+    def _fire(self, compiled, updated):
+        got_bar = np.zeros(len(self.count), dtype=bool)
+        got_bar[updated] = True
+        alerts = []
+        for predicate, start, end in compiled['kinds']:
+            rows = compiled['rows'][start:end]
+            selected = np.flatnonzero(got_bar[rows]) + start
+            if not len(selected):
+                continue
+            self.evaluations += len(selected)
+            rows = compiled['rows'][selected]
+            hit, observed = predicate(self, rows, compiled['values'][selected])
+            now = self.bar_time[rows]
+            fire = (hit & ~compiled['active'][selected]
+                    & (now - compiled['last_fired'][selected] >= compiled['cooldown'][selected]))
+            compiled['active'][selected] = hit
+            fire = np.flatnonzero(fire)
+            positions = selected[fire]
+            compiled['last_fired'][positions] = now[fire]
+            for position, t, price, value in zip(positions.tolist(), now[fire].tolist(),
+                                                 self.close[rows[fire]].tolist(), observed[fire].tolist()):
+                rule = compiled['rules'][position]
+                alerts.append(Alert(rule.rule_id, rule.owner, rule.symbol, rule.kind, rule.value,
+                                    t, price, value))
+        self.fired += len(alerts)
+        return alerts
+
+    # ------ delivery ------
+    def add_sink(self, sink):
+        """Call `sink(alerts)` with every non-empty batch of fired alerts"""
+        self.sinks.append(sink)
+        return sink
+
+    def attach(self, pipeline):
+        """Evaluate rules on the bars a ticks.TickPipeline completes"""
+        pipeline.subscribe_batch(self.on_bars)
+        return self
+
+
+def _seconds(index):
+    """Epoch seconds of a DatetimeIndex"""
+    return pd.DatetimeIndex(index).as_unit('ns').asi8 / 1e9
+
+
+def to_dict(alert):
+    """JSON-ready form of an alert, with its text"""
+    return {**alert._asdict(), 'message': describe(alert)}
+
+
+# ------ sinks ------
+
+class QueueSink:
+    """Bounded in-process queue of alerts; the oldest are dropped when it's full
+
+    A batch is appended under one lock, however many alerts fired.
+    """
+
+    def __init__(self, maxsize=10_000):
+        self.alerts = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._ready = threading.Condition()
+
+    def __call__(self, alerts):
+        with self._ready:
+            self.dropped += max(0, len(self.alerts) + len(alerts) - self.alerts.maxlen)
+            self.alerts.extend(alerts)
+            self._ready.notify_all()
+
+    def get(self, timeout=None):
+        """Next alert, waiting up to `timeout` seconds (None if none came)"""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self.alerts, timeout):
+                return None
+            return self.alerts.popleft()
+
+    def drain(self, timeout=0):
+        """Every queued alert, waiting up to `timeout` seconds for the first"""
+        with self._ready:
+            if timeout:
+                self._ready.wait_for(lambda: self.alerts, timeout)
+            alerts = list(self.alerts)
+            self.alerts.clear()
+            return alerts
+
+
+class WebhookSink:
+    """POST each batch of alerts as JSON to `url` from a background thread
+
+    Without a url it is a stub that keeps the last payloads in `sent`.
+    """
+
+    def __init__(self, url=None, timeout=5.0, keep=1000):
+        self.url = url
+        self.timeout = timeout
+        self.sent = deque(maxlen=keep)
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def __call__(self, alerts):
+        payload = json.dumps({'alerts': [to_dict(alert) for alert in alerts]})
+        if self.url is None:
+            self.sent.append(payload)
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+            self._thread.start()
+        self._queue.put(payload)
+
+    def _run(self):
+        import requests
+
+        while True:
+            payload = self._queue.get()
+            try:
+                requests.post(self.url, data=payload, timeout=self.timeout,
+                              headers={'Content-Type': 'application/json'}).raise_for_status()
+                self.sent.append(payload)
+            except requests.RequestException:
+                self.failed += 1
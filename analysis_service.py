@@ -0,0 +1,263 @@
+"""Shared analysis service: each (symbol, period, interval, indicators) computed once.
+
+The Flask backend runs one AnalysisService for every Streamlit session and
+process. A request for a key that is already published and fresh is served
+as is. A key being computed is waited on, so concurrent callers share one
+fetch and one indicator run. Otherwise the bars are fetched, the indicator
+columns computed, and the result is published as a versioned barstore
+directory (bars and indicators as .npy files):
+
+    GET /analysis?symbol=RELIANCE.NS&period=6mo&indicators=RSI,SMA_20
+        -> {"version": 3, "path": ".../RELIANCE.NS@6mo@1d@RSI+SMA_20/3", ...}
+    GET /analysis/wait?...&version=3       long-poll for version 4
+
+AnalysisClient, on the Streamlit side, opens the published directory with
+mmap. Every session and process on the host reads one copy through the
+page cache, and a session's own cost is close to rendering. Without
+CHART_SERVICE_URL, or when the service can't be reached, the client falls
+back to computing locally with barstore.get_series().
+
+Keys that callers have asked for recently are re-fetched every
+`refresh_interval` seconds by a thread started on the first request. A new
+version is published only when the bars changed (BarSeries.key() covers
+every value, so a forming bar updated in place counts), which wakes the
+long-polls.
+"""
+import os
+import shutil
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+from barstore import INDICATORS, BarSeries, get_series
+
+DEFAULT_TTL = float(os.environ.get('CHART_SERVICE_TTL', '60'))
+LONG_POLL_TIMEOUT = 25.0
+
+Publication = namedtuple('Publication', ['symbol', 'period', 'interval', 'indicators', 'version',
+                                         'path', 'rows', 'published_at'])
+
+
+def analysis_key(symbol, period='1mo', interval='1d', indicators=()):
+    """Normalized key: the indicator set is order-free"""
+    indicators = tuple(sorted(set(indicators)))
+    unknown = [name for name in indicators if name not in INDICATORS]
+    if unknown:
+        raise ValueError(f"Unknown indicators: {', '.join(unknown)}")
+    return (symbol, period, interval, indicators)
+
+
+class AnalysisService:
+    """Single-flight compute and mmap publication of analysed bar series"""
+
+    def __init__(self, root=None, loader=None, ttl=DEFAULT_TTL, refresh_interval=None, keep_idle=600.0):
+        self.root = root or os.environ.get(
+            'CHART_SERVICE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'chart', 'service'))
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval or ttl
+        self.keep_idle = keep_idle
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._published = {}   # key -> (Publication, data key, checked_at)
+        self._inflight = {}    # key -> Event set when its computation finishes
+        self._errors = {}      # key -> exception of the last failed computation
+        self._requested = {}   # key -> when a caller last asked for it
+        self._refresher = None
+        self.fetches = 0       # loader calls
+        self.served = 0        # requests answered without a computation of their own
+
+    def _path(self, key):
+        symbol, period, interval, indicators = key
+        safe = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in symbol)
+        return os.path.join(self.root, f"{safe}@{period}@{interval}@{'+'.join(indicators) or 'bars'}")
+
+    # ------ requests ------
+    def get(self, symbol, period='1mo', interval='1d', indicators=(), max_age=None):
+        """The current publication of a key, computing it if missing or older than `max_age`"""
+        key = analysis_key(symbol, period, interval, indicators)
+        max_age = self.ttl if max_age is None else max_age
+        self._start_refresher()
+        now = time.monotonic()
+        with self._lock:
+            self._requested[key] = now
+            published = self._published.get(key)
+            if published and now - published[2] < max_age:
+                self.served += 1
+                return published[0]
+            done = self._inflight.get(key)
+            owner = done is None
+            if owner:
+                done = self._inflight[key] = threading.Event()
+        if owner:
+            try:
+                self._compute(key)
+            except Exception as e:
+                # Callers get the last version if there is one
+                with self._lock:
+                    self._errors[key] = e
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                done.set()
+        else:
+            done.wait(timeout=60)
+        with self._lock:
+            if not owner:
+                self.served += 1
+            published = self._published.get(key)
+            error = self._errors.get(key)
+        if published is None:
+            raise error or LookupError(f"No analysis for {key}")
+        return published[0]
+
+    def wait(self, symbol, period='1mo', interval='1d', indicators=(), version=0,
+             timeout=LONG_POLL_TIMEOUT):
+        """Long-poll: the publication once its version is past `version` (None on timeout)"""
+        key = analysis_key(symbol, period, interval, indicators)
+        self._start_refresher()
+        with self._changed:
+            self._requested[key] = time.monotonic()
+
+            def newer():
+                return key in self._published and self._published[key][0].version > version
+
+            if not self._changed.wait_for(newer, timeout):
+                return None
+            return self._published[key][0]
+
+    # ------ computation ------
+    def _compute(self, key):
+        symbol, period, interval, indicators = key
+        loader = self.loader
+        if loader is None:
+            from data_cache import get_history as loader
+        series = BarSeries.from_frame(loader(symbol, period=period, interval=interval), symbol)
+        self.fetches += 1
+        with self._lock:
+            old = self._published.get(key)
+        if old is not None and old[1] == series.key():
+            # Same bars and values: the published files stay current
+            with self._lock:
+                self._published[key] = (old[0], old[1], time.monotonic())
+            return old[0]
+
+        version = old[0].version + 1 if old else 1
+        path = os.path.join(self._path(key), str(version))
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        series.save(tmp, indicators)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        publication = Publication(symbol, period, interval, list(indicators), version, path,
+                                  len(series), time.time())
+        with self._changed:
+            self._published[key] = (publication, series.key(), time.monotonic())
+            self._errors.pop(key, None)
+            self._changed.notify_all()
+        # Readers map the previous version until they ask again; the rest go
+        # (unlinking is safe on POSIX while a reader still maps the files)
+        for name in os.listdir(self._path(key)):
+            if name.isdigit() and int(name) not in (version, version - 1):
+                shutil.rmtree(os.path.join(self._path(key), name), ignore_errors=True)
+        return publication
+
+    def refresh(self):
+        """Re-fetch every key asked for in the last `keep_idle` seconds; forget the rest"""
+        now = time.monotonic()
+        with self._lock:
+            keys = [key for key, at in self._requested.items() if now - at <= self.keep_idle]
+            for key in list(self._requested):
+                if key not in keys:
+                    del self._requested[key]
+        for symbol, period, interval, indicators in keys:
+            try:
+                self.get(symbol, period, interval, indicators, max_age=0)
+            except LookupError:
+                # Never published and upstream down: the next request retries
+                pass
+
+    def _start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='analysis-refresh',
+                                               daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+
+# ------ Streamlit side ------
+
+class AnalysisClient:
+    """Analysed series from the service, opened with mmap; local computation as fallback"""
+
+    def __init__(self, url=None, timeout=10.0):
+        self.url = url if url is not None else os.environ.get('CHART_SERVICE_URL')
+        self.timeout = timeout
+        self.failures = 0
+        self._session = None
+        self._open = weakref.WeakValueDictionary()   # published path -> BarSeries
+        self._lock = threading.Lock()
+
+    def _get(self, route, params, timeout):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if self._session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+            self._session = session
+        response = self._session.get(f"{self.url}{route}", params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json() if response.status_code == 200 else None
+
+    def _load(self, path):
+        with self._lock:
+            series = self._open.get(path)
+            if series is None:
+                series = self._open[path] = BarSeries.load(path)
+            return series
+
+    def series(self, symbol, period='1mo', interval='1d', indicators=()):
+        """BarSeries with `indicators` already computed, shared by every session of the process"""
+        if self.url:
+            params = {'symbol': symbol, 'period': period, 'interval': interval,
+                      'indicators': ','.join(indicators)}
+            try:
+                return self._load(self._get('/analysis', params, self.timeout)['path'])
+            except Exception:
+                # Service down, or on another host than its files: compute here
+                self.failures += 1
+        return get_series(symbol, period=period, interval=interval)
+
+    def wait(self, symbol, period='1mo', interval='1d', indicators=(), version=0,
+             timeout=LONG_POLL_TIMEOUT):
+        """Long-poll the service for a version newer than `version`; None when nothing changed"""
+        params = {'symbol': symbol, 'period': period, 'interval': interval,
+                  'indicators': ','.join(indicators), 'version': version, 'timeout': timeout}
+        return self._get('/analysis/wait', params, timeout + self.timeout)
+
+
+_default_client = None
+
+
+def get_client():
+    """AnalysisClient shared by every Streamlit session in this process"""
+    global _default_client
+    if _default_client is None:
+        _default_client = AnalysisClient()
+    return _default_client
+
+
+def analysis_series(symbol, period='1mo', interval='1d', indicators=()):
+    """get_series() with the indicators computed once by the shared service"""
+    return get_client().series(symbol, period=period, interval=interval, indicators=indicators)
@@ -1,25 +1,118 @@
 from flask import Flask, request, jsonify
-from kite_api import get_ltp, buy_stock, get_portfolio
+from kite_api import (get_ltp, get_ltps, buy_stock, sell_stock, modify_order, cancel_order,
+                      get_orders, get_order, get_portfolio, get_analysis, wait_analysis, OrderError,
+                      add_alert_rule, get_alert_rules, remove_alert_rule, get_alerts)
 
 app = Flask(__name__)
 
-@app.route("/ltp")
+@app.route("/ltp", methods=["GET", "POST"])
 def ltp():
+    # Batch: GET /ltp?symbols=NSE:INFY,NSE:TCS or POST {"symbols": [...]}
+    if request.method == "POST":
+        symbols = (request.json or {}).get("symbols", [])
+    else:
+        symbols = [s for s in request.args.get("symbols", "").split(",") if s]
+    if symbols:
+        return jsonify({"ltp": get_ltps(symbols)})
+
     symbol = request.args.get("symbol", "NSE:INFY")
     price = get_ltp(symbol)
     return jsonify({"symbol": symbol, "ltp": price})
 
-@app.route("/buy", methods=["POST"])
-def buy():
-    data = request.json
+def _trade(action):
+    data = request.json or {}
     symbol = data.get("symbol", "NSE:INFY")
     qty = data.get("qty", 1)
-    result = buy_stock(symbol, qty)
-    return jsonify({"message": result})
+    try:
+        result, order = action(symbol, qty, data.get("order_type", "MARKET"), data.get("price"))
+    except OrderError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": result, "order": order.to_dict()})
+
+@app.route("/buy", methods=["POST"])
+def buy():
+    return _trade(buy_stock)
+
+@app.route("/sell", methods=["POST"])
+def sell():
+    return _trade(sell_stock)
+
+@app.route("/orders")
+def orders():
+    return jsonify(get_orders())
+
+@app.route("/orders/<order_id>", methods=["GET", "PUT", "DELETE"])
+def order(order_id):
+    # PUT {"qty": ..., "price": ...} modifies, DELETE cancels
+    try:
+        if request.method == "PUT":
+            data = request.json or {}
+            modify_order(order_id, data.get("qty"), data.get("price"))
+        elif request.method == "DELETE":
+            cancel_order(order_id)
+    except OrderError as e:
+        return jsonify({"error": str(e)}), 400
+    result = get_order(order_id)
+    if result is None:
+        return jsonify({"error": f"Unknown order {order_id}"}), 404
+    return jsonify(result)
 
 @app.route("/portfolio")
 def portfolio():
     return jsonify(get_portfolio())
 
+def _analysis_query():
+    args = request.args
+    return dict(symbol=args.get("symbol", ""), period=args.get("period"),
+                interval=args.get("interval"), indicators=args.get("indicators"))
+
+@app.route("/analysis")
+def analysis():
+    # GET /analysis?symbol=RELIANCE.NS&period=6mo&interval=1d&indicators=RSI,SMA_20
+    try:
+        return jsonify(get_analysis(**_analysis_query()))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+@app.route("/analysis/wait")
+def analysis_wait():
+    # Long-poll: same query plus version=N; 204 if nothing newer within timeout seconds
+    timeout = min(float(request.args.get("timeout", 25)), 60)
+    try:
+        result = wait_analysis(**_analysis_query(), version=int(request.args.get("version", 0)),
+                               timeout=timeout)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if result is None:
+        return "", 204
+    return jsonify(result)
+
+@app.route("/alerts/rules", methods=["GET", "POST"])
+def alert_rules():
+    # POST {"symbol": "NSE:INFY", "kind": "rsi_above", "value": 70, "cooldown": 900, "owner": "alice"}
+    if request.method == "POST":
+        data = request.json or {}
+        try:
+            rule = add_alert_rule(data.get("symbol", ""), data.get("kind", ""), data.get("value"),
+                                  data.get("cooldown"), data.get("owner"))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(rule), 201
+    return jsonify(get_alert_rules(request.args.get("owner")))
+
+@app.route("/alerts/rules/<int:rule_id>", methods=["DELETE"])
+def alert_rule(rule_id):
+    if not remove_alert_rule(rule_id):
+        return jsonify({"error": f"Unknown rule {rule_id}"}), 404
+    return "", 204
+
+@app.route("/alerts")
+def alerts():
+    # Drains fired alerts; ?timeout=N long-polls up to N seconds for the first
+    timeout = min(float(request.args.get("timeout", 0)), 60)
+    return jsonify(get_alerts(timeout))
+
 if __name__ == "__main__":
-    app.run(port=5000)
+    app.run(port=5000, threaded=True)
@@ -0,0 +1,217 @@
+"""Backtests of the dashboard's signal rules.
+
+Two rules, exactly as the pages apply them on the latest bar:
+
+- rsi: the Analysis tab's STRONG BUY (RSI below `rsi_buy` with Close above
+  its SMA) and STRONG SELL (RSI above `rsi_sell` with Close below the SMA)
+- sr: the Support/Resistance page's "Near Support" (buy) and "Near
+  Resistance" (sell), using the last confirmed swing low/high as the level
+  so the test only sees pivots that were known at the time
+
+Every parameter combination of one SMA window (or pivot width) is a row of a
+(combinations x bars) matrix. Signals, long/flat positions (forward-filled
+from the last buy or sell), equity, drawdown and trades are whole-matrix
+NumPy operations; symbols run in parallel on a process pool.
+"""
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from indicators import rsi_2d, sma_2d
+from levels import swing_pivots
+
+RSI_GRID = {
+    'rsi_buy': list(range(20, 41)),
+    'rsi_sell': list(range(60, 81)),
+    'sma_window': [10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60],
+}
+SR_GRID = {
+    'proximity': [p / 100 for p in np.arange(0.5, 5.01, 0.25)],
+    'order': [3, 5, 8, 13],
+}
+GRIDS = {'rsi': RSI_GRID, 'sr': SR_GRID}
+
+METRIC_COLUMNS = ['total_return', 'max_drawdown', 'trades', 'wins', 'hit_rate', 'exposure']
+
+BacktestResult = namedtuple('BacktestResult', 'results summary errors')
+
+
+def param_grid(grid):
+    """Every combination of a {param: values} grid as a frame"""
+    names = list(grid)
+    return pd.DataFrame(list(itertools.product(*(grid[n] for n in names))), columns=names)
+
+
+def hold(entries, exits):
+    """Long/flat positions: long from an entry until the next exit (exit wins ties)"""
+    bar = np.arange(entries.shape[-1])
+    last_entry = np.maximum.accumulate(np.where(entries & ~exits, bar, -1), axis=-1)
+    last_exit = np.maximum.accumulate(np.where(exits, bar, -1), axis=-1)
+    return (last_entry > last_exit).astype(np.int8)
+
+
+def rsi_positions(close, rsi, sma, rsi_buy, rsi_sell):
+    """Positions for each (rsi_buy, rsi_sell) pair over one SMA"""
+    bullish = close > sma
+    bearish = close < sma
+    buy = (rsi < np.asarray(rsi_buy)[:, None]) & bullish
+    sell = (rsi > np.asarray(rsi_sell)[:, None]) & bearish
+    return hold(buy, sell)
+
+
+def causal_levels(high, low, order):
+    """Last swing low/high per bar, known only `order` bars after the pivot"""
+    n = len(high)
+    highs, lows = swing_pivots(high, low, order)
+    support = np.full(n, np.nan)
+    resistance = np.full(n, np.nan)
+    support[lows + order] = low[lows]
+    resistance[highs + order] = high[highs]
+    return _ffill(support), _ffill(resistance)
+
+
+def _ffill(values):
+    """Carry the last non-NaN value forward (bar 0 is NaN until the first level)"""
+    bar = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(bar, out=bar)
+    return values[bar]
+
+
+def sr_positions(close, support, resistance, proximity):
+    """Positions for each proximity, with the page's check order (resistance first)"""
+    band = np.asarray(proximity)[:, None] * close
+    near_resistance = (resistance - close) < band
+    near_support = ~near_resistance & ((close - support) < band)
+    return hold(near_support, near_resistance)
+
+
+def evaluate(positions, close, cost=0.0):
+    """Metrics per row of a (combinations x bars) position matrix
+
+    A position decided on bar t's close earns the return of bar t + 1;
+    `cost` is charged per side as a fraction of the traded value.
+    """
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    returns = np.nan_to_num(returns)
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0))
+    strategy = np.zeros(positions.shape)
+    strategy[:, 1:] = positions[:, :-1] * returns[1:]
+    strategy -= cost * turnover
+    equity = np.cumprod(1 + strategy, axis=-1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=-1), 1.0)
+    drawdown = (1 - equity / peak).max(axis=-1)
+
+    # Trades: entries/exits alternate per row, so nonzero() pairs them in order
+    padded = np.diff(positions, axis=-1, prepend=0, append=0)
+    entry_row, entry_bar = np.nonzero(padded == 1)
+    _, exit_bar = np.nonzero(padded == -1)
+    exit_bar = np.minimum(exit_bar, len(close) - 1)
+    trade_return = close[exit_bar] / close[entry_bar] - 1 - 2 * cost
+    rows = len(positions)
+    trades = np.bincount(entry_row, minlength=rows)
+    wins = np.bincount(entry_row, weights=trade_return > 0, minlength=rows).astype(np.int64)
+    with np.errstate(invalid='ignore'):
+        hit_rate = wins / trades
+    return pd.DataFrame({
+        'total_return': equity[:, -1] - 1,
+        'max_drawdown': drawdown,
+        'trades': trades,
+        'wins': wins,
+        'hit_rate': hit_rate,
+        'exposure': positions.mean(axis=-1),
+    })
+
+
+def run_rsi(df, grid=RSI_GRID, cost=0.0, rsi_window=14):
+    """Metrics for every RSI/SMA combination on one symbol's bars"""
+    close = df['Close'].to_numpy(dtype=np.float64)
+    rsi = rsi_2d(close, rsi_window)
+    params = param_grid(grid)
+    frames = []
+    for window, group in params.groupby('sma_window', sort=False):
+        positions = rsi_positions(close, rsi, sma_2d(close, window),
+                                  group['rsi_buy'].to_numpy(), group['rsi_sell'].to_numpy())
+        frames.append(evaluate(positions, close, cost).set_axis(group.index))
+    return params.join(pd.concat(frames))
+
+
+def run_sr(df, grid=SR_GRID, cost=0.0):
+    """Metrics for every proximity/pivot-width combination on one symbol's bars"""
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    params = param_grid(grid)
+    frames = []
+    for order, group in params.groupby('order', sort=False):
+        support, resistance = causal_levels(high, low, order)
+        positions = sr_positions(close, support, resistance, group['proximity'].to_numpy())
+        frames.append(evaluate(positions, close, cost).set_axis(group.index))
+    return params.join(pd.concat(frames))
+
+
+RULES = {'rsi': run_rsi, 'sr': run_sr}
+
+
+def summarize(results, params):
+    """Combine per-symbol results into one row per parameter combination"""
+    grouped = results.groupby(params, sort=False)
+    summary = grouped.agg(
+        mean_return=('total_return', 'mean'),
+        median_return=('total_return', 'median'),
+        mean_drawdown=('max_drawdown', 'mean'),
+        worst_drawdown=('max_drawdown', 'max'),
+        trades=('trades', 'sum'),
+        wins=('wins', 'sum'),
+        exposure=('exposure', 'mean'),
+    )
+    summary['hit_rate'] = summary['wins'] / summary['trades'].where(summary['trades'] > 0)
+    return summary.sort_values('mean_return', ascending=False).reset_index()
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_root):
+    global _worker_cache
+    from data_cache import OHLCVCache
+
+    _worker_cache = OHLCVCache(root=cache_root)
+
+
+def _backtest_symbol(symbol, rule, grid, period, cost):
+    df = _worker_cache.history(symbol, period=period)
+    if df.empty:
+        raise ValueError('no data')
+    result = RULES[rule](df, grid, cost)
+    result.insert(0, 'symbol', symbol)
+    return result
+
+
+def backtest_universe(symbols, rule='rsi', grid=None, period='5y', cost=0.0,
+                      max_workers=None, cache_root=None):
+    """Sweep `grid` for `rule` over every symbol on a process pool
+
+    Returns per-symbol results, a per-combination summary and {symbol: error}.
+    """
+    from data_cache import get_cache
+
+    grid = grid or GRIDS[rule]
+    cache_root = cache_root or get_cache().root
+    frames, errors = [], {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(cache_root,)) as pool:
+        futures = {pool.submit(_backtest_symbol, symbol, rule, grid, period, cost): symbol
+                   for symbol in symbols}
+        for future in as_completed(futures):
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                errors[futures[future]] = str(e)
+    if not frames:
+        return BacktestResult(pd.DataFrame(), pd.DataFrame(), errors)
+    results = pd.concat(frames, ignore_index=True)
+    return BacktestResult(results, summarize(results, list(grid)), errors)
@@ -0,0 +1,304 @@
+"""Compact columnar bar series shared across Streamlit sessions.
+
+A BarSeries keeps the index as int64 UTC nanoseconds, OHLC as float32 and
+volume as int32 (int64 only when a bar's volume doesn't fit): 28 bytes a
+bar, against ~150 for the float64 frame with indicators each session used
+to keep. Indicator columns are computed on first access (in float64, stored
+as float32) and can be dropped again. Date-range views slice the parent's
+arrays without copying and take indicators from the parent, so a view never
+recomputes a warm-up window.
+
+The registry saves each series once and opens it read-only with mmap, so
+every session and worker process reading a symbol shares one copy of the
+bars through the page cache. A series can be saved with indicator columns
+too (see analysis_service.py); loading it maps them instead of recomputing.
+"""
+import json
+import os
+import shutil
+import threading
+import weakref
+import zlib
+
+import numpy as np
+import pandas as pd
+
+OHLC = ['Open', 'High', 'Low', 'Close']
+COLUMNS = OHLC + ['Volume']
+INT32_MAX = np.iinfo(np.int32).max
+
+
+# ------ lazy indicator columns ------
+#
+# Same formulas as indicators.compute_indicators; each one works from the
+# float64 close/volume so chained indicators (MACD, its signal) don't carry
+# float32 rounding into each other.
+
+def _close(series):
+    return pd.Series(series['Close'], dtype='float64')
+
+
+def _ema(close, span):
+    return close.ewm(span=span, min_periods=span, adjust=False).mean()
+
+
+def _rsi(series):
+    diff = _close(series).diff(1)
+    up = diff.where(diff > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    return np.where(down == 0, 100, 100 - 100 / (1 + up / down))
+
+
+def _macd(series):
+    close = _close(series)
+    return _ema(close, 12) - _ema(close, 26)
+
+
+def _macd_signal(series):
+    return _ema(_macd(series), 9)
+
+
+def _bollinger(series, sign):
+    close = _close(series)
+    return close.rolling(20).mean() + sign * 2 * close.rolling(20).std(ddof=0)
+
+
+INDICATORS = {
+    'RSI': _rsi,
+    'SMA_20': lambda s: _close(s).rolling(20).mean(),
+    'SMA_50': lambda s: _close(s).rolling(50).mean(),
+    'EMA_12': lambda s: _ema(_close(s), 12),
+    'EMA_26': lambda s: _ema(_close(s), 26),
+    'MACD': _macd,
+    'MACD_Signal': _macd_signal,
+    'MACD_Histogram': lambda s: _macd(s) - _macd_signal(s),
+    'BB_Upper': lambda s: _bollinger(s, 1),
+    'BB_Lower': lambda s: _bollinger(s, -1),
+    'BB_Middle': lambda s: _close(s).rolling(20).mean(),
+    'Volume_SMA': lambda s: pd.Series(s['Volume'], dtype='float64').rolling(20).mean(),
+    'Resistance': lambda s: pd.Series(s['High'], dtype='float64').rolling(20).max(),
+    'Support': lambda s: pd.Series(s['Low'], dtype='float64').rolling(20).min(),
+}
+
+
+class BarSeries:
+    """OHLCV bars as compact NumPy columns with lazy indicator columns
+
+    series = BarSeries.from_frame(hist, 'RELIANCE.NS')
+    series['RSI']                     # computed once, float32
+    series.between('2024-01-01', None).to_frame(['RSI'])
+    """
+
+    def __init__(self, index_ns, columns, tz=None, symbol=None, parent=None, offset=0):
+        self.index_ns = index_ns
+        self.columns = columns
+        self.tz = tz
+        self.symbol = symbol
+        self._parent = parent
+        self._offset = offset
+        self._indicators = {}
+        self._lock = threading.Lock()
+        self._key = None
+
+    @classmethod
+    def from_frame(cls, df, symbol=None):
+        index = pd.DatetimeIndex(df.index).as_unit('ns')
+        tz = str(index.tz) if index.tz is not None else None
+        index_ns = (index.tz_convert('UTC') if tz else index).asi8.copy()
+        columns = {name: df[name].to_numpy(dtype=np.float32) for name in OHLC}
+        volume = np.rint(np.nan_to_num(df['Volume'].to_numpy(dtype=np.float64)))
+        dtype = np.int32 if len(volume) == 0 or volume.max() <= INT32_MAX else np.int64
+        columns['Volume'] = volume.astype(dtype)
+        return cls(index_ns, columns, tz, symbol)
+
+    def __len__(self):
+        return len(self.index_ns)
+
+    def __contains__(self, name):
+        return name in self.columns or name in INDICATORS
+
+    def __getitem__(self, name):
+        if name in self.columns:
+            return self.columns[name]
+        if self._parent is not None:
+            return self._parent[name][self._offset:self._offset + len(self)]
+        values = self._indicators.get(name)
+        if values is None:
+            if name not in INDICATORS:
+                raise KeyError(name)
+            with self._lock:
+                values = self._indicators.get(name)
+                if values is None:
+                    values = np.asarray(INDICATORS[name](self), dtype=np.float32)
+                    self._indicators[name] = values
+        return values
+
+    @property
+    def index(self):
+        index = pd.DatetimeIndex(self.index_ns.view('M8[ns]'))
+        return index.tz_localize('UTC').tz_convert(self.tz) if self.tz else index
+
+    @property
+    def indicators(self):
+        """Names of the indicator columns computed so far"""
+        return list(self._indicators)
+
+    @property
+    def nbytes(self):
+        """Bytes held by this series (views report 0 for shared arrays)"""
+        if self._parent is not None:
+            return 0
+        arrays = [self.index_ns, *self.columns.values(), *self._indicators.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def key(self):
+        """Identity of the data: symbol, length, first/last timestamp and a CRC of the bars
+
+        The CRC covers every value, so a forming bar that changes in place
+        (same timestamp, new high/low/close/volume) gives a new key.
+        """
+        if self._key is None:
+            if len(self) == 0:
+                self._key = (self.symbol, 0)
+            else:
+                crc = zlib.crc32(np.ascontiguousarray(self.index_ns))
+                for name in COLUMNS:
+                    crc = zlib.crc32(np.ascontiguousarray(self.columns[name]), crc)
+                self._key = (self.symbol, len(self), int(self.index_ns[0]), int(self.index_ns[-1]), crc)
+        return self._key
+
+    def drop(self, *names):
+        """Free computed indicator columns (all of them if no names are given)"""
+        target = self if self._parent is None else self._parent
+        with target._lock:
+            for name in names or list(target._indicators):
+                target._indicators.pop(name, None)
+
+    def _position(self, when, side):
+        ts = pd.Timestamp(when)
+        if ts.tz is None and self.tz:
+            ts = ts.tz_localize(self.tz)
+        if ts.tz is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return int(np.searchsorted(self.index_ns, ts.as_unit('ns').value, side=side))
+
+    def between(self, start=None, end=None):
+        """Zero-copy view of the bars from `start` to `end` inclusive"""
+        lo = 0 if start is None else self._position(start, 'left')
+        hi = len(self) if end is None else self._position(end, 'right')
+        root = self if self._parent is None else self._parent
+        return BarSeries(self.index_ns[lo:hi],
+                         {name: values[lo:hi] for name, values in self.columns.items()},
+                         self.tz, self.symbol, parent=root, offset=self._offset + lo)
+
+    def tail(self, n):
+        """Zero-copy view of the last `n` bars"""
+        lo = max(len(self) - n, 0)
+        root = self if self._parent is None else self._parent
+        return BarSeries(self.index_ns[lo:],
+                         {name: values[lo:] for name, values in self.columns.items()},
+                         self.tz, self.symbol, parent=root, offset=self._offset + lo)
+
+    def to_frame(self, indicators=()):
+        """DataFrame of OHLCV plus the requested indicator columns"""
+        data = {name: self.columns[name] for name in COLUMNS}
+        data.update((name, self[name]) for name in indicators)
+        return pd.DataFrame(data, index=self.index)
+
+    # ------ storage ------
+    def save(self, path, indicators=()):
+        """Write the bars, and the named indicator columns, as one .npy file per column"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'index.npy'), self.index_ns)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), self.columns[name])
+        for name in indicators:
+            np.save(os.path.join(path, f"{name}.npy"), self[name])
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'symbol': self.symbol, 'tz': self.tz, 'rows': len(self),
+                       'indicators': list(indicators)}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a saved series; with mmap the columns are read-only views of the files"""
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        index_ns = np.load(os.path.join(path, 'index.npy'), mmap_mode=mode)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+                   for name in COLUMNS}
+        series = cls(index_ns, columns, meta['tz'], meta['symbol'])
+        # Saved indicators are served from the files instead of being recomputed
+        for name in meta.get('indicators', ()):
+            series._indicators[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        return series
+
+
+class SeriesRegistry:
+    """Process-wide (symbol, period, interval) -> BarSeries, backed by mmap files
+
+    Every caller gets the same BarSeries object while anyone holds it, so
+    sessions on one symbol share the bars and the computed indicators. A
+    series nobody references is released; the next get() maps it again.
+    """
+
+    def __init__(self, root=None, loader=None):
+        self.root = root or os.environ.get(
+            'CHART_BARS_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'chart', 'bars'))
+        self.loader = loader
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._open = weakref.WeakValueDictionary()
+
+    def _path(self, symbol, period, interval):
+        safe = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in symbol)
+        return os.path.join(self.root, f"{safe}@{period}@{interval}")
+
+    def get(self, symbol, period='1mo', interval='1d'):
+        """Current bars for `symbol`; the loader is asked for data on every call
+
+        The mapped series is reused while its key() matches the loaded bars,
+        which includes a forming bar updated in place.
+        """
+        loader = self.loader
+        if loader is None:
+            from data_cache import get_history as loader
+        df = loader(symbol, period=period, interval=interval)
+        fresh = BarSeries.from_frame(df, symbol)
+        path = self._path(symbol, period, interval)
+        with self._lock:
+            series = self._open.get(path)
+            if series is not None and series.key() == fresh.key():
+                return series
+            # One directory per version: sessions still mapping the old one keep it
+            version = os.path.join(path, '_'.join(map(str, fresh.key()[1:])))
+            if not os.path.exists(os.path.join(version, 'meta.json')):
+                tmp = version + '.tmp'
+                shutil.rmtree(tmp, ignore_errors=True)
+                fresh.save(tmp)
+                shutil.rmtree(version, ignore_errors=True)
+                os.replace(tmp, version)
+            for name in os.listdir(path):
+                old = os.path.join(path, name)
+                if old != version and not name.endswith('.tmp'):
+                    # Unlinking is safe on POSIX even while another session maps it
+                    shutil.rmtree(old, ignore_errors=True)
+            series = BarSeries.load(version)
+            self._open[path] = series
+            return series
+
+
+_default_registry = None
+
+
+def get_registry():
+    """Registry shared by every Streamlit session in this process"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = SeriesRegistry()
+    return _default_registry
+
+
+def get_series(symbol, period='1mo', interval='1d'):
+    """Shared BarSeries for `symbol`, the compact counterpart of get_history"""
+    return get_registry().get(symbol, period=period, interval=interval)
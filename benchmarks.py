@@ -0,0 +1,981 @@
+"""Micro-benchmarks for the analysis functions.
+
+Usage: python benchmarks.py [name ...] [--bars N] [--json PATH] [--baseline PATH]
+
+`suite` times every analysis function at 1k, 100k and 1M bars (or --bars);
+--json saves its results and --baseline compares them with a saved run.
+"""
+import json
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n, seed=42, start='2015-01-01', freq='min'):
+    """`n` consecutive GBM bars from the replay provider, on a plain `freq` grid"""
+    from providers import gbm_ohlcv
+
+    df = gbm_ohlcv(n, np.random.default_rng(seed), bars_per_year=252 * 375)
+    df.index = pd.date_range(start=start, periods=n, freq=freq)
+    return df
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    """Best wall-clock time of fn over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _legacy_identify_candlestick_patterns(df):
+    """The original per-row iloc loop, kept for comparison"""
+    patterns = []
+    for i in range(2, len(df)):
+        current = df.iloc[i]
+        prev = df.iloc[i-1]
+        if (prev['Close'] < prev['Open'] and
+            current['Close'] > current['Open'] and
+            current['Open'] < prev['Close'] and
+            current['Close'] > prev['Open']):
+            patterns.append((df.index[i], 'Bullish Engulfing', '🟢'))
+        elif (prev['Close'] > prev['Open'] and
+              current['Close'] < current['Open'] and
+              current['Open'] > prev['Close'] and
+              current['Close'] < prev['Open']):
+            patterns.append((df.index[i], 'Bearish Engulfing', '🔴'))
+        elif (current['Close'] > current['Open'] and
+              (current['Low'] - current['Open']) > 2 * (current['Close'] - current['Open'])):
+            patterns.append((df.index[i], 'Hammer (Bullish)', '🟢'))
+        elif (current['Close'] < current['Open'] and
+              (current['High'] - current['Open']) > 2 * (current['Open'] - current['Close'])):
+            patterns.append((df.index[i], 'Shooting Star (Bearish)', '🔴'))
+    return patterns
+
+
+def bench_patterns(bars=100_000):
+    from patterns import identify_candlestick_patterns
+
+    df = make_ohlcv(bars)
+    legacy = timed(_legacy_identify_candlestick_patterns, df, repeat=1)
+    fast = timed(identify_candlestick_patterns, df)
+    print(f"patterns      bars={bars:>9,}  loop={legacy:8.3f}s  "
+          f"vectorized={fast:8.4f}s  speedup={legacy / fast:,.0f}x")
+
+
+class _SlowSource:
+    """FakeSource with a fixed network round trip per call"""
+
+    def __init__(self, latency):
+        from data_cache import FakeSource
+
+        self.latency = latency
+        self.inner = FakeSource()
+
+    def history(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.inner.history(*args, **kwargs)
+
+
+HEADER_SYMBOLS = ['^NSEI', '^BSESN', '^NSEBANK', '^CNXIT',
+                  'RELIANCE.NS', 'TCS.NS', 'INFY.NS', 'HDFCBANK.NS', 'ICICIBANK.NS']
+
+
+def bench_header(bars=None, latency=0.15):
+    """Dashboard header (4 indices + 5 top stocks): serial loop vs batched fetch"""
+    from data_cache import OHLCVCache
+
+    def serial():
+        cache = OHLCVCache(root=tempfile.mkdtemp(), source=_SlowSource(latency))
+        for symbol in HEADER_SYMBOLS:
+            cache.history(symbol, period='2d')
+
+    def batched():
+        cache = OHLCVCache(root=tempfile.mkdtemp(), source=_SlowSource(latency))
+        cache.history_many(HEADER_SYMBOLS, period='2d')
+
+    warm_cache = OHLCVCache(root=tempfile.mkdtemp(), source=_SlowSource(latency))
+    warm_cache.history_many(HEADER_SYMBOLS, period='2d')
+
+    before = timed(serial, repeat=1)
+    after = timed(batched, repeat=1)
+    warm = timed(warm_cache.history_many, HEADER_SYMBOLS, period='2d')
+    print(f"header        symbols={len(HEADER_SYMBOLS)}  rtt={latency * 1000:.0f}ms  "
+          f"serial={before:.3f}s  batched={after:.3f}s  cached={warm:.4f}s")
+
+
+def bench_scan(bars=None, symbols=500):
+    """Full universe scan on cached daily data: one process vs the process pool"""
+    import os
+    from data_cache import OHLCVCache
+    from providers import ReplayProvider
+    import scanner
+
+    root = tempfile.mkdtemp()
+    universe = [f"SYM{i}.NS" for i in range(symbols)]
+    cache = OHLCVCache(root=root, source=ReplayProvider())
+    cache.history_many(universe, period='6mo', max_workers=16)
+    criteria = {'rsi_min': 30, 'rsi_max': 70, 'volume_multiplier': 1.5}
+
+    def single():
+        scanner._init_worker(root)
+        return scanner._scan_chunk(universe, criteria, '6mo')
+
+    def pooled():
+        # At least two workers, so the pool is measured even on one core
+        workers = max(2, os.cpu_count() or 1)
+        return list(scanner.scan_universe(universe, cache_root=root, max_workers=workers, **criteria))
+
+    one = timed(single, repeat=1)
+    # The first scan of a process starts the pool; later ones reuse it
+    cold = timed(pooled, repeat=1)
+    warm = timed(pooled)
+    found = sum(len(chunk.matches) for chunk in pooled())
+    assert found == len(single()[0])
+    small = timed(lambda: list(scanner.scan_universe(universe[:scanner.IN_PROCESS_MAX], cache_root=root,
+                                                     **criteria)))
+    print(f"scan          symbols={symbols}  cores={os.cpu_count()}  one_process={one:.3f}s  pool: first={cold:.3f}s "
+          f"reused={warm:.3f}s  {scanner.IN_PROCESS_MAX} in-process={small:.3f}s  matches={found}")
+
+
+def _ta_indicators(df):
+    """The original ta-based get_technical_indicators columns"""
+    import ta
+
+    out = pd.DataFrame(index=df.index)
+    out['RSI'] = ta.momentum.RSIIndicator(df['Close']).rsi()
+    out['SMA_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
+    out['SMA_50'] = ta.trend.SMAIndicator(df['Close'], window=50).sma_indicator()
+    out['EMA_12'] = ta.trend.EMAIndicator(df['Close'], window=12).ema_indicator()
+    out['EMA_26'] = ta.trend.EMAIndicator(df['Close'], window=26).ema_indicator()
+    macd = ta.trend.MACD(df['Close'])
+    out['MACD'] = macd.macd()
+    out['MACD_Signal'] = macd.macd_signal()
+    out['MACD_Histogram'] = macd.macd_diff()
+    bollinger = ta.volatility.BollingerBands(df['Close'])
+    out['BB_Upper'] = bollinger.bollinger_hband()
+    out['BB_Lower'] = bollinger.bollinger_lband()
+    out['BB_Middle'] = bollinger.bollinger_mavg()
+    out['Volume_SMA'] = ta.trend.SMAIndicator(df['Volume'], window=20).sma_indicator()
+    return out
+
+
+def bench_indicators(bars=100_000, new_bars=1000):
+    """Per-bar cost: full ta recompute vs IndicatorEngine.update; also checks they agree"""
+    from indicators import IndicatorEngine
+
+    df = make_ohlcv(bars + new_bars)
+    history, live = df.iloc[:bars], df.iloc[bars:]
+
+    expected = _ta_indicators(df).iloc[bars:]
+    engine = IndicatorEngine.from_frame(history)
+    rows = [engine.update(bar) for bar in live[['Close', 'Volume']].to_dict('records')]
+    got = pd.DataFrame(rows, index=live.index)[expected.columns]
+    # Relative error; Volume SMA is in the 1e5..1e6 range
+    error = np.nanmax(np.abs(got.values - expected.values) / np.maximum(np.abs(expected.values), 1))
+    assert (got.isna().values == expected.isna().values).all()
+    assert error < 1e-9, error
+
+    recompute = timed(_ta_indicators, df, repeat=1)
+    records = live[['Close', 'Volume']].to_dict('records')
+    engine = IndicatorEngine.from_frame(history)
+    incremental = timed(lambda: [engine.update(bar) for bar in records], repeat=1) / len(records)
+    print(f"indicators    bars={bars:>9,}  ta_recompute={recompute * 1000:8.2f}ms/bar  "
+          f"update={incremental * 1e6:6.1f}us/bar  max_rel_err={error:.1e}")
+
+
+def make_ticks(n, instruments=500, per_message=100, rate=2000, seed=7, start=1_700_000_000):
+    """KiteTicker-style messages: `n` ticks at `rate` ticks/s across `instruments`"""
+    from providers import synthetic_ticks
+
+    return synthetic_ticks(n, instruments, per_message, rate, seed=seed, start=start)
+
+
+def bench_ticks(bars=None, ticks=200_000, instruments=500):
+    """Replay-file ticks through queue, 1m/5m/15m aggregation and LiveSeries indicators"""
+    import os
+    from ticks import LiveSeries, ReplaySource, TickPipeline, record
+
+    path = os.path.join(tempfile.mkdtemp(), 'ticks.jsonl')
+    record(make_ticks(ticks, instruments), path)
+
+    def run():
+        pipeline = TickPipeline(maxsize=100)
+        live = LiveSeries()
+        pipeline.subscribe(live)
+        pipeline.run(ReplaySource(path))
+        return pipeline
+
+    elapsed = timed(run, repeat=1)
+    pipeline = run()
+
+    # Periodic flushes follow the exchange clock: the recorded ticks (far in
+    # the past) must give the same bars as one aggregator flushed only at the end
+    from ticks import BarAggregator
+    bars, reference = [], []
+    pipeline = TickPipeline(maxsize=100, flush_interval=0.05)
+    pipeline.subscribe(bars.append)
+    pipeline.run(ReplaySource(path))
+    aggregator = BarAggregator(on_bar=reference.append)
+    for message in ReplaySource(path):
+        aggregator.add_ticks(message)
+    aggregator.flush()
+    assert sorted(bars) == sorted(reference), "periodic flushes split bars"
+    print(f"ticks         ticks={ticks:,}  instruments={instruments}  "
+          f"{ticks / elapsed:,.0f} ticks/s  bars={len(bars):,}  late={pipeline.aggregator.late_ticks}")
+
+
+def _analysis_figure(hist, reduce):
+    """The Stock Analysis price figure: candles, SMA 20/50, Bollinger Bands"""
+    import plotly.graph_objects as go
+    from downsample import chart_frame, chart_line
+
+    candles = chart_frame(hist) if reduce else hist
+    fig = go.Figure(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'],
+                                   low=candles['Low'], close=candles['Close']))
+    for column in ['SMA_20', 'SMA_50', 'BB_Upper', 'BB_Lower']:
+        series = chart_line(hist[column]) if reduce else hist[column]
+        fig.add_trace(go.Scatter(x=series.index, y=series, name=column))
+    return fig
+
+
+def bench_figure(bars=100_000):
+    """Serialized Plotly figure size and build time, full data vs downsampled"""
+    from indicators import compute_indicators
+
+    hist = make_ohlcv(bars)
+    hist = hist.join(compute_indicators(hist))
+
+    full = _analysis_figure(hist, reduce=False)
+    reduced = _analysis_figure(hist, reduce=True)
+    candles = reduced.data[0]
+    assert max(candles.high) == hist['High'].max() and min(candles.low) == hist['Low'].min()
+
+    full_size, reduced_size = len(full.to_json()), len(reduced.to_json())
+    full_time = timed(lambda: _analysis_figure(hist, False).to_json(), repeat=1)
+    reduced_time = timed(lambda: _analysis_figure(hist, True).to_json(), repeat=1)
+    print(f"figure        bars={bars:>9,}  full={full_size / 1e6:7.2f}MB/{full_time:.2f}s  "
+          f"downsampled={reduced_size / 1e6:5.2f}MB/{reduced_time:.3f}s  "
+          f"({full_size / reduced_size:.0f}x smaller)")
+
+
+def _legacy_volume_profile(df):
+    """The original 19-mask loop, kept for comparison"""
+    price_bins = np.linspace(df['Low'].min(), df['High'].max(), 20)
+    volume_profile = []
+    for i in range(len(price_bins)-1):
+        volume_in_range = df[(df['Close'] >= price_bins[i]) & (df['Close'] < price_bins[i+1])]['Volume'].sum()
+        volume_profile.append({'price': (price_bins[i] + price_bins[i+1])/2, 'volume': volume_in_range})
+    return pd.DataFrame(volume_profile)
+
+
+def bench_profile(bars=1_000_000):
+    """Volume profile: mask loop vs histogram, plus High-Low distribution at 100 bins"""
+    from volume_profile import calculate_volume_profile
+
+    df = make_ohlcv(bars)
+    legacy = timed(_legacy_volume_profile, df, repeat=1)
+    close = timed(calculate_volume_profile, df, bins=19)
+    spread = timed(calculate_volume_profile, df, bins=100, distribute=True)
+    print(f"profile       bars={bars:>9,}  loop={legacy:.3f}s  histogram={close:.3f}s  "
+          f"distributed(100 bins)={spread:.3f}s")
+
+
+def bench_memo(bars=20_000):
+    """Tab switch cost: rebuilding figures/patterns/profile vs memoized lookups"""
+    import memo
+    from indicators import compute_indicators
+    from patterns import identify_candlestick_patterns
+    from volume_profile import calculate_volume_profile
+
+    hist = make_ohlcv(bars)
+    hist = hist.join(compute_indicators(hist))
+
+    def pages():
+        key = memo.fingerprint(hist, 'RELIANCE.NS')
+        memo.memoize('analysis_figure', key, lambda: _analysis_figure(hist, reduce=True))
+        memo.memoize('patterns', key, lambda: identify_candlestick_patterns(hist))
+        memo.memoize('volume_profile', key + (20, True),
+                     lambda: calculate_volume_profile(hist, bins=20, distribute=True))
+
+    memo.cache.clear()
+    cold = timed(pages, repeat=1)
+    warm = timed(pages)
+    stats = memo.cache.stats()
+    print(f"memo          bars={bars:>9,}  rebuild={cold * 1000:.1f}ms  cached={warm * 1000:.3f}ms  "
+          f"hits={stats['hits']} misses={stats['misses']} size={stats['bytes'] / 1e6:.2f}MB")
+
+
+def bench_levels(bars=1_000_000, new_bars=1000):
+    """Pivot levels: full pass over years of minute bars, then per-bar tracker updates"""
+    from levels import LevelTracker, find_levels, swing_pivots
+
+    df = make_ohlcv(bars)
+    full = timed(find_levels, df, repeat=1)
+
+    # Pivot pass agrees with a plain loop over a slice
+    h, l = df['High'].to_numpy()[:5000], df['Low'].to_numpy()[:5000]
+    loop = [i for i in range(5, len(h) - 5) if h[i] > h[i - 5:i].max() and h[i] >= h[i + 1:i + 6].max()]
+    assert list(swing_pivots(h, l, 5)[0]) == loop
+
+    base = df.iloc[:-new_bars]
+    tracker = LevelTracker.from_frame(base)
+    tail = df.iloc[-new_bars:]
+
+    def updates():
+        for high, low in zip(tail['High'].to_numpy(), tail['Low'].to_numpy()):
+            tracker.update(high, low)
+
+    update = timed(updates, repeat=1) / new_bars
+    # Every pivot of the full pass was counted by the tracker too
+    assert tracker.levels()['touches'].sum() == find_levels(df)['touches'].sum()
+    print(f"levels        bars={bars:>9,}  full={full:.3f}s  update={update * 1e6:.1f}us/bar  "
+          f"levels={len(tracker.levels())}")
+
+
+def bench_backtest(bars=1250, symbols=50):
+    """RSI/SMA grid (4,851 combinations) over a universe of cached daily bars"""
+    from data_cache import OHLCVCache
+    from providers import ReplayProvider
+    import backtest
+
+    root = tempfile.mkdtemp()
+    universe = [f"SYM{i}.NS" for i in range(symbols)]
+    OHLCVCache(root=root, source=ReplayProvider()).history_many(universe, period='5y', max_workers=16)
+    combos = len(backtest.param_grid(backtest.RSI_GRID))
+
+    # Array replay agrees with a per-bar loop for one combination
+    df = make_ohlcv(bars, freq='D')
+    close = df['Close'].to_numpy()
+    rsi, sma = backtest.rsi_2d(close), backtest.sma_2d(close, 10)
+    position, equity = 0, 1.0
+    for t in range(1, len(close)):
+        equity *= 1 + position * (close[t] / close[t - 1] - 1)
+        if rsi[t] > 55 and close[t] < sma[t]:
+            position = 0
+        elif rsi[t] < 45 and close[t] > sma[t]:
+            position = 1
+    row = backtest.run_rsi(df, {'rsi_buy': [45], 'rsi_sell': [55], 'sma_window': [10]}).iloc[0]
+    assert abs(row['total_return'] - (equity - 1)) < 1e-9
+
+    one = timed(backtest.run_rsi, df, repeat=1)
+    result = None
+
+    def sweep():
+        nonlocal result
+        result = backtest.backtest_universe(universe, cache_root=root)
+
+    pool = timed(sweep, repeat=1)
+    best = result.summary.iloc[0]
+    print(f"backtest      symbols={symbols} combos={combos:,}  one_symbol={one:.2f}s  universe={pool:.1f}s  "
+          f"best=({best['rsi_buy']:.0f}, {best['rsi_sell']:.0f}, {best['sma_window']:.0f}) "
+          f"mean_return={best['mean_return']:.1%}")
+
+
+def bench_barstore(bars=100_000, sessions=20):
+    """Memory held by `sessions` sessions on one symbol: float64 frames vs shared BarSeries"""
+    import tracemalloc
+    from barstore import SeriesRegistry
+    from indicators import compute_indicators
+
+    df = make_ohlcv(bars)
+
+    def old_session():
+        # What each session used to keep in st.session_state.stock_data
+        hist = df.copy()
+        for name, values in compute_indicators(hist).items():
+            hist[name] = values
+        hist['Resistance'] = hist['High'].rolling(20).max()
+        hist['Support'] = hist['Low'].rolling(20).min()
+        return hist
+
+    registry = SeriesRegistry(tempfile.mkdtemp(), loader=lambda symbol, period, interval: df)
+    columns = ['RSI', 'SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal', 'MACD_Histogram',
+               'BB_Upper', 'BB_Lower', 'BB_Middle', 'Volume_SMA', 'Support', 'Resistance']
+
+    def new_session():
+        series = registry.get('RELIANCE.NS', '1y', '1m')
+        for name in columns:
+            series[name]
+        return series
+
+    def held(make):
+        tracemalloc.start()
+        kept = [make() for _ in range(sessions)]
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return current, kept
+
+    old, frames = held(old_session)
+    new, series = held(new_session)
+    per_bar_old = frames[0].memory_usage().sum() / bars
+    per_bar_new = series[0].nbytes / bars
+    per_bar_bars = (series[0].index_ns.nbytes + sum(a.nbytes for a in series[0].columns.values())) / bars
+    view = series[0].between(series[0].index[bars // 2], None)
+    assert np.shares_memory(view['Close'], series[0]['Close'])
+    print(f"barstore      bars={bars:>9,}  frame={per_bar_old:.0f}B/bar  series={per_bar_bars:.0f}B/bar "
+          f"({per_bar_new:.0f} with indicators)  "
+          f"{sessions} sessions: {old / 1e6:.1f}MB -> {new / 1e6:.1f}MB")
+
+
+def bench_orders(bars=None, orders=2000, limited=30):
+    """Order gateway on the simulated exchange: raw throughput, Kite rate limit, limit fills"""
+    import asyncio
+    from orders import BUY, LIMIT, SELL, OrderGateway, SimulatedExchange
+
+    messages = make_ticks(50_000, instruments=50)
+    symbols = {token: f"NSE:SYM{token}" for token in range(50)}
+
+    async def place_all(gateway, count, **kwargs):
+        await gateway.start()
+        latencies = []
+
+        async def one(i):
+            start = time.perf_counter()
+            await gateway.place(symbols[i % 50], BUY if i % 2 else SELL, 1, **kwargs)
+            latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        elapsed = time.perf_counter() - started
+        await gateway.stop()
+        return elapsed, np.array(latencies) * 1000
+
+    # Unthrottled: what the gateway itself can push
+    def seeded(**kwargs):
+        exchange = SimulatedExchange(instruments=symbols, **kwargs)
+        for message in messages[:10]:
+            exchange.on_ticks(message)
+        return exchange
+
+    exchange = seeded()
+    gateway = OrderGateway(exchange, limits=[])
+    elapsed, ms = asyncio.run(place_all(gateway, orders))
+    print(f"orders        unthrottled  {orders / elapsed:,.0f} orders/s  "
+          f"p50={np.percentile(ms, 50):.2f}ms  p99={np.percentile(ms, 99):.2f}ms")
+
+    # Kite limits with a 20ms broker round trip: no second may exceed 10 orders
+    exchange = seeded(latency=0.02)
+    gateway = OrderGateway(exchange)
+    elapsed, ms = asyncio.run(place_all(gateway, limited))
+    sent = np.sort([fill[5] for fill in exchange.fills])
+    busiest = max(np.searchsorted(sent, t + 1.0) - i for i, t in enumerate(sent))
+    assert busiest <= 10, busiest
+    print(f"orders        kite limits  {limited} orders in {elapsed:.2f}s  busiest second={busiest}  "
+          f"p99={np.percentile(ms, 99):.0f}ms")
+
+    # Resting limit orders filled by replayed quotes
+    exchange = seeded()
+    gateway = OrderGateway(exchange, limits=[])
+
+    async def rest():
+        await gateway.start()
+        for token, symbol in symbols.items():
+            price = round(exchange.last[symbol] * 0.9997, 2)
+            await gateway.place(symbol, BUY, 1, order_type=LIMIT, price=price)
+        await gateway.stop()
+
+    asyncio.run(rest())
+    replay = timed(lambda: [exchange.on_ticks(message) for message in messages[10:]], repeat=1)
+    filled = sum(order.status == 'COMPLETE' for order in gateway.orders.values())
+    print(f"orders        replay       {sum(map(len, messages[10:])):,} ticks in {replay:.2f}s  "
+          f"limit fills={filled}/{len(symbols)}")
+
+
+def bench_portfolio(bars=None, positions=5000, ticks=200_000):
+    """Mark-to-market of a large book: per LTP, per tick message, and a full revalue"""
+    from portfolio import Portfolio
+
+    rng = np.random.default_rng(3)
+    book = Portfolio()
+    book.load([{'symbol': f"NSE:SYM{i}", 'quantity': int(rng.integers(-100, 500)),
+                'average_price': 100 + i * 0.1, 'close_price': 101 + i * 0.1, 'last_price': 102 + i * 0.1}
+               for i in range(positions)])
+    book.set_tokens({f"NSE:SYM{i}": i for i in range(positions)})
+    messages = make_ticks(ticks, instruments=positions)
+
+    single = timed(lambda: [book.on_ltp('NSE:SYM7', 100.0 + k % 5) for k in range(10_000)]) / 10_000
+    per_message = timed(lambda: [book.on_ticks(message) for message in messages], repeat=1) / len(messages)
+    totals = book.totals()
+    full = timed(book._revalue)
+    # Running totals agree with recomputing them from the arrays
+    assert abs(book.totals()['market_value'] - totals['market_value']) < 1e-6 * book.gross_exposure
+    snapshot = timed(book.snapshot)
+    print(f"portfolio     positions={positions:,}  on_ltp={single * 1e6:.1f}us  "
+          f"100-tick message={per_message * 1e6:.0f}us  full revalue={full * 1e6:.0f}us  "
+          f"snapshot={snapshot * 1000:.1f}ms")
+
+
+def bench_breadth(bars=500, symbols=500):
+    """Universe breadth: batch build, per-bar update and sync, checked against a batch recompute"""
+    from breadth import Breadth, breadth_series, matrices, rolling_correlation
+    from providers import ReplayProvider
+
+    provider = ReplayProvider(end=1_760_000_000)
+    universe = [f"SYM{i}.NS" for i in range(symbols)]
+    frames = {symbol: provider.history(symbol, period='5y').tail(bars + 20) for symbol in universe}
+    frame = pd.concat(frames, axis=1).sort_index()
+    names, index, close, high, low = matrices(frame)
+    n = close.shape[1] - 20
+
+    build = timed(lambda: Breadth.from_matrix(names, close[:, :n], high[:, :n], low[:, :n], index[:n]))
+    breadth = Breadth.from_matrix(names, close[:, :n], high[:, :n], low[:, :n], index[:n])
+    started = time.perf_counter()
+    for t in range(n, n + 19):
+        breadth.update(close[:, t], high[:, t], low[:, t], index[t])
+    update = (time.perf_counter() - started) / 19
+    # The last bar arrives through sync(): first while forming, then final
+    forming = frame.copy()
+    forming.iloc[-1, forming.columns.get_level_values(1) == 'Close'] *= 1.01
+    breadth.sync(forming)
+    sync = timed(lambda: breadth.sync(frame), repeat=1)
+
+    expected = breadth_series(close, high, low, index)
+    assert np.allclose(breadth.history.to_numpy(dtype=float), expected.to_numpy(dtype=float), equal_nan=True)
+    assert np.allclose(breadth.correlation().values, rolling_correlation(close), equal_nan=True)
+    correlation = timed(breadth.correlation)
+    latest = breadth.latest()
+    print(f"breadth       symbols={symbols}  bars={bars}  build={build * 1000:.0f}ms  "
+          f"update={update * 1000:.2f}ms/bar  sync={sync * 1000:.1f}ms  correlation={correlation * 1000:.1f}ms  "
+          f"adv/dec={latest['advances']:.0f}/{latest['declines']:.0f}  above_sma={latest['pct_above_sma']:.0f}%")
+
+
+def _reference_alerts(rules, bars, levels, cooldown):
+    """Fired (rule_id, time) of one symbol's rules, evaluated bar by bar in plain Python"""
+    from indicators import IndicatorEngine
+    from patterns import detect_patterns
+
+    o, h, l, c, v, t = bars
+    codes = np.zeros(len(c), dtype=np.int8)
+    found = detect_patterns(o, h, l, c)
+    codes[found.index] = found.code
+    engine = IndicatorEngine()
+    active = dict.fromkeys(rules, False)
+    last_fired = dict.fromkeys(rules, -np.inf)
+    fired, prev_rsi = set(), np.nan
+    for i in range(len(c)):
+        values = engine.update({'Close': c[i], 'Volume': v[i]})
+        rsi = values['RSI']
+        ratio = v[i] / values['Volume_SMA'] if i + 1 >= 20 else np.nan
+        below, above = [x for x in levels if x <= c[i]], [x for x in levels if x >= c[i]]
+        support = (c[i] - max(below)) / max(below) * 100 if below else np.inf
+        resistance = (min(above) - c[i]) / c[i] * 100 if above else np.inf
+        for rule_id, (kind, value) in rules.items():
+            hit = {'rsi_above': prev_rsi < value <= rsi, 'rsi_below': prev_rsi > value >= rsi,
+                   'volume_ratio': ratio >= value, 'near_support': support <= value,
+                   'near_resistance': resistance <= value, 'pattern': codes[i] != 0}[kind]
+            if hit and not active[rule_id] and t[i] - last_fired[rule_id] >= cooldown:
+                fired.add((rule_id, t[i]))
+                last_fired[rule_id] = t[i]
+            active[rule_id] = hit
+        prev_rsi = rsi
+    return fired
+
+
+def bench_alerts(bars=None, symbols=2000, rounds=200, warmup=30, checked=20):
+    """Rules x symbols evaluated per 1m bar batch, checked against a per-rule Python loop"""
+    from alerts import AlertEngine, QueueSink
+    from providers import gbm_ohlcv
+    from ticks import Bar, TickPipeline
+
+    n = warmup + rounds
+    start = 1_700_000_000 - 1_700_000_000 % 60
+    times = start + 60.0 * np.arange(n)
+    data = [gbm_ohlcv(n, np.random.default_rng(i), 100 + i % 500, bars_per_year=252 * 375)
+            for i in range(symbols)]
+    kinds = [('rsi_above', 60), ('rsi_below', 40), ('volume_ratio', 1.8),
+             ('near_support', 0.2), ('near_resistance', 0.2), ('pattern', None)]
+    cooldown = 300
+
+    engine = AlertEngine()
+    sink = engine.add_sink(QueueSink(maxsize=1_000_000))
+    engine.set_tokens({f"SYM{i}": i for i in range(symbols)})
+    rules = {i: {} for i in range(symbols)}
+    for i, df in enumerate(data):
+        first = df['Close'].iloc[0]
+        engine.set_levels(f"SYM{i}", first * np.array([0.97, 0.985, 1.0, 1.015, 1.03]))
+        for kind, value in kinds:
+            rule_id = engine.add_rule(f"SYM{i}", kind, value, cooldown=cooldown)
+            rules[i][rule_id] = (kind, value if value is not None else 0)
+    columns = [np.column_stack([df[name].to_numpy(dtype=np.float64) for df in data])
+               for name in ('Open', 'High', 'Low', 'Close', 'Volume')]
+    batches = [[Bar(i, '1m', times[k], *(float(col[k, i]) for col in columns)) for i in range(symbols)]
+               for k in range(n)]
+
+    for batch in batches[:warmup]:
+        engine.on_bars(batch)
+    evaluations = engine.evaluations
+    t0 = time.perf_counter()
+    for batch in batches[warmup:]:
+        engine.on_bars(batch)
+    elapsed = time.perf_counter() - t0
+    evaluations = engine.evaluations - evaluations
+
+    fired = {}
+    for alert in sink.drain():
+        fired.setdefault(int(alert.symbol[3:]), set()).add((alert.rule_id, alert.time))
+    for i in range(checked):
+        bars_i = [col[:, i] for col in columns] + [times]
+        levels = sorted(data[i]['Close'].iloc[0] * np.array([0.97, 0.985, 1.0, 1.015, 1.03]))
+        assert fired.get(i, set()) == _reference_alerts(rules[i], bars_i, levels, cooldown), i
+
+    # The same engine fed by a tick pipeline's batch subscription
+    pipeline = TickPipeline(timeframes=('1m',))
+    live = AlertEngine().attach(pipeline)
+    live.set_tokens({f"SYM{i}": i for i in range(50)})
+    live.add_rule('SYM0', 'volume_ratio', 1.0)
+    pipeline.run(make_ticks(20_000, instruments=50, rate=20))
+    assert live.evaluations > 0
+
+    print(f"alerts        symbols={symbols:,}  rules={len(kinds) * symbols:,}  "
+          f"{evaluations / elapsed:,.0f} evaluations/s  batch={elapsed / rounds * 1000:.2f}ms  "
+          f"fired={engine.fired:,}")
+
+
+def bench_service(bars=None, sessions=10, latency=0.2):
+    """Sessions opening one symbol: each computing it vs the shared analysis service"""
+    import importlib.machinery
+    import importlib.util
+    import os
+    import threading
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import barstore
+    from analysis_service import AnalysisClient, AnalysisService
+    from barstore import BarSeries, SeriesRegistry
+    from indicators import IndicatorEngine
+    from providers import ReplayProvider
+
+    columns = IndicatorEngine.COLUMNS + ['Support', 'Resistance']
+    provider = ReplayProvider(end=1_750_000_000)
+    fetches = []
+    revised = []
+
+    def loader(symbol, period='1mo', interval='1d'):
+        # A yfinance round trip
+        fetches.append(symbol)
+        time.sleep(latency)
+        df = provider.history(symbol, interval=interval, period=period)
+        if revised:
+            # Today's bar still forming: same timestamp, new close
+            df = df.copy()
+            df.iloc[-1, df.columns.get_loc('Close')] += len(revised)
+        return df
+
+    def concurrently(fn):
+        threads = [threading.Thread(target=fn) for _ in range(sessions)]
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - t0
+
+    # Before: every session fetches and computes on its own
+    local = lambda: BarSeries.from_frame(loader('RELIANCE.NS', '2y'), 'RELIANCE.NS').to_frame(columns)
+    before = concurrently(local)
+    before_fetches = len(fetches)
+    df = provider.history('RELIANCE.NS', period='2y')
+    compute = timed(lambda: BarSeries.from_frame(df, 'RELIANCE.NS').to_frame(columns))
+
+    # After: the Flask backend computes once and publishes; sessions map the files
+    root = tempfile.mkdtemp()
+    path = os.path.dirname(os.path.abspath(__file__))
+    if 'kite_api' not in sys.modules:
+        # The backend is deployed as kite_api.py next to app.py
+        source = importlib.machinery.SourceFileLoader('kite_api', os.path.join(path, 'backend'))
+        module = importlib.util.module_from_spec(importlib.util.spec_from_loader('kite_api', source))
+        sys.modules['kite_api'] = module
+        source.exec_module(module)
+    kite_api = sys.modules['kite_api']
+    import app
+
+    kite_api.analysis = service = AnalysisService(root=os.path.join(root, 'service'), loader=loader)
+    class Quiet(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True, request_handler=Quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    fetches.clear()
+    shared = lambda: AnalysisClient(url).series('RELIANCE.NS', '2y', indicators=columns).to_frame(columns)
+    after = concurrently(shared)
+    after_fetches = len(fetches)
+    # A session's own cost once the analysis is published: in a new process
+    # (a fresh client maps the files), and in one that already mapped them
+    per_session = timed(shared)
+    process_client = AnalysisClient(url)
+    held = process_client.series('RELIANCE.NS', '2y', indicators=columns)
+    per_rerun = timed(lambda: process_client.series('RELIANCE.NS', '2y', indicators=columns).to_frame(columns))
+
+    expected = local()
+    got = shared()
+    assert got.index.equals(expected.index)
+    assert np.allclose(got.to_numpy(dtype=float), expected.to_numpy(dtype=float), equal_nan=True)
+
+    # Subscribers long-poll; a refresh with new bars publishes the next version
+    client = AnalysisClient(url)
+    version = service.get('RELIANCE.NS', '2y', indicators=columns).version
+    result = {}
+
+    def subscriber():
+        result['publication'] = client.wait('RELIANCE.NS', '2y', indicators=columns, version=version, timeout=10)
+        result['at'] = time.perf_counter()
+
+    waiting = threading.Thread(target=subscriber)
+    waiting.start()
+    time.sleep(0.2)
+    provider.end += 86_400
+    t0 = time.perf_counter()
+    service.refresh()
+    waiting.join()
+    assert result['publication']['version'] == version + 1
+    notified = result['at'] - t0
+
+    # A bar changing in place is republished; serving it doesn't wait for the refresher
+    revised.append(True)
+    service.refresh()
+    assert service.get('RELIANCE.NS', '2y', indicators=columns).version == version + 2
+    assert service._refresher is not None and service._refresher.is_alive()
+
+    # Service down: sessions compute locally
+    barstore._default_registry = SeriesRegistry(root=os.path.join(root, 'bars'), loader=loader)
+    fallback = AnalysisClient('http://127.0.0.1:9', timeout=1)
+    assert len(fallback.series('RELIANCE.NS', '2y', indicators=columns)) and fallback.failures == 1
+    server.shutdown()
+    del held
+
+    print(f"service       sessions={sessions}  fetch latency={latency * 1000:.0f}ms  "
+          f"each-session: {before * 1000:.0f}ms wall, {before_fetches} fetches, {compute * 1000:.1f}ms compute each  "
+          f"shared: {after * 1000:.0f}ms wall, {after_fetches} fetch, {per_session * 1000:.1f}ms per new process, "
+          f"{per_rerun * 1000:.1f}ms per session of a warm one  "
+          f"long-poll notified in {notified * 1000:.0f}ms (incl. {latency * 1000:.0f}ms fetch)")
+    return {'sessions': sessions, 'before_wall': before, 'before_fetches': before_fetches, 'compute': compute,
+            'after_wall': after, 'after_fetches': after_fetches, 'per_session': per_session,
+            'per_rerun': per_rerun, 'notified': notified}
+
+
+def bench_resample(bars=1_000_000, new_bars=1000):
+    """Timeframes from 1m bars: pandas resample vs segment reductions, then per-bar extends"""
+    from resample import Resampler
+
+    df = make_ohlcv(bars + new_bars)
+    history, live = df.iloc[:bars], df.iloc[bars:]
+    rules = {'5m': ('5min', {}), '15m': ('15min', {}), '1h': ('1h', {'offset': '15min'}),
+             '1d': ('1D', {}), '1w': ('W-MON', {'label': 'left', 'closed': 'left'})}
+    how = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    rules_columns = list(how)
+
+    def with_pandas():
+        return {tf: history.resample(rule, **kw).agg(how).dropna(subset=['Open'])
+                for tf, (rule, kw) in rules.items()}
+
+    def with_reductions():
+        resampler = Resampler.from_frame(history)
+        return resampler, {tf: resampler.bars(tf) for tf in rules}
+
+    expected = with_pandas()
+    resampler, got = with_reductions()
+    for tf in rules:
+        assert got[tf].index.equals(expected[tf].index), tf
+        assert np.allclose(got[tf].values, expected[tf].values), tf
+
+    pandas_time = timed(with_pandas, repeat=1)
+    reduce_time = timed(with_reductions, repeat=1)
+    # Live bars arrive one at a time as arrays (Resampler.append_bar does the same)
+    wall = live.index.as_unit('ns').asi8
+    rows = [(wall[i:i + 1], *(live[c].to_numpy()[i:i + 1] for c in rules_columns))
+            for i in range(len(live))]
+    extend = timed(lambda: [resampler.append(*row) for row in rows], repeat=1) / len(rows)
+    full = Resampler.from_frame(df)
+    assert all(resampler.bars(tf).equals(full.bars(tf)) for tf in rules)
+    switch = timed(lambda: resampler.bars('1h'))
+    print(f"resample      bars={bars:>9,}  pandas={pandas_time:.3f}s  reduceat={reduce_time:.3f}s  "
+          f"extend={extend * 1e6:.0f}us/bar ({len(rules)} timeframes)  switch={switch * 1000:.2f}ms")
+
+
+# Modules each entry script imported at the top before page modules
+# (streamlit, yfinance and kiteconnect are left out if not installed)
+EAGER_IMPORTS = {
+    'streamlit_app (before)': ['streamlit', 'pandas', 'numpy', 'plotly.graph_objects', 'yfinance', 'requests',
+                               'data_cache', 'scanner', 'downsample', 'breadth', 'barstore', 'indicators',
+                               'patterns', 'volume_profile', 'levels', 'backtest', 'memo', 'profiling'],
+    'router (Learning Center)': ['streamlit', 'profiling', 'startup'],
+    '+ market_pages': ['streamlit', 'profiling', 'startup', 'market_pages'],
+    '+ varsity_pages': ['streamlit', 'profiling', 'startup', 'varsity_pages'],
+    'chart analyser (before)': ['streamlit', 'pandas', 'numpy', 'plotly.graph_objects', 'data_cache', 'resample',
+                                'downsample', 'requests', 'ta', 'profiling'],
+    'chart analyser (after)': ['streamlit', 'pandas', 'numpy', 'plotly.graph_objects', 'data_cache', 'resample',
+                               'downsample', 'indicators', 'profiling'],
+    'zerodha (before)': ['streamlit', 'pandas', 'numpy', 'plotly.graph_objects', 'data_cache', 'portfolio',
+                         'requests', 'pyotp', 'kiteconnect', 'json'],
+    'zerodha (after)': ['streamlit', 'startup'],
+}
+
+
+def _import_time(modules):
+    """Seconds to import `modules` in a fresh interpreter"""
+    import os
+    import subprocess
+
+    code = ('import time; t0 = time.perf_counter()\n'
+            + ''.join(f'import {module}\n' for module in modules)
+            + 'print(time.perf_counter() - t0)')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(out.stdout)
+
+
+def bench_startup(bars=None, repeat=3):
+    """Cold-start imports of the entry scripts, before and after the lazy page modules
+
+    Per-page first-render times are kept in-app by startup.py (debug timings panel).
+    """
+    import importlib.util
+
+    results = {}
+    for name, modules in EAGER_IMPORTS.items():
+        installed = [module for module in modules if importlib.util.find_spec(module.split('.')[0])]
+        missing = sorted(set(modules) - set(installed))
+        seconds = min(_import_time(installed) for _ in range(repeat))
+        results[name] = seconds
+        print(f"startup       {name:<26} {seconds * 1000:6.0f}ms"
+              + (f"  (not installed: {', '.join(missing)})" if missing else ""))
+    return results
+
+
+SUITE_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def _suite_cases():
+    """(name, fn(hist), largest size worth running) for each analysis function"""
+    from backtest import run_rsi, run_sr
+    from barstore import INDICATORS, BarSeries
+    from downsample import chart_frame
+    from indicators import compute_indicators
+    from levels import find_levels
+    from patterns import identify_candlestick_patterns
+    from resample import resample
+    from volume_profile import calculate_volume_profile
+
+    return [
+        ('compute_indicators', compute_indicators, None),
+        ('identify_candlestick_patterns', identify_candlestick_patterns, None),
+        ('calculate_volume_profile', lambda h: calculate_volume_profile(h, bins=20, distribute=True), None),
+        ('find_levels', find_levels, None),
+        ('barseries_to_frame', lambda h: BarSeries.from_frame(h).to_frame(list(INDICATORS)), None),
+        ('chart_frame', chart_frame, None),
+        ('resample_1h', lambda h: resample(h, '1h'), None),
+        ('analysis_figure_json', lambda h: _analysis_figure(h, reduce=True).to_json(), None),
+        # Whole parameter grids: memory grows with combinations x bars
+        ('backtest_sr', run_sr, 100_000),
+        ('backtest_rsi', run_rsi, 1_000),
+    ]
+
+
+def bench_suite(bars=None, sizes=SUITE_SIZES):
+    """Every analysis function at each size; returns the records --json saves"""
+    from indicators import compute_indicators
+
+    sizes = [bars] if bars else sizes
+    records = []
+    for size in sizes:
+        hist = make_ohlcv(size)
+        hist = hist.join(compute_indicators(hist))
+        for name, fn, largest in _suite_cases():
+            if largest is not None and size > largest:
+                continue
+            repeat = 3 if size <= 100_000 else 1
+            seconds = timed(fn, hist, repeat=repeat)
+            records.append({'name': name, 'bars': size, 'seconds': seconds, 'repeat': repeat})
+            print(f"suite         {name:<30} bars={size:>9,}  {seconds * 1000:10.2f}ms  "
+                  f"{seconds / size * 1e9:8.1f}ns/bar")
+    return records
+
+
+def compare(records, baseline):
+    """Print each record's time against the same (name, bars) in a saved run"""
+    before = {(r['name'], r['bars']): r['seconds'] for r in baseline['suite']}
+    for record in records:
+        old = before.get((record['name'], record['bars']))
+        if old:
+            ratio = record['seconds'] / old
+            flag = '  SLOWER' if ratio > 1.2 else ''
+            print(f"vs baseline   {record['name']:<30} bars={record['bars']:>9,}  "
+                  f"{old * 1000:10.2f}ms -> {record['seconds'] * 1000:10.2f}ms  {ratio:5.2f}x{flag}")
+
+
+BENCHMARKS = {
+    'patterns': bench_patterns,
+    'header': bench_header,
+    'scan': bench_scan,
+    'indicators': bench_indicators,
+    'ticks': bench_ticks,
+    'figure': bench_figure,
+    'profile': bench_profile,
+    'memo': bench_memo,
+    'levels': bench_levels,
+    'backtest': bench_backtest,
+    'barstore': bench_barstore,
+    'orders': bench_orders,
+    'portfolio': bench_portfolio,
+    'resample': bench_resample,
+    'breadth': bench_breadth,
+    'alerts': bench_alerts,
+    'service': bench_service,
+    'startup': bench_startup,
+    'suite': bench_suite,
+}
+
+
+def _option(argv, name):
+    """Remove `name VALUE` from argv and return VALUE (None if absent)"""
+    if name not in argv:
+        return None
+    i = argv.index(name)
+    value = argv[i + 1]
+    del argv[i:i + 2]
+    return value
+
+
+def main(argv):
+    argv = list(argv)
+    bars = _option(argv, '--bars')
+    bars = int(bars) if bars is not None else None
+    json_path = _option(argv, '--json')
+    baseline = _option(argv, '--baseline')
+    names = argv or list(BENCHMARKS)
+    results = {}
+    for name in names:
+        if bars is None:
+            result = BENCHMARKS[name]()
+        else:
+            result = BENCHMARKS[name](bars=bars)
+        if result is not None:
+            results[name] = result
+
+    if baseline and 'suite' in results:
+        with open(baseline) as f:
+            compare(results['suite'], json.load(f))
+    if json_path:
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            **results,
+        }
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
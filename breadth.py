@@ -0,0 +1,332 @@
+"""Market breadth and cross-sectional correlation over a stock universe.
+
+Everything is computed on aligned (symbols x bars) matrices: advances,
+declines and the advance/decline line, the percentage of symbols above
+their 50-bar SMA, new 52-week highs and lows, and the correlation matrix of
+the last 60 daily returns. breadth_series() does a whole history in one
+pass; a Breadth object then keeps small ring buffers (the last 50 closes,
+252 highs/lows, 60 returns per symbol) so each new bar is one vectorized
+update of O(symbols x window) rather than a reload of the universe.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+SMA_WINDOW = 50
+HIGH_LOW_WINDOW = 252
+CORRELATION_WINDOW = 60
+
+BREADTH_COLUMNS = ['advances', 'declines', 'unchanged', 'ad_line', 'pct_above_sma',
+                   'new_highs', 'new_lows']
+
+
+# ------ batch ------
+
+def _ffill(values):
+    """Carry each row's last non-NaN value forward along the bar axis"""
+    bar = np.where(np.isnan(values), 0, np.arange(values.shape[-1]))
+    np.maximum.accumulate(bar, axis=-1, out=bar)
+    return np.take_along_axis(values, bar, axis=-1)
+
+
+def _rolling(values, window, reduce):
+    """reduce() over each trailing `window` of bars; NaN before the first full window"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= window:
+        out[:, window - 1:] = reduce(sliding_window_view(values, window, axis=-1), axis=-1)
+    return out
+
+
+def _previous_close(close):
+    """Each bar's last known earlier close (NaN before a symbol's first bar)"""
+    previous = np.full(close.shape, np.nan)
+    previous[:, 1:] = _ffill(close)[:, :-1]
+    return previous
+
+
+def breadth_series(close, high=None, low=None, index=None, sma_window=SMA_WINDOW,
+                   high_low_window=HIGH_LOW_WINDOW):
+    """Breadth per bar for (symbols x bars) close/high/low matrices
+
+    Missing bars are NaN. A change is measured from a symbol's last known
+    close; a new high/low beats the previous `high_low_window` bars.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = close if high is None else np.asarray(high, dtype=np.float64)
+    low = close if low is None else np.asarray(low, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        change = close - _previous_close(close)
+        sma = _rolling(close, sma_window, np.mean)
+        valid = ~np.isnan(sma) & ~np.isnan(close)
+        counted = valid.sum(axis=0)
+        pct_above = np.where(counted > 0, 100 * (valid & (close > sma)).sum(axis=0) / np.maximum(counted, 1),
+                             np.nan)
+
+        # Highest high / lowest low of the window before each bar
+        prior_high = np.full(close.shape, np.nan)
+        prior_low = np.full(close.shape, np.nan)
+        prior_high[:, 1:] = _rolling(np.where(np.isnan(high), -np.inf, high), high_low_window, np.max)[:, :-1]
+        prior_low[:, 1:] = _rolling(np.where(np.isnan(low), np.inf, low), high_low_window, np.min)[:, :-1]
+        new_highs = (np.isfinite(prior_high) & (high > prior_high)).sum(axis=0)
+        new_lows = (np.isfinite(prior_low) & (low < prior_low)).sum(axis=0)
+
+    advances = (change > 0).sum(axis=0)
+    declines = (change < 0).sum(axis=0)
+    return pd.DataFrame({
+        'advances': advances,
+        'declines': declines,
+        'unchanged': (change == 0).sum(axis=0),
+        'ad_line': np.cumsum(advances - declines),
+        'pct_above_sma': pct_above,
+        'new_highs': new_highs,
+        'new_lows': new_lows,
+    }, index=index, columns=BREADTH_COLUMNS)
+
+
+def correlation_matrix(returns):
+    """Pearson correlation between the rows of a (symbols x bars) returns matrix
+
+    A symbol with a missing or constant return in the window gets NaN.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centered = returns - returns.mean(axis=1, keepdims=True)
+        scale = np.sqrt((centered ** 2).sum(axis=1, keepdims=True))
+        z = centered / scale
+    z[~np.isfinite(z)] = np.nan
+    ok = ~np.isnan(z).any(axis=1)
+    corr = np.full((len(returns), len(returns)), np.nan)
+    corr[np.ix_(ok, ok)] = z[ok] @ z[ok].T
+    return corr
+
+
+def rolling_correlation(close, window=CORRELATION_WINDOW):
+    """Correlation matrix of the last `window` bar-to-bar returns"""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = close / _previous_close(close) - 1
+    return correlation_matrix(returns[:, -window:])
+
+
+def matrices(frame):
+    """symbols, index and close/high/low (symbols x bars) from a history_many frame"""
+    symbols = list(dict.fromkeys(frame.columns.get_level_values(0)))
+    fields = [frame.xs(name, axis=1, level=1).reindex(columns=symbols).to_numpy(dtype=np.float64).T
+              for name in ('Close', 'High', 'Low')]
+    return symbols, frame.index, *fields
+
+
+# ------ incremental ------
+
+def _seed(ring, values):
+    """Fill a ring buffer with the last bars of `values`, slot t % width for bar t"""
+    width, n = ring.shape[1], values.shape[1]
+    for t in range(max(n - width, 0), n):
+        ring[:, t % width] = values[:, t]
+
+
+class Breadth:
+    """Breadth of a fixed universe, updated one cross-section (bar) at a time
+
+    b = Breadth.from_matrix(symbols, close, high, low, index)
+    b.update(close_now, high_now, low_now, ts)   # one value per symbol
+    b.latest(), b.history, b.correlation()
+    """
+
+    def __init__(self, symbols, sma_window=SMA_WINDOW, high_low_window=HIGH_LOW_WINDOW,
+                 correlation_window=CORRELATION_WINDOW):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.sma_window = sma_window
+        self.high_low_window = high_low_window
+        self.bars = 0
+        self.last_close = np.full(n, np.nan)
+        self.ad_line = 0
+        self._closes = np.full((n, sma_window), np.nan)
+        self._highs = np.full((n, high_low_window), -np.inf)
+        self._lows = np.full((n, high_low_window), np.inf)
+        self._returns = np.full((n, correlation_window), np.nan)
+        self._history = pd.DataFrame(columns=BREADTH_COLUMNS)
+        self._rows, self._index = [], []
+        self._undo = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_matrix(cls, symbols, close, high=None, low=None, index=None, **kwargs):
+        """Batch-compute the history, then keep the state for incremental updates
+
+        The last bar goes through update(), so it can be replaced while it forms.
+        """
+        breadth = cls(symbols, **kwargs)
+        close = np.asarray(close, dtype=np.float64)
+        high = close if high is None else np.asarray(high, dtype=np.float64)
+        low = close if low is None else np.asarray(low, dtype=np.float64)
+        n = close.shape[1]
+        if index is None:
+            index = pd.RangeIndex(n)
+        if n == 0:
+            return breadth
+        done = slice(0, n - 1)
+        breadth._history = breadth_series(close[:, done], high[:, done], low[:, done], index[done],
+                                          breadth.sma_window, breadth.high_low_window)
+        if n > 1:
+            breadth.bars = n - 1
+            breadth.last_close = _ffill(close[:, done])[:, -1]
+            breadth.ad_line = int(breadth._history['ad_line'].iloc[-1])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                _seed(breadth._returns, close[:, done] / _previous_close(close[:, done]) - 1)
+            _seed(breadth._closes, close[:, done])
+            _seed(breadth._highs, np.where(np.isnan(high[:, done]), -np.inf, high[:, done]))
+            _seed(breadth._lows, np.where(np.isnan(low[:, done]), np.inf, low[:, done]))
+        breadth.update(close[:, -1], high[:, -1], low[:, -1], index[-1])
+        return breadth
+
+    @property
+    def last_timestamp(self):
+        if self._index:
+            return self._index[-1]
+        return self._history.index[-1] if len(self._history) else None
+
+    def update(self, close, high=None, low=None, ts=None, replace=False):
+        """Fold in one bar (arrays aligned with `symbols`, NaN where missing)
+
+        replace=True swaps out the last bar instead, for a bar still forming.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        high = close if high is None else np.asarray(high, dtype=np.float64)
+        low = close if low is None else np.asarray(low, dtype=np.float64)
+        with self._lock:
+            if replace:
+                self._rollback()
+            b = self.bars
+            slots = (b % self._closes.shape[1], b % self._highs.shape[1], b % self._returns.shape[1])
+            previous = self.last_close
+            self._undo = (slots, self._closes[:, slots[0]].copy(), self._highs[:, slots[1]].copy(),
+                          self._lows[:, slots[1]].copy(), self._returns[:, slots[2]].copy(),
+                          previous, self.ad_line)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                change = close - previous
+                self._returns[:, slots[2]] = change / previous
+                self._closes[:, slots[0]] = close
+                if b + 1 >= self.sma_window:
+                    sma = self._closes.mean(axis=1)
+                    valid = ~np.isnan(sma) & ~np.isnan(close)
+                    counted = valid.sum()
+                    pct_above = 100 * (valid & (close > sma)).sum() / counted if counted else np.nan
+                else:
+                    pct_above = np.nan
+                new_highs = new_lows = 0
+                if b >= self.high_low_window:
+                    prior_high = self._highs.max(axis=1)
+                    prior_low = self._lows.min(axis=1)
+                    new_highs = int((np.isfinite(prior_high) & (high > prior_high)).sum())
+                    new_lows = int((np.isfinite(prior_low) & (low < prior_low)).sum())
+            self._highs[:, slots[1]] = np.where(np.isnan(high), -np.inf, high)
+            self._lows[:, slots[1]] = np.where(np.isnan(low), np.inf, low)
+
+            advances, declines = int((change > 0).sum()), int((change < 0).sum())
+            self.ad_line += advances - declines
+            self.last_close = np.where(np.isnan(close), previous, close)
+            self.bars = b + 1
+            row = {'advances': advances, 'declines': declines, 'unchanged': int((change == 0).sum()),
+                   'ad_line': self.ad_line, 'pct_above_sma': pct_above,
+                   'new_highs': new_highs, 'new_lows': new_lows}
+            self._rows.append(row)
+            self._index.append(ts if ts is not None else b)
+            return row
+
+    def _rollback(self):
+        if self._undo is None:
+            raise ValueError('No bar to replace')
+        slots, closes, highs, lows, returns, previous, ad_line = self._undo
+        self._closes[:, slots[0]] = closes
+        self._highs[:, slots[1]] = highs
+        self._lows[:, slots[1]] = lows
+        self._returns[:, slots[2]] = returns
+        self.last_close = previous
+        self.ad_line = ad_line
+        self.bars -= 1
+        if self._rows:
+            self._rows.pop()
+            self._index.pop()
+        else:
+            self._history = self._history.iloc[:-1]
+        self._undo = None
+
+    @property
+    def history(self):
+        """Breadth per bar, batch history plus incremental updates"""
+        with self._lock:
+            if self._rows:
+                new = pd.DataFrame(self._rows, index=self._index, columns=BREADTH_COLUMNS)
+                self._history = pd.concat([self._history, new]) if len(self._history) else new
+                self._rows, self._index = [], []
+            return self._history
+
+    def latest(self):
+        """The newest bar's breadth figures"""
+        history = self.history
+        return history.iloc[-1].to_dict() if len(history) else {}
+
+    def correlation(self):
+        """Correlation matrix of the symbols' last returns as a DataFrame"""
+        with self._lock:
+            corr = correlation_matrix(self._returns)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    def sync(self, frame):
+        """Fold in the bars of a history_many frame newer than the last one seen
+
+        A frame whose last bar has the same timestamp as ours (today's bar
+        still forming) replaces it.
+        """
+        symbols, index, close, high, low = matrices(frame)
+        if symbols != self.symbols:
+            raise ValueError('Universe changed; build a new Breadth')
+        last = self.last_timestamp
+        start = int(np.searchsorted(index, last)) if last is not None else 0
+        for t in range(start, len(index)):
+            replace = index[t] == last and self._undo is not None
+            if index[t] == last and not replace:
+                continue
+            self.update(close[:, t], high[:, t], low[:, t], index[t], replace=replace)
+
+
+_breadths = {}
+_breadths_lock = threading.Lock()
+_key_locks = {}   # key -> Lock held while its Breadth is fetched, built or synced
+
+
+def market_breadth(symbols, period='2y', max_age=60.0, **kwargs):
+    """Process-wide Breadth of `symbols`: built once, then synced with new bars
+
+    Reruns within `max_age` seconds of the last sync reuse it as is. One
+    caller at a time updates a key (sessions and the warm-up thread); the
+    others wait for it and reuse its result.
+    """
+    from data_cache import get_history_many
+
+    key = (tuple(symbols), period)
+    with _breadths_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _breadths_lock:
+            breadth, synced_at = _breadths.get(key, (None, 0.0))
+        if breadth is not None and time.monotonic() - synced_at < max_age:
+            return breadth
+        frame = get_history_many(symbols, period=period).frame
+        if frame.empty:
+            return breadth
+        loaded = list(dict.fromkeys(frame.columns.get_level_values(0)))
+        if breadth is None or breadth.symbols != loaded:
+            _, index, close, high, low = matrices(frame)
+            breadth = Breadth.from_matrix(loaded, close, high, low, index, **kwargs)
+        else:
+            breadth.sync(frame)
+        with _breadths_lock:
+            _breadths[key] = (breadth, time.monotonic())
+        return breadth
@@ -0,0 +1,398 @@
+"""Persistent OHLCV cache in front of the market data source.
+
+Bars are stored per (symbol, interval) as one memory-mapped .npy file per
+column plus a small meta.json. A cache hit serves any `period` from disk;
+a stale entry only fetches the bars since the last stored timestamp.
+
+Every process (Streamlit, scanner and backtest workers) can share one cache
+root. Entries are read under a shared lock on the root's lock file and
+evicted under an exclusive one, by the mtime of their meta.json, so no
+process deletes an entry another is reading.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process lock, eviction only sees this process's readers
+    fcntl = None
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Periods in increasing order of history they need
+PERIODS = ['1d', '2d', '5d', '1wk', '1mo', '3mo', '6mo', 'ytd', '1y', '2y', '5y', '10y', 'max']
+
+# Seconds after which an entry is refreshed, by bar interval
+STALE_AFTER = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600,
+    '1d': 15 * 60, '5d': 3600, '1wk': 3600, '1mo': 6 * 3600, '3mo': 6 * 3600,
+}
+
+# Bar length of each yfinance interval
+INTERVAL_STEP = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': '60min', '90m': '90min', '1h': '1h',
+    '1d': '1D', '5d': '5D', '1wk': '7D', '1mo': '30D', '3mo': '91D',
+}
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# frame: bars of every symbol that loaded, columns (symbol, field) on a shared index
+# errors: symbol -> exception for the ones that failed or timed out
+BatchResult = namedtuple('BatchResult', ['frame', 'errors'])
+
+
+class FakeSource:
+    """Deterministic offline source; counts calls so tests can assert on them"""
+
+    def __init__(self, end=None, seed=0):
+        self.end = end
+        self.seed = seed
+        self.calls = []
+
+    def history(self, symbol, interval='1d', period=None, start=None):
+        self.calls.append((symbol, interval, period, start))
+        step = pd.Timedelta(INTERVAL_STEP[interval])
+        end = pd.Timestamp(self.end if self.end is not None else time.time(), unit='s', tz='UTC').floor(step)
+        if start is None:
+            start = end - _period_offset(period or '1mo', end)
+        start = pd.Timestamp(start)
+        if start.tzinfo is None:
+            start = start.tz_localize('UTC')
+        index = pd.date_range(start.ceil(step), end, freq=step)
+
+        # Hash each bar timestamp so a bar always has the same value
+        ts = index.as_unit('ns').asi8 // step.value
+        key = np.uint64(zlib.crc32(symbol.encode()) + self.seed)
+        noise = ((ts.astype(np.uint64) * np.uint64(2654435761) + key) % np.uint64(2 ** 32)) / 2.0 ** 32
+        close = 100 * (1 + 0.2 * np.sin(ts / 50.0)) + 5 * (noise - 0.5)
+        open_ = close - 2 * (noise - 0.5)
+        high = np.maximum(open_, close) + noise
+        low = np.minimum(open_, close) - noise
+        volume = (100000 + noise * 900000).astype(np.int64)
+        return pd.DataFrame({'Open': open_, 'High': high, 'Low': low,
+                             'Close': close, 'Volume': volume}, index=index)
+
+
+def _period_offset(period, end):
+    """Calendar offset covered by a yfinance-style period string"""
+    if period == 'max':
+        return pd.Timedelta(days=365 * 30)
+    if period == 'ytd':
+        return end - end.normalize().replace(month=1, day=1)
+    if period.endswith('d'):
+        # Trading days; pad for weekends and holidays
+        return pd.Timedelta(days=int(period[:-1]) * 2 + 4)
+    if period.endswith('wk'):
+        return pd.DateOffset(weeks=int(period[:-2]))
+    if period.endswith('mo'):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return pd.DateOffset(years=int(period[:-1]))
+    raise ValueError(f"Unknown period: {period}")
+
+
+def slice_period(df, period):
+    """Return the bars of `df` that fall inside `period`, counted back from the last bar"""
+    if df.empty or period == 'max':
+        return df
+    if period.endswith('d'):
+        # Like yfinance, 'Nd' means the last N trading days
+        days = df.index.normalize()
+        keep = days.unique()[-int(period[:-1]):]
+        return df[days.isin(keep)]
+    last = df.index[-1]
+    return df[df.index > last - _period_offset(period, last)]
+
+
+def _covers(cached, period):
+    return PERIODS.index(cached) >= PERIODS.index(period)
+
+
+class OHLCVCache:
+    """On-disk OHLCV cache with incremental refresh and LRU size eviction"""
+
+    def __init__(self, root=None, source=None, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.root = root or os.environ.get(
+            'CHART_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'chart', 'ohlcv'))
+        if source is None:
+            from providers import get_provider
+            source = get_provider()
+        self.source = source
+        self.max_bytes = max_bytes
+        self.clock = clock
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    # ------ public ------
+    def history(self, symbol, period='1mo', interval='1d'):
+        """Bars for `symbol` covering `period`, fetched only when missing or stale"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        path = self._path(symbol, interval)
+        wrote = True
+        with self._key_lock(path), self._root_lock(shared=True):
+            meta = self._read_meta(path)
+            now = self.clock()
+
+            if meta is None or not _covers(meta['period'], period):
+                df = self._clean(self.source.history(symbol, interval, period=period))
+                if meta is not None:
+                    df = self._merge(self._read_frame(path, meta), df)
+                meta = {'symbol': symbol, 'interval': interval, 'period': period}
+                self._write(path, df, meta, now)
+            elif now - meta['fetched_at'] > STALE_AFTER.get(interval, 3600):
+                df = self._read_frame(path, meta)
+                if df.empty:
+                    new = self.source.history(symbol, interval, period=meta['period'])
+                else:
+                    new = self.source.history(symbol, interval, start=df.index[-1])
+                df = self._merge(df, self._clean(new))
+                self._write(path, df, meta, now)
+            else:
+                df = self._read_frame(path, meta)
+                wrote = False
+
+            # meta.json's mtime is the entry's last access for eviction
+            meta['accessed_at'] = now
+            self._write_meta(path, meta)
+
+        if wrote:
+            # Only new bars grow the cache
+            self._evict(keep=path)
+        return slice_period(df, period)
+
+    def history_many(self, symbols, period='1mo', interval='1d', max_workers=8, timeout=10.0):
+        """Fetch several symbols concurrently into one aligned frame
+
+        Each symbol gets `timeout` seconds from the moment its fetch starts,
+        and the whole call `timeout` per round of `max_workers` fetches, so
+        hung fetches holding every worker can't hold up the batch: symbols
+        still queued then time out too. Failures and timeouts are reported
+        in `errors` instead of raising.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        frames, errors, started = {}, {}, {}
+        if not symbols:
+            return BatchResult(pd.DataFrame(), errors)
+
+        def fetch(symbol):
+            started[symbol] = time.monotonic()
+            return self.history(symbol, period=period, interval=interval)
+
+        workers = min(max_workers, len(symbols))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        pending = {pool.submit(fetch, symbol): symbol for symbol in symbols}
+        batch_deadline = time.monotonic() + timeout * -(-len(symbols) // workers)
+        try:
+            while pending:
+                deadlines = [started[s] + timeout for s in pending.values() if s in started]
+                wait_for = max(0.0, min(deadlines + [batch_deadline]) - time.monotonic())
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol = pending.pop(future)
+                    try:
+                        df = future.result()
+                    except Exception as e:
+                        errors[symbol] = e
+                        continue
+                    if df.empty:
+                        errors[symbol] = LookupError(f"No data for {symbol}")
+                    else:
+                        frames[symbol] = df
+
+                now = time.monotonic()
+                for future, symbol in list(pending.items()):
+                    if symbol in started and now - started[symbol] >= timeout:
+                        del pending[future]
+                        errors[symbol] = TimeoutError(f"{symbol} took longer than {timeout}s")
+                    elif now >= batch_deadline:
+                        del pending[future]
+                        state = 'did not finish' if symbol in started else 'never started'
+                        errors[symbol] = TimeoutError(f"{symbol} {state} before the batch deadline")
+        finally:
+            # Timed-out fetches finish in the background and still land in the cache
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if not frames:
+            return BatchResult(pd.DataFrame(), errors)
+        ordered = {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+        return BatchResult(pd.concat(ordered, axis=1).sort_index(), errors)
+
+    def clear(self):
+        with self._lock, self._root_lock():
+            for path in self._scan():
+                shutil.rmtree(path, ignore_errors=True)
+
+    def size(self):
+        """Total bytes stored on disk"""
+        return sum(self._entry_size(path) for path in self._scan())
+
+    # ------ storage ------
+    def _path(self, symbol, interval):
+        safe = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in symbol)
+        return os.path.join(self.root, f"{safe}@{interval}")
+
+    def _key_lock(self, path):
+        with self._lock:
+            return self._key_locks.setdefault(path, threading.Lock())
+
+    @contextmanager
+    def _root_lock(self, shared=False):
+        """flock on the root's lock file: shared to use entries, exclusive to delete them"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _scan(self):
+        return [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def _read_frame(self, path, meta):
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                  for name in ['index'] + COLUMNS}
+        index = pd.to_datetime(np.asarray(arrays['index']), utc=True)
+        index = index.tz_convert(meta['tz']) if meta['tz'] else index.tz_localize(None)
+        return pd.DataFrame({name: np.asarray(arrays[name]) for name in COLUMNS}, index=index)
+
+    def _write(self, path, df, meta, now):
+        os.makedirs(path, exist_ok=True)
+        index = df.index.as_unit('ns')
+        tz = str(index.tz) if index.tz is not None else None
+        utc = index.tz_convert('UTC') if tz else index
+        arrays = {'index': utc.asi8}
+        arrays.update({name: df[name].to_numpy() for name in COLUMNS})
+        for name, values in arrays.items():
+            tmp = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp, values)
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+        meta.update({'tz': tz, 'rows': len(df), 'fetched_at': now})
+        self._write_meta(path, meta)
+
+    @staticmethod
+    def _clean(df):
+        if df is None or df.empty:
+            return pd.DataFrame({name: pd.Series(dtype='float64') for name in COLUMNS},
+                                index=pd.DatetimeIndex([], tz='UTC'))
+        return df[COLUMNS]
+
+    @staticmethod
+    def _merge(old, new):
+        if new.empty:
+            return old
+        if old.empty:
+            return new
+        # Sources disagree on tz-awareness (yfinance vs. a replay or an older
+        # cache entry): compare in UTC, keep the cached side's zone
+        tz = old.index.tz
+        if new.index.tz is None:
+            new = new.tz_localize('UTC')
+        if tz is None:
+            old = old.tz_localize('UTC')
+        new = new.tz_convert(old.index.tz)
+        # The last cached bar may have been incomplete; the fresh copy wins
+        df = pd.concat([old, new])
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        return df.tz_localize(None) if tz is None else df
+
+    # ------ eviction ------
+    @staticmethod
+    def _entry_size(path):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(path))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _accessed_at(path):
+        try:
+            return os.stat(os.path.join(path, 'meta.json')).st_mtime
+        except OSError:
+            return 0.0
+
+    def _evict(self, keep=None):
+        """Drop least recently used entries, across processes, until the cache fits in max_bytes"""
+        sizes = {path: self._entry_size(path) for path in self._scan()}
+        if sum(sizes.values()) <= self.max_bytes:
+            return
+        # Waits for every reader in any process; sizes are re-read under the lock
+        with self._lock, self._root_lock():
+            sizes = {path: self._entry_size(path) for path in self._scan()}
+            total = sum(sizes.values())
+            for path in sorted(sizes, key=self._accessed_at):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= sizes[path]
+                self._key_locks.pop(path, None)
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Process-wide cache shared by every Streamlit session"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OHLCVCache()
+    return _default_cache
+
+
+def get_history(symbol, period='1mo', interval='1d'):
+    """Drop-in replacement for yf.Ticker(symbol).history(period=period)"""
+    return get_cache().history(symbol, period=period, interval=interval)
+
+
+def get_history_many(symbols, period='1mo', interval='1d', max_workers=8, timeout=10.0):
+    """Batched version of get_history; returns a BatchResult"""
+    return get_cache().history_many(symbols, period=period, interval=interval,
+                                    max_workers=max_workers, timeout=timeout)
+
+
+def price_changes(frame):
+    """Last close, change and change % per symbol of a history_many frame"""
+    rows = {}
+    if frame.empty:
+        return pd.DataFrame(columns=['current', 'change', 'change_pct'])
+    closes = frame.xs('Close', axis=1, level=1)
+    for symbol in closes.columns:
+        close = closes[symbol].dropna().to_numpy()
+        if len(close) < 2:
+            continue
+        change = close[-1] - close[-2]
+        rows[symbol] = {'current': close[-1], 'change': change,
+                        'change_pct': change / close[-2] * 100}
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['current', 'change', 'change_pct'])
@@ -0,0 +1,118 @@
+"""Reduce bar data before it goes into Plotly figures.
+
+Candles are merged into buckets of consecutive bars (open of the first,
+max high, min low, close of the last, summed volume), so every high and low
+stays exactly on the chart. Line overlays use Largest-Triangle-Three-Buckets
+(LTTB), which keeps the visual shape of a series with a fixed point budget.
+Volume bars are summed per bucket like the candles' volume, since dropping
+bars would misstate the volume traded.
+
+The budget follows the chart width in pixels. Pages with a zoom control
+pass its (start, end) as `x_range`, so the zoomed chart gets finer buckets
+instead of a slice of the overview.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_WIDTH = 1200   # chart width in px
+PX_PER_CANDLE = 3      # narrowest readable candle
+POINTS_PER_PX = 2      # line points per px; more is invisible
+
+
+def max_candles(width=DEFAULT_WIDTH):
+    return max(int(width) // PX_PER_CANDLE, 10)
+
+
+def max_points(width=DEFAULT_WIDTH):
+    return max(int(width) * POINTS_PER_PX, 10)
+
+
+def visible(df, x_range=None):
+    """Rows of `df` inside the zoomed (start, end) range; all rows if None"""
+    if x_range is None:
+        return df
+    start, end = x_range
+    return df.loc[start:end]
+
+
+def _bucket_starts(n, n_out):
+    return np.arange(0, n, -(-n // n_out))
+
+
+def ohlc_downsample(df, n_out):
+    """Merge consecutive bars into at most `n_out` OHLCV buckets"""
+    n = len(df)
+    if n <= n_out:
+        return df
+    starts = _bucket_starts(n, n_out)
+    ends = np.append(starts[1:], n) - 1
+    data = {
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in df:
+        data['Volume'] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+    return pd.DataFrame(data, index=df.index[starts])
+
+
+def sum_downsample(df, n_out):
+    """Sum consecutive rows into at most `n_out` buckets (the same buckets as ohlc_downsample)"""
+    n = len(df)
+    if n <= n_out:
+        return df
+    starts = _bucket_starts(n, n_out)
+    return pd.DataFrame({column: np.add.reduceat(df[column].to_numpy(dtype=np.float64), starts)
+                         for column in df.columns}, index=df.index[starts])
+
+
+def lttb_indices(y, n_out):
+    """Positions of the `n_out` points LTTB keeps from evenly spaced `y`"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i covers [edges[i], edges[i + 1]); first and last points are fixed
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    csum = np.concatenate(([0.0], np.cumsum(y)))
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nxt_start, nxt_end = (end, edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = (nxt_start + nxt_end - 1) / 2.0
+        avg_y = (csum[nxt_end] - csum[nxt_start]) / (nxt_end - nxt_start)
+        xs = np.arange(start, end)
+        area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def line(series, n_out):
+    """Downsample a line series with LTTB; leading/trailing NaNs are dropped"""
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    return series.iloc[lttb_indices(series.to_numpy(), n_out)]
+
+
+def chart_frame(df, width=DEFAULT_WIDTH, x_range=None):
+    """Visible candles for a chart `width` px wide"""
+    return ohlc_downsample(visible(df, x_range), max_candles(width))
+
+
+def chart_line(series, width=DEFAULT_WIDTH, x_range=None):
+    """Visible line overlay for a chart `width` px wide"""
+    return line(visible(series, x_range), max_points(width))
+
+
+def chart_volume(df, width=DEFAULT_WIDTH, x_range=None):
+    """Visible volume columns (e.g. Volume and its average) summed per candle bucket"""
+    return sum_downsample(visible(df, x_range), max_candles(width))
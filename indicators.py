@@ -0,0 +1,269 @@
+"""Technical indicators over NumPy arrays.
+
+The *_2d functions take a (symbols x bars) matrix and compute every row at
+once; IndicatorEngine updates one symbol bar by bar. Both match the `ta`
+library formulas the Streamlit pages used to call.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def sma_2d(values, window):
+    """Simple moving average along the bar axis; NaN until `window` bars are seen"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    csum = np.cumsum(values, axis=-1)
+    out[..., window - 1] = csum[..., window - 1]
+    out[..., window:] = csum[..., window:] - csum[..., :-window]
+    out[..., window - 1:] /= window
+    return out
+
+
+def ewm_2d(values, alpha, min_periods=0):
+    """Recursive EMA (pandas ewm(adjust=False)) along the bar axis"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(values.shape)
+    out[..., 0] = values[..., 0]
+    for i in range(1, values.shape[-1]):
+        out[..., i] = out[..., i - 1] + alpha * (values[..., i] - out[..., i - 1])
+    if min_periods > 1:
+        out[..., :min_periods - 1] = np.nan
+    return out
+
+
+def rsi_2d(close, window=14):
+    """Wilder RSI along the bar axis, same as ta.momentum.RSIIndicator"""
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.zeros(close.shape)
+    diff[..., 1:] = np.diff(close, axis=-1)
+    up = ewm_2d(np.where(diff > 0, diff, 0.0), 1.0 / window, window)
+    down = ewm_2d(np.where(diff < 0, -diff, 0.0), 1.0 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + up / down)
+    return np.where(down == 0, 100.0, rsi)
+
+
+# ------ Incremental engine ------
+#
+# Each indicator keeps just enough state to fold in one new bar in O(1):
+# running sums for SMA / Bollinger, the recursive EMA, and Wilder
+# smoothing (an EMA with alpha = 1/window) for RSI.
+
+class RollingWindow:
+    """Rolling mean and population std over the last `window` values"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def seed(self, values):
+        self.values.clear()
+        self.values.extend(float(v) for v in values[-self.window:])
+        tail = np.asarray(self.values)
+        self.mean = float(tail.mean()) if len(tail) else 0.0
+        self.m2 = float(((tail - self.mean) ** 2).sum()) if len(tail) else 0.0
+
+    def update(self, x):
+        x = float(x)
+        if len(self.values) < self.window:
+            # Welford add
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            # Replace the oldest value in one step
+            old = self.values[0]
+            self.values.append(x)
+            prev_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - prev_mean)
+        return self.value
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def value(self):
+        return self.mean if self.ready else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(max(self.m2, 0.0) / self.window)) if self.ready else np.nan
+
+
+class EMA:
+    """Recursive EMA, pandas ewm(adjust=False, min_periods=min_periods)"""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.count = 0
+        self.state = np.nan
+
+    def seed(self, state, count):
+        self.state = float(state)
+        self.count = int(count)
+
+    def update(self, x):
+        self.count += 1
+        self.state = float(x) if self.count == 1 else self.state + self.alpha * (x - self.state)
+        return self.value
+
+    @property
+    def value(self):
+        return self.state if self.count >= self.min_periods else np.nan
+
+
+class RSI:
+    """Wilder RSI, same as ta.momentum.RSIIndicator"""
+
+    def __init__(self, window=14):
+        self.prev_close = None
+        self.up = EMA(1.0 / window, window)
+        self.down = EMA(1.0 / window, window)
+
+    def update(self, close):
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = float(close)
+        self.up.update(max(diff, 0.0))
+        self.down.update(max(-diff, 0.0))
+        return self.value
+
+    @property
+    def value(self):
+        up, down = self.up.value, self.down.value
+        if np.isnan(down):
+            return np.nan
+        return 100.0 if down == 0 else 100 - 100 / (1 + up / down)
+
+
+def _span(window):
+    return 2.0 / (window + 1)
+
+
+def compute_indicators(df):
+    """The get_technical_indicators columns for a whole frame, computed vectorized"""
+    close = df['Close'].astype('float64')
+    volume = df['Volume'].astype('float64')
+
+    diff = close.diff(1)
+    up = diff.where(diff > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    rsi = pd.Series(np.where(down == 0, 100, 100 - 100 / (1 + up / down)), index=df.index)
+
+    ema_12 = close.ewm(span=12, min_periods=12, adjust=False).mean()
+    ema_26 = close.ewm(span=26, min_periods=26, adjust=False).mean()
+    macd = ema_12 - ema_26
+    macd_signal = macd.ewm(span=9, min_periods=9, adjust=False).mean()
+
+    bb_middle = close.rolling(20, min_periods=20).mean()
+    bb_std = close.rolling(20, min_periods=20).std(ddof=0)
+
+    return pd.DataFrame({
+        'RSI': rsi,
+        'SMA_20': bb_middle,
+        'SMA_50': close.rolling(50, min_periods=50).mean(),
+        'EMA_12': ema_12,
+        'EMA_26': ema_26,
+        'MACD': macd,
+        'MACD_Signal': macd_signal,
+        'MACD_Histogram': macd - macd_signal,
+        'BB_Upper': bb_middle + 2 * bb_std,
+        'BB_Lower': bb_middle - 2 * bb_std,
+        'BB_Middle': bb_middle,
+        'Volume_SMA': volume.rolling(20, min_periods=20).mean(),
+    }, index=df.index)
+
+
+class IndicatorEngine:
+    """Stateful RSI / SMA / EMA / MACD / Bollinger / Volume SMA with O(1) updates
+
+    engine = IndicatorEngine.from_frame(hist)   # warm up from history
+    row = engine.update({'Close': 101.5, 'Volume': 12000})
+    """
+
+    COLUMNS = ['RSI', 'SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal',
+               'MACD_Histogram', 'BB_Upper', 'BB_Lower', 'BB_Middle', 'Volume_SMA']
+
+    def __init__(self):
+        self.rsi = RSI(14)
+        self.sma_20 = RollingWindow(20)
+        self.sma_50 = RollingWindow(50)
+        self.ema_12 = EMA(_span(12), 12)
+        self.ema_26 = EMA(_span(26), 26)
+        self.macd_signal = EMA(_span(9), 9)
+        self.volume_sma = RollingWindow(20)
+        self.last = dict.fromkeys(self.COLUMNS, np.nan)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Engine whose state is as if every bar of `df` had been passed to update()"""
+        engine = cls()
+        if df.empty:
+            return engine
+        close = df['Close'].to_numpy(dtype=np.float64)
+        volume = df['Volume'].to_numpy(dtype=np.float64)
+        n = len(close)
+        closes = pd.Series(close)
+
+        # Raw recursive states (no min_periods masking) at the last bar
+        diff = closes.diff(1).fillna(0.0)
+        engine.rsi.prev_close = close[-1]
+        engine.rsi.up.seed(diff.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean().iloc[-1], n)
+        engine.rsi.down.seed((-diff).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean().iloc[-1], n)
+        ema_12 = closes.ewm(span=12, adjust=False).mean()
+        ema_26 = closes.ewm(span=26, adjust=False).mean()
+        engine.ema_12.seed(ema_12.iloc[-1], n)
+        engine.ema_26.seed(ema_26.iloc[-1], n)
+        # The signal line only starts once MACD itself is defined (bar 26)
+        macd = (ema_12 - ema_26).iloc[25:]
+        if len(macd):
+            engine.macd_signal.seed(macd.ewm(span=9, adjust=False).mean().iloc[-1], len(macd))
+        engine.sma_20.seed(close)
+        engine.sma_50.seed(close)
+        engine.volume_sma.seed(volume)
+        engine._refresh()
+        return engine
+
+    def update(self, bar):
+        """Fold in one new bar (mapping with Close and Volume); returns the latest values"""
+        close = float(bar['Close'])
+        self.rsi.update(close)
+        self.sma_20.update(close)
+        self.sma_50.update(close)
+        self.ema_12.update(close)
+        self.ema_26.update(close)
+        macd = self.ema_12.value - self.ema_26.value
+        if not np.isnan(macd):
+            self.macd_signal.update(macd)
+        self.volume_sma.update(float(bar['Volume']))
+        return self._refresh()
+
+    def _refresh(self):
+        macd = self.ema_12.value - self.ema_26.value
+        signal = self.macd_signal.value
+        middle = self.sma_20.value
+        std = self.sma_20.std
+        self.last = {
+            'RSI': self.rsi.value,
+            'SMA_20': middle,
+            'SMA_50': self.sma_50.value,
+            'EMA_12': self.ema_12.value,
+            'EMA_26': self.ema_26.value,
+            'MACD': macd,
+            'MACD_Signal': signal,
+            'MACD_Histogram': macd - signal,
+            'BB_Upper': middle + 2 * std,
+            'BB_Lower': middle - 2 * std,
+            'BB_Middle': middle,
+            'Volume_SMA': self.volume_sma.value,
+        }
+        return self.last
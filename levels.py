@@ -0,0 +1,213 @@
+"""Support / resistance levels from swing pivots.
+
+A swing high is a bar whose High is above the `order` bars before it and
+not below the `order` bars after it (swing lows mirror this on Low). Pivots
+whose prices lie within `tolerance` (fractional) of each other are clustered
+into one level with a touch count and a strength score that decays with the
+age of the last touch.
+
+find_levels() does the whole history in a few vectorized passes;
+LevelTracker keeps the levels current bar by bar without re-clustering.
+"""
+import bisect
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_ORDER = 5
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_HALF_LIFE = 250   # bars until an untouched level counts half
+
+LEVEL_COLUMNS = ['price', 'touches', 'strength', 'last_touch']
+
+
+def swing_pivots(high, low, order=DEFAULT_ORDER):
+    """Bar positions of swing highs and swing lows"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    if n < 2 * order + 1:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    # window_max[j] = max(high[j:j + order]); the left window of bar i starts
+    # at i - order, the right one at i + 1
+    centre = slice(order, n - order)
+    window_max = sliding_window_view(high, order).max(axis=1)
+    window_min = sliding_window_view(low, order).min(axis=1)
+    highs = ((high[centre] > window_max[:n - 2 * order]) &
+             (high[centre] >= window_max[order + 1:]))
+    lows = ((low[centre] < window_min[:n - 2 * order]) &
+            (low[centre] <= window_min[order + 1:]))
+    return np.flatnonzero(highs) + order, np.flatnonzero(lows) + order
+
+
+def cluster_levels(prices, positions, n_bars, tolerance=DEFAULT_TOLERANCE,
+                   half_life=DEFAULT_HALF_LIFE):
+    """Group pivot prices into levels no wider than `tolerance`
+
+    Pivots are sorted by price; each level starts at the lowest unassigned
+    pivot and takes every pivot up to tolerance above it (one searchsorted
+    per level, so chains of close pivots can't merge into one wide band).
+    """
+    if len(prices) == 0:
+        return pd.DataFrame(columns=LEVEL_COLUMNS)
+    order = np.argsort(prices)
+    prices = np.asarray(prices, dtype=np.float64)[order]
+    positions = np.asarray(positions)[order]
+
+    starts = []
+    start = 0
+    while start < len(prices):
+        starts.append(start)
+        start = np.searchsorted(prices, prices[start] * (1 + tolerance), side='right')
+    starts = np.asarray(starts)
+    touches = np.diff(np.append(starts, len(prices)))
+    level = np.add.reduceat(prices, starts) / touches
+    last_touch = np.maximum.reduceat(positions, starts)
+    return pd.DataFrame({
+        'price': level,
+        'touches': touches,
+        'strength': _strength(touches, last_touch, n_bars, half_life),
+        'last_touch': last_touch,
+    })
+
+
+def _strength(touches, last_touch, n_bars, half_life):
+    return touches * 0.5 ** ((n_bars - 1 - np.asarray(last_touch)) / half_life)
+
+
+def find_levels(df, order=DEFAULT_ORDER, tolerance=DEFAULT_TOLERANCE, half_life=DEFAULT_HALF_LIFE):
+    """Support/resistance levels of a bar frame, strongest first"""
+    highs, lows = swing_pivots(df['High'].to_numpy(), df['Low'].to_numpy(), order)
+    prices = np.concatenate((df['High'].to_numpy()[highs], df['Low'].to_numpy()[lows]))
+    positions = np.concatenate((highs, lows))
+    levels = cluster_levels(prices, positions, len(df), tolerance, half_life)
+    return levels.sort_values('strength', ascending=False, ignore_index=True)
+
+
+def nearest_levels(levels, price):
+    """(support, resistance): closest level below and above `price`, NaN if none"""
+    below = levels.loc[levels['price'] <= price, 'price']
+    above = levels.loc[levels['price'] > price, 'price']
+    return (below.max() if len(below) else np.nan,
+            above.min() if len(above) else np.nan)
+
+
+class LevelTracker:
+    """Incremental levels: new bars only add pivots near the end of the series
+
+    Each confirmed pivot joins the nearest existing level within `tolerance`
+    (moving its price to the mean of its touches) or starts a new one, so an
+    update costs O(order + log levels) instead of a full re-cluster.
+    """
+
+    def __init__(self, order=DEFAULT_ORDER, tolerance=DEFAULT_TOLERANCE, half_life=DEFAULT_HALF_LIFE):
+        self.order = order
+        self.tolerance = tolerance
+        self.half_life = half_life
+        self.n_bars = 0
+        self._high = []     # last 2 * order + 1 bars, enough to confirm the next pivot
+        self._low = []
+        self._prices = []   # sorted level prices
+        self._sums = []
+        self._touches = []
+        self._last = []
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        tracker = cls(**kwargs)
+        levels = find_levels(df, tracker.order, tracker.tolerance, tracker.half_life)
+        levels = levels.sort_values('price')
+        tracker._prices = levels['price'].tolist()
+        tracker._touches = levels['touches'].tolist()
+        tracker._sums = (levels['price'] * levels['touches']).tolist()
+        tracker._last = levels['last_touch'].tolist()
+        tracker.n_bars = len(df)
+        window = 2 * tracker.order
+        tracker._high = df['High'].to_numpy()[-window:].tolist()
+        tracker._low = df['Low'].to_numpy()[-window:].tolist()
+        return tracker
+
+    def update(self, high, low):
+        """Add one bar; confirms the pivot candidate `order` bars back"""
+        self._high.append(float(high))
+        self._low.append(float(low))
+        self.n_bars += 1
+        size = 2 * self.order + 1
+        if len(self._high) > size:
+            del self._high[0], self._low[0]
+        if len(self._high) == size:
+            k, position = self.order, self.n_bars - 1 - self.order
+            h, l = self._high, self._low
+            if h[k] > max(h[:k]) and h[k] >= max(h[k + 1:]):
+                self._add_pivot(h[k], position)
+            if l[k] < min(l[:k]) and l[k] <= min(l[k + 1:]):
+                self._add_pivot(l[k], position)
+
+    def _add_pivot(self, price, position):
+        i = bisect.bisect_left(self._prices, price)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self._prices)]
+        nearest = min(candidates, key=lambda j: abs(self._prices[j] - price), default=None)
+        if nearest is not None and abs(self._prices[nearest] - price) <= self.tolerance * min(self._prices[nearest], price):
+            self._sums[nearest] += price
+            self._touches[nearest] += 1
+            self._last[nearest] = position
+            self._prices[nearest] = self._sums[nearest] / self._touches[nearest]
+        else:
+            self._prices.insert(i, price)
+            self._sums.insert(i, price)
+            self._touches.insert(i, 1)
+            self._last.insert(i, position)
+
+    def levels(self):
+        """Current levels, strongest first"""
+        touches = np.asarray(self._touches)
+        levels = pd.DataFrame({
+            'price': self._prices,
+            'touches': touches,
+            'strength': _strength(touches, self._last, self.n_bars, self.half_life),
+            'last_touch': self._last,
+        }, columns=LEVEL_COLUMNS)
+        return levels.sort_values('strength', ascending=False, ignore_index=True)
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_root):
+    global _worker_cache
+    from data_cache import OHLCVCache
+
+    _worker_cache = OHLCVCache(root=cache_root)
+
+
+def _levels_chunk(symbols, period, kwargs):
+    results = {}
+    for symbol in symbols:
+        try:
+            df = _worker_cache.history(symbol, period=period)
+        except Exception:
+            continue
+        if not df.empty:
+            levels = find_levels(df, **kwargs)
+            support, resistance = nearest_levels(levels, df['Close'].iloc[-1])
+            results[symbol] = (levels, support, resistance)
+    return results
+
+
+def levels_for_universe(symbols, period='1y', chunk_size=50, max_workers=None, cache_root=None, **kwargs):
+    """{symbol: (levels, support, resistance)} for a whole universe, on a process pool"""
+    from data_cache import get_cache
+
+    cache_root = cache_root or get_cache().root
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(cache_root,)) as pool:
+        futures = [pool.submit(_levels_chunk, chunk, period, kwargs) for chunk in chunks]
+        for future in as_completed(futures):
+            results.update(future.result())
+    return results
@@ -0,0 +1,67 @@
+"""Load test for the Flask backend's /ltp endpoint.
+
+Start the backend in paper-trade mode (optionally with PAPER_LATENCY=0.05 to
+simulate the broker round trip), then:
+
+    python loadtest.py --symbols 50 --concurrency 16 --duration 10
+    python loadtest.py --symbols 50 --single     # one request per symbol, as before
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import requests
+
+
+def worker(url, symbols, single, deadline, latencies, errors):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if single:
+                # The old pattern: one round trip per watchlist symbol
+                for symbol in symbols:
+                    session.get(f"{url}/ltp", params={"symbol": symbol}).raise_for_status()
+            else:
+                session.get(f"{url}/ltp", params={"symbols": ",".join(symbols)}).raise_for_status()
+        except requests.RequestException:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--symbols", type=int, default=50, help="watchlist size")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--single", action="store_true", help="one request per symbol")
+    args = parser.parse_args()
+
+    symbols = [f"NSE:SYM{i}" for i in range(args.symbols)]
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker,
+                                args=(args.url, symbols, args.single, deadline, latencies, errors))
+               for _ in range(args.concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if not latencies:
+        print(f"No successful requests ({len(errors)} errors)")
+        return
+    ms = np.array(latencies) * 1000
+    mode = "single" if args.single else "batch"
+    print(f"{mode}: {len(ms)} watchlist refreshes of {args.symbols} symbols in {elapsed:.1f}s")
+    print(f"  {len(ms) / elapsed:,.1f} refreshes/s  "
+          f"p50={np.percentile(ms, 50):.1f}ms  p99={np.percentile(ms, 99):.1f}ms  errors={len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Pages of the Indian Market Chart Analyzer (streamlit_app.py, zerodha integration code).
+
+Each page is a function of the `streamlit` module. The entry scripts import
+this module the first time one of its pages is shown (see startup.py), so
+pandas, Plotly and the analysis modules are not loaded for pages that don't
+need them.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from breadth import market_breadth
+from data_cache import get_history, get_history_many, price_changes
+from downsample import chart_frame, chart_line
+from profiling import show_chart, stage
+from scanner import load_universe, scan_universe
+
+INDICES = {"NIFTY 50": "^NSEI", "SENSEX": "^BSESN", "BANK NIFTY": "^NSEBANK"}
+
+
+def market_overview(st):
+    st.header("Market Overview")
+    
+    # Market indices
+    with stage('fetch', 'indices'):
+        indices = get_history_many(list(INDICES.values()), period="1y").frame
+    changes = price_changes(indices)
+    for col, (name, symbol) in zip(st.columns(len(INDICES)), INDICES.items()):
+        with col:
+            if symbol in changes.index:
+                st.metric(name, f"{changes.loc[symbol, 'current']:,.2f}",
+                          f"{changes.loc[symbol, 'change_pct']:+.2f}%")
+            else:
+                st.metric(name, "---", "N/A")
+    
+    # Breadth of the scan universe, kept up to date bar by bar (see breadth.py)
+    universe = load_universe()
+    with stage('compute', 'breadth'):
+        breadth = market_breadth(universe)
+    if breadth is not None:
+        latest = breadth.latest()
+        correlation = breadth.correlation()
+        pairs = correlation.values[~np.eye(len(correlation), dtype=bool)]
+        st.subheader(f"Market Breadth ({len(breadth.symbols)} stocks)")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Advances / Declines", f"{latest['advances']:.0f} / {latest['declines']:.0f}")
+        with col2:
+            st.metric("Above SMA 50", f"{latest['pct_above_sma']:.0f}%")
+        with col3:
+            st.metric("52W Highs / Lows", f"{latest['new_highs']:.0f} / {latest['new_lows']:.0f}")
+        with col4:
+            st.metric("Avg Correlation (60d)", f"{np.nanmean(pairs):.2f}" if len(pairs) else "N/A")
+        
+        history = breadth.history
+        col1, col2 = st.columns(2)
+        with col1:
+            with stage('figure', 'ad line'):
+                fig_ad = go.Figure(go.Scatter(x=history.index, y=history['ad_line'], name="A/D Line"))
+                fig_ad.update_layout(title="Advance/Decline Line", height=300)
+            show_chart(st, fig_ad, 'ad line')
+        with col2:
+            with stage('figure', 'above sma'):
+                fig_sma = go.Figure(go.Scatter(x=history.index, y=history['pct_above_sma'],
+                                               name="% above SMA 50"))
+                fig_sma.update_layout(title="% of Stocks above SMA 50", height=300,
+                                      yaxis_range=[0, 100])
+            show_chart(st, fig_sma, 'above sma')
+        
+        with st.expander("Correlation Matrix (last 60 daily returns)"):
+            # Readable up to ~50 names; larger universes show the first 50
+            shown = correlation.iloc[:50, :50]
+            labels = [symbol.removesuffix(".NS") for symbol in shown.index]
+            with stage('figure', 'correlation'):
+                fig_corr = go.Figure(go.Heatmap(z=shown.values, x=labels, y=labels,
+                                                zmin=-1, zmax=1, colorscale="RdBu"))
+                fig_corr.update_layout(height=700)
+            show_chart(st, fig_corr, 'correlation')
+    
+    # NIFTY 50 chart
+    if "^NSEI" in indices.columns.get_level_values(0):
+        with stage('figure', 'overview'):
+            data = chart_frame(indices["^NSEI"].dropna())
+            fig = go.Figure(data=[go.Candlestick(
+                x=data.index,
+                open=data['Open'],
+                high=data['High'],
+                low=data['Low'],
+                close=data['Close']
+            )])
+            fig.update_layout(title="NIFTY 50")
+        show_chart(st, fig, 'overview')
+
+
+def stock_analysis(st):
+    st.header("Stock Analysis")
+    
+    # Stock selector
+    stock_symbol = st.text_input("Enter Stock Symbol (e.g., RELIANCE.NS, TCS.NS):", "RELIANCE.NS")
+    
+    if stock_symbol:
+        try:
+            # Get real data from Yahoo Finance
+            with stage('fetch', stock_symbol):
+                hist = get_history(stock_symbol, period="6mo")
+            
+            if not hist.empty:
+                # Display basic info
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Current Price", f"₹{hist['Close'][-1]:.2f}")
+                with col2:
+                    change = hist['Close'][-1] - hist['Close'][-2]
+                    st.metric("Change", f"₹{change:.2f}")
+                with col3:
+                    st.metric("Volume", f"{hist['Volume'][-1]:,}")
+                
+                # Candlestick chart
+                with stage('figure', 'price'):
+                    candles = chart_frame(hist)
+                    fig = go.Figure(data=[go.Candlestick(
+                        x=candles.index,
+                        open=candles['Open'],
+                        high=candles['High'],
+                        low=candles['Low'],
+                        close=candles['Close'],
+                        name=stock_symbol
+                    )])
+                    fig.update_layout(title=f"{stock_symbol} Price Chart")
+                show_chart(st, fig, 'price')
+                
+                # Technical indicators
+                st.subheader("Technical Indicators")
+                
+                # Calculate simple moving averages
+                with stage('compute', 'moving averages'):
+                    hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
+                    hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
+                
+                with stage('figure', 'moving averages'):
+                    fig_indicators = go.Figure()
+                    for column, name in [('Close', 'Close'), ('SMA_20', 'SMA 20'), ('SMA_50', 'SMA 50')]:
+                        series = chart_line(hist[column])
+                        fig_indicators.add_trace(go.Scatter(x=series.index, y=series, name=name))
+                    fig_indicators.update_layout(title="Moving Averages")
+                show_chart(st, fig_indicators, 'moving averages')
+                
+            else:
+                st.error("No data found for this symbol")
+                
+        except Exception as e:
+            st.error(f"Error fetching data: {e}")
+
+
+def technical_scanner(st):
+    st.header("Technical Scanner")
+    st.info("This feature will scan stocks based on technical criteria")
+    
+    # Scanner criteria
+    st.subheader("Scan Criteria")
+    col1, col2 = st.columns(2)
+    with col1:
+        rsi_min = st.slider("Minimum RSI", 0, 100, 30)
+        rsi_max = st.slider("Maximum RSI", 0, 100, 70)
+    with col2:
+        volume_multiplier = st.slider("Volume Multiplier", 1.0, 5.0, 2.0)
+    
+    if st.button("Run Scan"):
+        universe = load_universe()
+        progress = st.progress(0.0, text=f"Scanning {len(universe)} stocks...")
+        table = st.empty()
+        matches = []
+        scanned = 0
+        failed = {}
+        # Matches are streamed into the table as each chunk finishes
+        for chunk in scan_universe(universe, rsi_min, rsi_max, volume_multiplier):
+            scanned += chunk.scanned
+            failed.update(chunk.errors)
+            if not chunk.matches.empty:
+                matches.append(chunk.matches)
+                table.dataframe(pd.concat(matches).sort_values('Volume Ratio', ascending=False)
+                                .round(2), use_container_width=True, hide_index=True)
+            progress.progress(scanned / len(universe), text=f"Scanned {scanned}/{len(universe)}")
+
+        found = sum(len(m) for m in matches)
+        st.success(f"Scan completed! {found} of {len(universe)} stocks match")
+        if failed:
+            st.caption(f"Skipped {len(failed)} symbols without data: {', '.join(sorted(failed))}")
+
+
+def warm():
+    """Fill the process-wide caches the Market Overview reads"""
+    get_history_many(list(INDICES.values()), period="1y")
+    market_breadth(load_universe())
@@ -0,0 +1,124 @@
+"""Process-wide memoization of figures and analysis results.
+
+Results are keyed on a cheap fingerprint of the bar frame (symbol, length,
+last timestamp, last bar) plus the parameters used, so a Streamlit rerun or
+a tab switch over unchanged data is a dictionary lookup. Memory is bounded
+by an approximate byte budget with least-recently-used eviction.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(os.environ.get('MEMO_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def fingerprint(df, symbol=None, *params):
+    """O(1) identity of a bar frame: symbol, length, first/last timestamp and last bar"""
+    if df is None or len(df) == 0:
+        return (symbol, 0) + params
+    last = df.iloc[-1]
+    bar = tuple(float(last[c]) for c in ('Open', 'High', 'Low', 'Close', 'Volume') if c in df)
+    return (symbol, len(df), df.index[0], df.index[-1], bar) + params
+
+
+def sizeof(value):
+    """Rough size in bytes of a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage().sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, 'data') and hasattr(value, 'layout'):
+        # Plotly figures: counted from the trace arrays, not by serializing
+        return 1024 + sum(_trace_size(trace) for trace in value.data)
+    if isinstance(value, (list, tuple)):
+        return 64 + sum(sizeof(v) for v in value)
+    if isinstance(value, str):
+        return len(value)
+    return 64
+
+
+# Roughly what a number or timestamp takes in the figure's JSON
+JSON_BYTES_PER_VALUE = 20
+
+
+def _trace_size(trace):
+    size = 256
+    for value in trace.to_plotly_json().values():
+        if isinstance(value, np.ndarray):
+            size += value.size * JSON_BYTES_PER_VALUE
+        elif isinstance(value, (list, tuple)):
+            size += len(value) * JSON_BYTES_PER_VALUE
+    return size
+
+
+class LRUCache:
+    """Byte-bounded LRU cache with hit/miss counters"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size=None):
+        size = sizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._items),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+cache = LRUCache()
+_MISSING = object()
+
+
+def memoize(kind, key, compute):
+    """Return the cached result of `kind` for `key`, computing it on a miss"""
+    full_key = (kind, key)
+    value = cache.get(full_key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.put(full_key, value)
+    return value
@@ -0,0 +1,460 @@
+"""Order management: an asyncio gateway in front of the broker.
+
+Requests go through a queue to a few worker tasks. Each worker waits for a
+slot in every rate limit before it calls the broker (Kite allows 10 order
+requests a second and 200 a minute), so bursts are smoothed instead of
+rejected. Kite has no batch order endpoint; what can be combined is:
+
+- cancelling or modifying an order still waiting in the queue is done
+  locally, without a request
+- order status for every open order comes from one orders() call (refresh)
+
+Brokers: KiteBroker wraps KiteConnect; SimulatedExchange is a local
+matching engine that fills market orders at the last quote and rests limit
+orders until a replayed or live quote crosses them, so throughput and
+latency can be tested offline. It also keeps paper-trade positions.
+"""
+import asyncio
+import atexit
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+
+# Order states, named as in Kite's order book
+PENDING = 'PENDING'      # queued here, not yet sent to the broker
+OPEN = 'OPEN'            # accepted by the broker, waiting for a fill
+COMPLETE = 'COMPLETE'
+CANCELLED = 'CANCELLED'
+REJECTED = 'REJECTED'
+FINAL_STATES = {COMPLETE, CANCELLED, REJECTED}
+
+BUY, SELL = 'BUY', 'SELL'
+MARKET, LIMIT = 'MARKET', 'LIMIT'
+
+# (requests, seconds) for each limit the broker enforces
+KITE_ORDER_LIMITS = [(10, 1.0), (200, 60.0)]
+# Seconds added to each window: the broker counts requests when they arrive,
+# which is later than the grant by a thread hop and the network's jitter
+LIMIT_MARGIN = 0.1
+
+
+class OrderError(Exception):
+    """Raised for requests the gateway or broker refused"""
+
+
+class Order:
+    """One order and its current state"""
+
+    def __init__(self, order_id, symbol, side, qty, order_type=MARKET, price=None):
+        self.order_id = order_id
+        self.broker_id = None
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.order_type = order_type
+        self.price = price
+        self.status = PENDING
+        self.filled_qty = 0
+        self.average_price = None
+        self.message = None
+        self.placed_at = time.time()
+        self.updated_at = self.placed_at
+
+    def to_dict(self):
+        return {
+            'order_id': self.order_id, 'broker_id': self.broker_id, 'symbol': self.symbol,
+            'side': self.side, 'qty': self.qty, 'order_type': self.order_type, 'price': self.price,
+            'status': self.status, 'filled_qty': self.filled_qty, 'average_price': self.average_price,
+            'message': self.message, 'placed_at': self.placed_at, 'updated_at': self.updated_at,
+        }
+
+
+class RateLimiter:
+    """At most `calls` acquisitions in any sliding window of `period` seconds
+
+    A token bucket refilled at calls/period would let a full burst plus the
+    refill through within one second; the broker counts a sliding window.
+    """
+
+    def __init__(self, calls, period=1.0, clock=time.monotonic, margin=LIMIT_MARGIN):
+        self.calls = calls
+        self.period = period
+        self.clock = clock
+        # Grants are spaced over period + margin, so arrivals stay within the limit
+        self.window = period + margin
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                while self._sent and now - self._sent[0] >= self.window:
+                    self._sent.popleft()
+                if len(self._sent) < self.calls:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self.window - (now - self._sent[0]))
+
+
+# ------ brokers ------
+#
+# A broker implements place(order) -> broker_id, modify(order, qty, price),
+# cancel(order), orders() -> {broker_id: (status, filled_qty, average_price)}
+# and positions() -> {symbol: qty}. Calls may block; the gateway runs them
+# in a thread.
+
+class KiteBroker:
+    """Orders through KiteConnect; symbols are 'EXCHANGE:TRADINGSYMBOL'"""
+
+    def __init__(self, kite, product='CNC', variety='regular'):
+        self.kite = kite
+        self.product = product
+        self.variety = variety
+
+    def place(self, order):
+        exchange, tradingsymbol = order.symbol.split(':', 1)
+        return self.kite.place_order(
+            variety=self.variety, exchange=exchange, tradingsymbol=tradingsymbol,
+            transaction_type=order.side, quantity=order.qty, order_type=order.order_type,
+            product=self.product, price=order.price)
+
+    def modify(self, order, qty=None, price=None):
+        self.kite.modify_order(variety=self.variety, order_id=order.broker_id,
+                               quantity=qty, price=price)
+
+    def cancel(self, order):
+        self.kite.cancel_order(variety=self.variety, order_id=order.broker_id)
+
+    def orders(self):
+        return {o['order_id']: (o['status'], o['filled_quantity'], o['average_price'])
+                for o in self.kite.orders()}
+
+    def positions(self):
+        return {f"{p['exchange']}:{p['tradingsymbol']}": p['quantity']
+                for p in self.kite.positions()['net'] if p['quantity']}
+
+
+class SimulatedExchange:
+    """Local matching engine fed with quotes (live, replayed or from `quote`)
+
+    Market orders fill at the last quote for their symbol, moved against the
+    order by `slippage_bps`; without a quote they ask `quote(symbol)` and
+    reject if that has none. Limit orders fill when a quote reaches their
+    price. `latency` (seconds) is added to every request.
+    """
+
+    def __init__(self, quote=None, latency=0.0, slippage_bps=0.0, instruments=None):
+        self.quote = quote
+        self.latency = latency
+        self.slippage_bps = slippage_bps
+        self.instruments = instruments or {}   # instrument_token -> symbol, for ticks
+        self.last = {}                         # symbol -> last price
+        self.positions_ = defaultdict(int)
+        self.fills = []                        # (broker_id, symbol, side, qty, price, time)
+        self.on_update = None                  # set by the gateway
+        self._resting = defaultdict(dict)      # symbol -> {broker_id: order}
+        self._state = {}                       # broker_id -> [status, filled, average]
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def place(self, order):
+        if self.latency:
+            time.sleep(self.latency)
+        broker_id = f"SIM{next(self._ids)}"
+        with self._lock:
+            self._state[broker_id] = [OPEN, 0, None]
+        order.broker_id = broker_id
+        if order.order_type == MARKET:
+            price = self.last.get(order.symbol)
+            if price is None and self.quote is not None:
+                price = self.quote(order.symbol)
+            if price is None:
+                self._update(broker_id, REJECTED, 0, None)
+                raise OrderError(f"No quote for {order.symbol}")
+            slip = self.slippage_bps / 10000 * (1 if order.side == BUY else -1)
+            self._fill(order, price * (1 + slip))
+        else:
+            with self._lock:
+                self._resting[order.symbol][broker_id] = order
+            self._match(order.symbol)
+        return broker_id
+
+    def modify(self, order, qty=None, price=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if order.broker_id not in self._resting[order.symbol]:
+                raise OrderError(f"Order {order.order_id} is not open")
+            if qty is not None:
+                order.qty = qty
+            if price is not None:
+                order.price = price
+        self._match(order.symbol)
+
+    def cancel(self, order):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._resting[order.symbol].pop(order.broker_id, None) is None:
+                raise OrderError(f"Order {order.order_id} is not open")
+        self._update(order.broker_id, CANCELLED, 0, None)
+
+    def orders(self):
+        with self._lock:
+            return {broker_id: tuple(state) for broker_id, state in self._state.items()}
+
+    def positions(self):
+        with self._lock:
+            return {symbol: qty for symbol, qty in self.positions_.items() if qty}
+
+    # ------ quotes ------
+    def on_quote(self, symbol, price):
+        self.last[symbol] = price
+        if self._resting.get(symbol):
+            self._match(symbol)
+
+    def on_ticks(self, ticks):
+        """KiteTicker-style ticks; instrument tokens are mapped through `instruments`"""
+        for tick in ticks:
+            symbol = self.instruments.get(tick['instrument_token'], tick['instrument_token'])
+            self.on_quote(symbol, tick['last_price'])
+
+    def _match(self, symbol):
+        price = self.last.get(symbol)
+        if price is None:
+            return
+        with self._lock:
+            crossed = [order for order in self._resting[symbol].values()
+                       if (order.side == BUY and price <= order.price) or
+                          (order.side == SELL and price >= order.price)]
+            for order in crossed:
+                del self._resting[symbol][order.broker_id]
+        for order in crossed:
+            # A resting limit order fills at its own price
+            self._fill(order, order.price)
+
+    def _fill(self, order, price):
+        with self._lock:
+            self.positions_[order.symbol] += order.qty if order.side == BUY else -order.qty
+            self.fills.append((order.broker_id, order.symbol, order.side, order.qty, price, time.time()))
+        self._update(order.broker_id, COMPLETE, order.qty, price)
+
+    def _update(self, broker_id, status, filled, average):
+        with self._lock:
+            self._state[broker_id] = [status, filled, average]
+        if self.on_update is not None:
+            self.on_update(broker_id, status, filled, average)
+
+
+# ------ gateway ------
+
+class OrderGateway:
+    """Queue, rate-limit and track orders for one broker
+
+    All coroutines run on the gateway's event loop; GatewayThread gives
+    synchronous callers (Flask handlers) a loop of their own.
+    """
+
+    def __init__(self, broker, limits=KITE_ORDER_LIMITS, workers=4):
+        self.broker = broker
+        self.limits = limits
+        self.workers = workers
+        self.orders = {}        # order_id -> Order
+        self._by_broker_id = {}  # broker_id -> Order, from the broker's acknowledgement
+        self._unmatched = {}    # broker_id -> latest (status, filled, average) not matched yet
+        self._booked = {}       # broker_id -> state already booked before its acknowledgement
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queue = None
+        self._tasks = []
+        self._fill_listeners = []
+        if hasattr(broker, 'on_update'):
+            broker.on_update = self._apply
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._limiters = [RateLimiter(calls, period) for calls, period in self.limits]
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ------ requests ------
+    async def place(self, symbol, side, qty, order_type=MARKET, price=None):
+        """Queue an order; returns it once the broker has acknowledged it"""
+        if side not in (BUY, SELL):
+            raise OrderError(f"Unknown side {side!r}")
+        if qty <= 0:
+            raise OrderError("Quantity must be positive")
+        if order_type == LIMIT and price is None:
+            raise OrderError("Limit orders need a price")
+        order = Order(f"L{next(self._ids)}", symbol, side, qty, order_type, price)
+        with self._lock:
+            self.orders[order.order_id] = order
+        await self._submit('place', order)
+        return order
+
+    async def modify(self, order_id, qty=None, price=None):
+        order = self._get(order_id)
+        with self._lock:
+            if order.status == PENDING:
+                # Not sent yet: the queued request goes out with the new values
+                order.qty = qty if qty is not None else order.qty
+                order.price = price if price is not None else order.price
+                order.updated_at = time.time()
+                return order
+        await self._submit('modify', order, qty=qty, price=price)
+        return order
+
+    async def cancel(self, order_id):
+        order = self._get(order_id)
+        with self._lock:
+            if order.status == PENDING:
+                self._set(order, CANCELLED, message='Cancelled before it was sent')
+                return order
+        await self._submit('cancel', order)
+        return order
+
+    async def refresh(self):
+        """Update every open order from one broker orders() call"""
+        await self._limits_acquire()
+        states = await asyncio.to_thread(self.broker.orders)
+        for broker_id, (status, filled, average) in states.items():
+            self._apply(broker_id, status, filled, average)
+
+    def positions(self):
+        return self.broker.positions()
+
+    def subscribe_fills(self, callback):
+        """callback(order, qty, price) for each newly filled quantity"""
+        self._fill_listeners.append(callback)
+
+    def mark_booked(self, states):
+        """Take broker orders() states as already booked (e.g. in positions loaded
+        from the broker): orders move to them without notifying fill listeners"""
+        with self._lock:
+            for broker_id, (status, filled, average) in states.items():
+                self._unmatched.pop(broker_id, None)
+                order = self._by_broker_id.get(broker_id)
+                if order is None:
+                    self._booked[broker_id] = (status, filled, average)
+                elif filled >= order.filled_qty:
+                    order.filled_qty = filled
+                    order.average_price = average
+                    if not (order.status in FINAL_STATES and status not in FINAL_STATES):
+                        self._set(order, status)
+
+    # ------ internals ------
+    def _get(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            raise OrderError(f"Unknown order {order_id}")
+        if order.status in FINAL_STATES:
+            raise OrderError(f"Order {order_id} is already {order.status}")
+        return order
+
+    async def _submit(self, action, order, **kwargs):
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((action, order, kwargs, done))
+        await done
+
+    async def _limits_acquire(self):
+        for limiter in self._limiters:
+            await limiter.acquire()
+
+    async def _worker(self):
+        while True:
+            action, order, kwargs, done = await self._queue.get()
+            try:
+                if action == 'place' and order.status == CANCELLED:
+                    done.set_result(order)
+                    continue
+                await self._limits_acquire()
+                if action == 'place':
+                    broker_id = await asyncio.to_thread(self.broker.place, order)
+                    with self._lock:
+                        order.broker_id = broker_id
+                        self._by_broker_id[broker_id] = order
+                        if order.status == PENDING:
+                            self._set(order, OPEN)
+                        booked = self._booked.pop(broker_id, None)
+                        if booked is not None:
+                            order.filled_qty, order.average_price = booked[1], booked[2]
+                        early = self._unmatched.pop(broker_id, None)
+                    if early is not None:
+                        self._apply(broker_id, *early)
+                elif action == 'modify':
+                    await asyncio.to_thread(self.broker.modify, order, **kwargs)
+                    with self._lock:
+                        order.qty = kwargs['qty'] if kwargs['qty'] is not None else order.qty
+                        order.price = kwargs['price'] if kwargs['price'] is not None else order.price
+                        order.updated_at = time.time()
+                else:
+                    await asyncio.to_thread(self.broker.cancel, order)
+                    with self._lock:
+                        self._set(order, CANCELLED)
+                done.set_result(order)
+            except Exception as e:
+                with self._lock:
+                    if action == 'place':
+                        self._set(order, REJECTED, message=str(e))
+                    else:
+                        order.message = str(e)
+                done.set_exception(e if isinstance(e, OrderError) else OrderError(str(e)))
+            finally:
+                self._queue.task_done()
+
+    def _apply(self, broker_id, status, filled, average):
+        """Broker-side state change (fill, cancel); may come from any thread"""
+        with self._lock:
+            order = self._by_broker_id.get(broker_id)
+            if order is None:
+                # Fills can arrive before place() returns the broker id; the
+                # acknowledgement applies them. Orders placed elsewhere stay here.
+                self._unmatched[broker_id] = (status, filled, average)
+                return
+            if order.status in FINAL_STATES and status not in FINAL_STATES:
+                return
+            new_qty = filled - order.filled_qty
+            if new_qty > 0:
+                # Price of just this fill, from the change in average price
+                done_value = order.filled_qty * (order.average_price or 0.0)
+                fill_price = (filled * average - done_value) / new_qty
+            order.filled_qty = filled
+            order.average_price = average
+            self._set(order, status)
+        if new_qty > 0:
+            for callback in self._fill_listeners:
+                callback(order, new_qty, fill_price)
+
+    @staticmethod
+    def _set(order, status, message=None):
+        order.status = status
+        if message is not None:
+            order.message = message
+        order.updated_at = time.time()
+
+
+class GatewayThread:
+    """Run a gateway's event loop in a daemon thread for synchronous callers"""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self.call(gateway.start())
+        atexit.register(self.stop)
+
+    def call(self, coro, timeout=30):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.call(self.gateway.stop())
+            self.loop.call_soon_threadsafe(self.loop.stop)
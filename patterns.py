@@ -0,0 +1,127 @@
+import numpy as np
+from collections import namedtuple
+
+# Candlestick pattern engine (vectorized over the whole OHLC frame)
+#
+# Every pattern is a boolean mask over the bar arrays; a bar gets the first
+# pattern that matches in PATTERNS order, so multi-candle patterns win over
+# the single-candle ones they contain.
+
+NO_PATTERN = 0
+
+# (code, name, signal) - code 0 is reserved for "no pattern"
+PATTERNS = [
+    (1, 'Three White Soldiers', '🟢'),
+    (2, 'Three Black Crows', '🔴'),
+    (3, 'Morning Star', '🟢'),
+    (4, 'Evening Star', '🔴'),
+    (5, 'Bullish Engulfing', '🟢'),
+    (6, 'Bearish Engulfing', '🔴'),
+    (7, 'Hammer (Bullish)', '🟢'),
+    (8, 'Shooting Star (Bearish)', '🔴'),
+    (9, 'Doji', '⚪'),
+]
+
+PATTERN_NAMES = {code: name for code, name, _ in PATTERNS}
+PATTERN_SIGNALS = {code: signal for code, _, signal in PATTERNS}
+
+PatternResult = namedtuple('PatternResult', ['index', 'code'])
+
+
+def _shift(a, n):
+    """Shift an array right by n bars, padding the start with NaN"""
+    out = np.empty_like(a)
+    out[:n] = np.nan
+    out[n:] = a[:-n]
+    return out
+
+
+def pattern_masks(o, h, l, c, doji_ratio=0.1, star_body_ratio=0.3):
+    """Return a dict of code -> boolean mask for every known pattern"""
+    o = np.asarray(o, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    l = np.asarray(l, dtype=np.float64)
+    c = np.asarray(c, dtype=np.float64)
+
+    body = np.abs(c - o)
+    rng = h - l
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    bull = c > o
+    bear = c < o
+
+    o1, c1, body1 = _shift(o, 1), _shift(c, 1), _shift(body, 1)
+    o2, c2, body2 = _shift(o, 2), _shift(c, 2), _shift(body, 2)
+
+    with np.errstate(invalid='ignore'):
+        # NaN padding makes every comparison on the first bars False
+        bull1, bear1 = c1 > o1, c1 < o1
+        bull2, bear2 = c2 > o2, c2 < o2
+
+        # Three white soldiers / black crows: three strong candles in a row,
+        # each opening inside the previous body and closing further along
+        soldiers = (bull & bull1 & bull2 &
+                    (c > c1) & (c1 > c2) &
+                    (o > o1) & (o < c1) & (o1 > o2) & (o1 < c2))
+        crows = (bear & bear1 & bear2 &
+                 (c < c1) & (c1 < c2) &
+                 (o < o1) & (o > c1) & (o1 < o2) & (o1 > c2))
+
+        # Morning / evening star: long candle, small "star" body, then a
+        # candle closing beyond the midpoint of the first body
+        small_star = body1 < star_body_ratio * body2
+        morning = (bear2 & small_star & bull &
+                   (np.maximum(o1, c1) < c2) &
+                   (c > (o2 + c2) / 2))
+        evening = (bull2 & small_star & bear &
+                   (np.minimum(o1, c1) > c2) &
+                   (c < (o2 + c2) / 2))
+
+        # Engulfing
+        bull_engulf = bear1 & bull & (o < c1) & (c > o1)
+        bear_engulf = bull1 & bear & (o > c1) & (c < o1)
+
+        # Hammer / shooting star: shadow at least twice the body
+        hammer = bull & ((bottom - l) > 2 * body)
+        shooting = bear & ((h - top) > 2 * body)
+
+        doji = (rng > 0) & (body <= doji_ratio * rng)
+
+    return {
+        1: soldiers,
+        2: crows,
+        3: morning,
+        4: evening,
+        5: bull_engulf,
+        6: bear_engulf,
+        7: hammer,
+        8: shooting,
+        9: doji,
+    }
+
+
+def detect_patterns(o, h, l, c, **kwargs):
+    """Detect candlestick patterns; returns PatternResult(index, code) for matching bars"""
+    n = len(c)
+    codes = np.zeros(n, dtype=np.int8)
+    if n < 3:
+        return PatternResult(np.empty(0, dtype=np.int64), codes[:0])
+
+    masks = pattern_masks(o, h, l, c, **kwargs)
+    # Assign lowest priority first so higher-priority patterns overwrite it
+    for code, _, _ in reversed(PATTERNS):
+        codes[masks[code]] = code
+    # Keep the original behaviour of skipping the first two bars
+    codes[:2] = NO_PATTERN
+
+    index = np.flatnonzero(codes)
+    return PatternResult(index, codes[index])
+
+
+def identify_candlestick_patterns(df):
+    """Identify bullish/bearish candlestick patterns as (date, name, signal) tuples"""
+    result = detect_patterns(df['Open'].to_numpy(), df['High'].to_numpy(),
+                             df['Low'].to_numpy(), df['Close'].to_numpy())
+    dates = df.index[result.index]
+    return [(date, PATTERN_NAMES[code], PATTERN_SIGNALS[code])
+            for date, code in zip(dates, result.code.tolist())]
@@ -0,0 +1,251 @@
+"""Portfolio book with incremental mark-to-market.
+
+Positions are parallel NumPy arrays (quantity, average price, last price,
+day basis, realized P&L) indexed by a symbol -> row map. Book totals
+(market value, unrealized P&L, gross/net exposure, day change) are kept as
+running sums, so a new LTP costs O(1) and a batch of ticks one vectorized
+pass over the rows it touches; nothing is refetched from the broker.
+
+Day change is qty * last - day basis, where the basis starts at
+qty * previous close and moves by each fill's cash flow, so intraday
+trades and overnight holdings are both covered.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_COLUMNS = ['symbol', 'quantity', 'average_price', 'last_price', 'market_value',
+                    'unrealized_pnl', 'realized_pnl', 'day_change', 'day_change_pct', 'weight']
+
+
+class Portfolio:
+    """Positions and running P&L totals, updated per fill and per price"""
+
+    def __init__(self, capacity=64):
+        self.symbols = []
+        self._rows = {}       # symbol -> row
+        self._tokens = {}     # instrument_token -> row, for ticks
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+        self._zero_totals()
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'qty', None)
+        arrays = ['qty', 'avg', 'last', 'basis', 'realized']
+        for name in arrays:
+            values = np.zeros(capacity)
+            if old is not None:
+                values[:len(self.symbols)] = getattr(self, name)[:len(self.symbols)]
+            setattr(self, name, values)
+
+    def _zero_totals(self):
+        self.market_value = 0.0
+        self.unrealized = 0.0
+        self.gross_exposure = 0.0
+        self.day_change = 0.0
+        self.realized_total = 0.0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _row(self, symbol):
+        row = self._rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == len(self.qty):
+                self._allocate(2 * row)
+            self.symbols.append(symbol)
+            self._rows[symbol] = row
+        return row
+
+    # ------ loading ------
+    def load(self, positions):
+        """Replace the book with rows of {symbol, quantity, average_price, close_price, last_price}"""
+        with self._lock:
+            self.symbols, self._rows, self._tokens = [], {}, {}
+            self._allocate(max(len(positions), 64))
+            for position in positions:
+                row = self._row(position['symbol'])
+                qty = position['quantity']
+                last = position.get('last_price') or position['average_price']
+                close = position.get('close_price') or last
+                self.qty[row] = qty
+                self.avg[row] = position['average_price']
+                self.last[row] = last
+                self.basis[row] = qty * close
+                self.realized[row] = position.get('realized_pnl', 0.0)
+            self._revalue()
+
+    def set_tokens(self, tokens):
+        """{symbol: instrument_token} so on_ticks can find rows"""
+        with self._lock:
+            for symbol, token in tokens.items():
+                self._tokens[token] = self._row(symbol)
+
+    def _revalue(self):
+        """Recompute the running totals from the arrays"""
+        n = len(self.symbols)
+        qty, last = self.qty[:n], self.last[:n]
+        self.market_value = float(qty @ last)
+        self.unrealized = float(qty @ (last - self.avg[:n]))
+        self.gross_exposure = float(np.abs(qty) @ last)
+        self.day_change = float(self.market_value - self.basis[:n].sum())
+        self.realized_total = float(self.realized[:n].sum())
+
+    # ------ updates ------
+    def on_ltp(self, symbol, price):
+        """Mark one position to a new last price in O(1)"""
+        row = self._rows.get(symbol)
+        if row is None:
+            return
+        with self._lock:
+            move = price - self.last[row]
+            qty = self.qty[row]
+            self.market_value += qty * move
+            self.unrealized += qty * move
+            self.day_change += qty * move
+            self.gross_exposure += abs(qty) * move
+            self.last[row] = price
+
+    def on_ltps(self, prices):
+        """{symbol: price} batch, as returned by a single ltp() call"""
+        rows = [(self._rows[s], p) for s, p in prices.items() if s in self._rows]
+        if rows:
+            row, price = zip(*rows)
+            self._mark(np.fromiter(row, dtype=np.int64), np.fromiter(price, dtype=np.float64))
+
+    def on_ticks(self, ticks):
+        """KiteTicker-style ticks for instruments registered with set_tokens"""
+        rows, prices = [], []
+        for tick in ticks:
+            row = self._tokens.get(tick['instrument_token'])
+            if row is not None:
+                rows.append(row)
+                prices.append(tick['last_price'])
+        if rows:
+            self._mark(np.asarray(rows, dtype=np.int64), np.asarray(prices, dtype=np.float64))
+
+    def _mark(self, rows, prices):
+        # Only the latest price per row counts within a batch
+        rows, first = np.unique(rows[::-1], return_index=True)
+        prices = prices[::-1][first]
+        with self._lock:
+            move = prices - self.last[rows]
+            qty = self.qty[rows]
+            change = float(qty @ move)
+            self.market_value += change
+            self.unrealized += change
+            self.day_change += change
+            self.gross_exposure += float(np.abs(qty) @ move)
+            self.last[rows] = prices
+
+    def on_fill(self, symbol, qty, price):
+        """Apply a fill: positive qty bought, negative sold"""
+        with self._lock:
+            row = self._row(symbol)
+            if self.last[row] == 0:
+                self.last[row] = price
+            self._remove(row)
+            held, avg = self.qty[row], self.avg[row]
+            if held == 0 or np.sign(held) == np.sign(qty):
+                # Opening or adding: new average cost
+                self.avg[row] = (held * avg + qty * price) / (held + qty)
+            else:
+                closed = min(abs(qty), abs(held)) * np.sign(held)
+                self.realized[row] += closed * (price - avg)
+                if abs(qty) > abs(held):
+                    # Flipped through zero: the rest opens at the fill price
+                    self.avg[row] = price
+            self.qty[row] = held + qty
+            if self.qty[row] == 0:
+                self.avg[row] = 0.0
+            self.basis[row] += qty * price
+            self._add(row)
+
+    def _contribution(self, row):
+        qty, last = self.qty[row], self.last[row]
+        return (qty * last, qty * (last - self.avg[row]), abs(qty) * last,
+                qty * last - self.basis[row], self.realized[row])
+
+    def _remove(self, row):
+        mv, unrealized, gross, day, realized = self._contribution(row)
+        self.market_value -= mv
+        self.unrealized -= unrealized
+        self.gross_exposure -= gross
+        self.day_change -= day
+        self.realized_total -= realized
+
+    def _add(self, row):
+        mv, unrealized, gross, day, realized = self._contribution(row)
+        self.market_value += mv
+        self.unrealized += unrealized
+        self.gross_exposure += gross
+        self.day_change += day
+        self.realized_total += realized
+
+    # ------ views ------
+    def totals(self):
+        """Book-level figures, O(1)"""
+        opening = self.market_value - self.day_change
+        return {
+            'positions': int(np.count_nonzero(self.qty[:len(self.symbols)])),
+            'market_value': float(self.market_value),
+            'unrealized_pnl': float(self.unrealized),
+            'realized_pnl': float(self.realized_total),
+            'gross_exposure': float(self.gross_exposure),
+            'net_exposure': float(self.market_value),
+            'day_change': float(self.day_change),
+            'day_change_pct': float(self.day_change / abs(opening) * 100) if opening else 0.0,
+        }
+
+    def snapshot(self):
+        """One row per position for the UI"""
+        with self._lock:
+            n = len(self.symbols)
+            qty, avg, last = self.qty[:n].copy(), self.avg[:n].copy(), self.last[:n].copy()
+            basis, realized = self.basis[:n].copy(), self.realized[:n].copy()
+            gross = self.gross_exposure
+        market_value = qty * last
+        day_change = market_value - basis
+        with np.errstate(divide='ignore', invalid='ignore'):
+            day_change_pct = np.where(basis != 0, day_change / np.abs(basis) * 100, 0.0)
+        return pd.DataFrame({
+            'symbol': self.symbols[:n],
+            'quantity': qty,
+            'average_price': avg,
+            'last_price': last,
+            'market_value': market_value,
+            'unrealized_pnl': qty * (last - avg),
+            'realized_pnl': realized,
+            'day_change': day_change,
+            'day_change_pct': day_change_pct,
+            'weight': np.abs(market_value) / gross if gross else 0.0,
+        }, columns=SNAPSHOT_COLUMNS)
+
+
+def kite_positions(holdings=(), positions=()):
+    """Book rows from kite.holdings() and kite.positions()['net']
+
+    Holdings are the settled delivery quantity; net positions carry today's
+    trades (and carried-forward F&O), so the two are summed per symbol.
+    """
+    rows = {}
+    for item in list(holdings) + list(positions):
+        quantity = item.get('quantity', 0)
+        if not quantity:
+            continue
+        symbol = f"{item['exchange']}:{item['tradingsymbol']}"
+        row = rows.get(symbol)
+        if row is None:
+            rows[symbol] = {
+                'symbol': symbol, 'quantity': quantity, 'average_price': item['average_price'],
+                'close_price': item.get('close_price'), 'last_price': item.get('last_price'),
+            }
+        else:
+            total = row['quantity'] + quantity
+            if total:
+                row['average_price'] = (row['quantity'] * row['average_price'] +
+                                        quantity * item['average_price']) / total
+            row['quantity'] = total
+    return list(rows.values())
@@ -0,0 +1,187 @@
+"""Opt-in per-rerun timings for the Streamlit pages.
+
+A rerun is one record of stage timings and chart payload sizes:
+
+    recorder = session_recorder(st.session_state)
+    recorder.start(page, enabled=checkbox_value)   # top of the script
+    with stage('fetch', symbol):
+        ...
+    show_chart(st, fig, 'analysis')                # render + payload bytes
+    render_panel(recorder, st.sidebar)             # end of the script
+
+Stages are grouped by category (import, fetch, compute, figure, serialize,
+render) with a label for the call inside it. Turned off, which is the default unless
+CHART_PROFILE=1, stage() is a no-op and nothing is recorded. The recent
+reruns of a session are kept and can be downloaded as JSON.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get('CHART_PROFILE', '') not in ('', '0')
+CATEGORIES = ['import', 'fetch', 'compute', 'figure', 'serialize', 'render']
+KEEP_RUNS = 50
+
+# Streamlit runs every session's script in its own thread
+_local = threading.local()
+
+
+class Run:
+    """Stage timings and payload sizes of one rerun"""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.total = None
+        self.stages = []     # (category, label, seconds)
+        self.payload = {}    # chart -> JSON bytes
+
+    def add(self, category, label, seconds):
+        self.stages.append((category, label, seconds))
+
+    def finish(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self._t0
+
+    def by_category(self):
+        totals = dict.fromkeys(CATEGORIES, 0.0)
+        for category, _, seconds in self.stages:
+            totals[category] = totals.get(category, 0.0) + seconds
+        return totals
+
+    def to_dict(self):
+        return {
+            'page': self.page,
+            'started': self.started,
+            'total': self.total,
+            'categories': self.by_category(),
+            'stages': [{'category': c, 'label': l, 'seconds': s} for c, l, s in self.stages],
+            'payload_bytes': dict(self.payload),
+        }
+
+
+class Recorder:
+    """The recent reruns of one session"""
+
+    def __init__(self, keep=KEEP_RUNS):
+        self.runs = deque(maxlen=keep)
+
+    def start(self, page, enabled=ENABLED):
+        """Begin a rerun's record, or switch recording off for this rerun"""
+        run = Run(page) if enabled else None
+        _local.run = run
+        if run is not None:
+            self.runs.append(run)
+        return run
+
+    @property
+    def current(self):
+        return getattr(_local, 'run', None)
+
+    def finish(self):
+        run = self.current
+        if run is not None:
+            run.finish()
+        _local.run = None
+        return run
+
+    def summary(self):
+        """Per-stage count, mean, median and max seconds over the kept reruns"""
+        import pandas as pd   # not loaded by the entry scripts until a page needs it
+
+        rows = [(c, l, s) for run in self.runs for c, l, s in run.stages]
+        if not rows:
+            return pd.DataFrame(columns=['category', 'label', 'count', 'mean', 'median', 'max'])
+        df = pd.DataFrame(rows, columns=['category', 'label', 'seconds'])
+        summary = df.groupby(['category', 'label'], sort=False)['seconds'].agg(
+            ['count', 'mean', 'median', 'max'])
+        return summary.reset_index()
+
+    def to_json(self):
+        return json.dumps([run.to_dict() for run in self.runs], indent=1)
+
+
+def session_recorder(session_state):
+    """The Recorder kept in a Streamlit session"""
+    if 'profiling' not in session_state:
+        session_state['profiling'] = Recorder()
+    return session_state['profiling']
+
+
+def label(page):
+    """Add a page name to the current rerun (scripts with more than one page selector)"""
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        run.page = f"{run.page} / {page}"
+
+
+@contextmanager
+def stage(category, label=''):
+    """Time the block as `category` (fetch, compute, figure, ...) of the current rerun"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add(category, label, time.perf_counter() - t0)
+
+
+def show_chart(st, fig, name, **kwargs):
+    """st.plotly_chart, recording the figure's JSON size and the render time"""
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        # Measured separately: the size of what the browser is sent
+        with stage('serialize', name):
+            run.payload[name] = len(fig.to_json())
+    kwargs.setdefault('use_container_width', True)
+    with stage('render', name):
+        st.plotly_chart(fig, **kwargs)
+
+
+def render_panel(recorder, container, startup=None):
+    """Debug panel with this rerun's stages, the session summary and a JSON export
+
+    `startup` is a startup.report(): the process's page-module imports and
+    first-render time per page.
+    """
+    run = recorder.finish()
+    if run is None:
+        return
+    import pandas as pd
+
+    panel = container.expander("⏱ Debug Timings", expanded=True)
+    panel.metric("This rerun", f"{run.total * 1000:.0f} ms")
+    categories = run.by_category()
+    panel.dataframe(pd.DataFrame({'ms': [s * 1000 for s in categories.values()]},
+                                 index=list(categories)).round(1), use_container_width=True)
+    if run.payload:
+        panel.write("**Chart payloads:** " + ", ".join(
+            f"{name} {size / 1024:.0f} KB" for name, size in run.payload.items()))
+    if run.stages:
+        stages = pd.DataFrame(run.stages, columns=['category', 'label', 'seconds'])
+        stages['ms'] = (stages.pop('seconds') * 1000).round(2)
+        panel.dataframe(stages, use_container_width=True, hide_index=True)
+    summary = recorder.summary()
+    if len(recorder.runs) > 1 and not summary.empty:
+        panel.write(f"**Last {len(recorder.runs)} reruns**")
+        panel.dataframe(summary.round(4), use_container_width=True, hide_index=True)
+    if startup:
+        panel.write(f"**This process** (up {startup['uptime']:.0f} s)")
+        for title, times in (("first render", startup['first_renders']),
+                             ("import", startup['imports'])):
+            if times:
+                panel.dataframe(pd.DataFrame({f'{title} ms': [s * 1000 for s in times.values()]},
+                                             index=list(times)).round(1), use_container_width=True)
+        if startup['warmed']:
+            panel.write("**Warmed:** " + ", ".join(
+                f"{module} {f'{result:.1f} s' if isinstance(result, float) else result}"
+                for module, result in startup['warmed'].items()))
+    panel.download_button("Export JSON", recorder.to_json(),
+                          file_name='chart-timings.json', mime='application/json')
@@ -0,0 +1,307 @@
+"""Market data providers.
+
+Every provider answers the same calls:
+
+- history(symbol, interval='1d', period=None, start=None) -> OHLCV frame
+- ltp(symbols) -> {symbol: last price}
+
+YFinanceProvider and KiteProvider go to the network. ReplayProvider is
+offline: it serves bars recorded to CSV with record_history(), or generates
+them. Generated bars follow geometric Brownian motion on an NSE calendar
+(weekdays, 09:15-15:30 IST for intraday), have High/Low that contain Open
+and Close, and are deterministic: the path of a (symbol, interval, seed) is
+drawn from a fixed origin, so a bar has the same values whatever window is
+asked for. synthetic_ticks() produces KiteTicker-style messages at a given
+rate, so every compute path can be benchmarked offline at production volumes.
+
+CHART_PROVIDER=replay makes the cache and the backend use ReplayProvider.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_cache import _period_offset
+
+EXCHANGE_TZ = 'Asia/Kolkata'
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_MINUTES = 375
+TRADING_DAYS = 252
+
+# Minutes per intraday bar, and trading days per daily-or-longer bar
+INTRADAY = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+DAILY = {'1d': 1, '5d': 5, '1wk': 5, '1mo': 21, '3mo': 63}
+DAY_NS = 86_400 * 10 ** 9
+
+# Generated paths start here, so a bar's values don't depend on the window asked for
+ORIGIN = {'intraday': '2024-01-01', 'daily': '2000-01-03'}
+# Generated paths a ReplayProvider keeps, least recently used dropped first
+MAX_GENERATED = 256
+
+
+# ------ network providers ------
+
+class YFinanceProvider:
+    """Yahoo Finance bars and quotes"""
+
+    def history(self, symbol, interval='1d', period=None, start=None):
+        import yfinance as yf
+
+        if start is not None:
+            return yf.Ticker(symbol).history(interval=interval, start=start)
+        return yf.Ticker(symbol).history(interval=interval, period=period)
+
+    def ltp(self, symbols):
+        import yfinance as yf
+
+        return {symbol: yf.Ticker(symbol).fast_info['last_price'] for symbol in symbols}
+
+
+def kite_symbol(symbol):
+    """'INFY.NS' -> 'NSE:INFY', 'INFY.BO' -> 'BSE:INFY'; Kite symbols pass through"""
+    if ':' in symbol:
+        return symbol
+    if symbol.endswith('.NS'):
+        return f"NSE:{symbol[:-3]}"
+    if symbol.endswith('.BO'):
+        return f"BSE:{symbol[:-3]}"
+    return f"NSE:{symbol}"
+
+
+class KiteProvider:
+    """Zerodha Kite Connect: historical_data for bars, ltp for quotes"""
+
+    INTERVALS = {'1m': 'minute', '3m': '3minute', '5m': '5minute', '15m': '15minute',
+                 '30m': '30minute', '60m': '60minute', '1h': '60minute', '1d': 'day'}
+
+    def __init__(self, kite):
+        self.kite = kite
+        self._tokens = {}
+
+    def _token(self, symbol):
+        token = self._tokens.get(symbol)
+        if token is None:
+            token = self.kite.ltp([symbol])[symbol]['instrument_token']
+            self._tokens[symbol] = token
+        return token
+
+    def history(self, symbol, interval='1d', period=None, start=None):
+        symbol = kite_symbol(symbol)
+        end = pd.Timestamp.now(tz=EXCHANGE_TZ)
+        start = pd.Timestamp(start) if start is not None else end - _period_offset(period or '1mo', end)
+        rows = self.kite.historical_data(self._token(symbol), start.to_pydatetime(), end.to_pydatetime(),
+                                         self.INTERVALS[interval])
+        df = pd.DataFrame(rows, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+        df = df.rename(columns=str.title).set_index('Date')
+        df.index = pd.DatetimeIndex(df.index)
+        return df
+
+    def ltp(self, symbols):
+        data = self.kite.ltp([kite_symbol(s) for s in symbols])
+        return {s: data[kite_symbol(s)]['last_price'] for s in symbols if kite_symbol(s) in data}
+
+
+# ------ offline replay ------
+
+def _generator(symbol, seed):
+    return np.random.Generator(np.random.Philox(key=zlib.crc32(symbol.encode()) + (seed << 32)))
+
+
+def bar_index(interval, start, end):
+    """Bar opening times between `start` and `end` on the exchange calendar"""
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    start = start.tz_localize(EXCHANGE_TZ) if start.tzinfo is None else start.tz_convert(EXCHANGE_TZ)
+    end = end.tz_localize(EXCHANGE_TZ) if end.tzinfo is None else end.tz_convert(EXCHANGE_TZ)
+    # Epoch day numbers; pandas business-day ranges are built one date at a time
+    days = np.arange(start.tz_localize(None).value // DAY_NS, end.tz_localize(None).value // DAY_NS + 1)
+    weekday = (days + 3) % 7   # 1970-01-01 was a Thursday
+    if interval in ('1d', '5d'):
+        days = days[weekday < 5][::DAILY[interval]]
+    elif interval == '1wk':
+        days = days[weekday == 0]
+    elif interval in ('1mo', '3mo'):
+        months = np.unique(days.astype('M8[D]').astype('M8[M]'))
+        if interval == '3mo':
+            months = months[months.astype(np.int64) % 3 == 0]
+        days = months.astype('M8[D]').astype(np.int64)
+    else:
+        days = days[weekday < 5]
+    if interval in DAILY:
+        index = pd.DatetimeIndex((days * DAY_NS).view('M8[ns]')).tz_localize(EXCHANGE_TZ)
+        return index[index >= start.normalize()]
+    step = INTRADAY[interval]
+    offsets = SESSION_OPEN.value + np.arange(0, SESSION_MINUTES, step) * 60 * 10 ** 9
+    stamps = (days[:, None] * DAY_NS + offsets[None, :]).ravel()
+    index = pd.DatetimeIndex(stamps.view('M8[ns]')).tz_localize(EXCHANGE_TZ)
+    return index[(index >= start) & (index <= end)]
+
+
+def gbm_ohlcv(n, rng, price=1000.0, drift=0.05, volatility=0.25, bars_per_year=TRADING_DAYS,
+              volume=500_000):
+    """`n` consecutive GBM bars; row i only uses draws 4i..4i+3, so a longer path extends a shorter one"""
+    dt = 1.0 / bars_per_year
+    z = rng.standard_normal((n, 4))
+    step = volatility * np.sqrt(dt)
+    log_close = np.log(price) + np.cumsum((drift - volatility ** 2 / 2) * dt + step * z[:, 0])
+    close = np.exp(log_close)
+    open_ = np.empty(n)
+    open_[0] = price
+    open_[1:] = close[:-1]
+    # Wicks beyond the body, scaled to the bar's volatility
+    high = np.maximum(open_, close) * np.exp(np.abs(z[:, 1]) * step * 0.5)
+    low = np.minimum(open_, close) * np.exp(-np.abs(z[:, 2]) * step * 0.5)
+    # Busier bars on bigger moves
+    size = volume * np.exp(0.4 * z[:, 3]) * (1 + np.abs(z[:, 0]))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': size.astype(np.int64)})
+
+
+class ReplayProvider:
+    """Offline bars and quotes: recorded CSVs under `path`, else generated GBM"""
+
+    def __init__(self, path=None, seed=0, drift=0.05, volatility=0.25, end=None, origin=None):
+        self.path = path
+        self.seed = seed
+        self.drift = drift
+        self.volatility = volatility
+        self.end = end
+        self.origin = origin or ORIGIN
+        # (symbol, interval) -> (last moment covered, bars); the seed is the provider's
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recorded(self, symbol, interval):
+        if self.path is None:
+            return None
+        file = os.path.join(self.path, f"{_safe(symbol)}@{interval}.csv")
+        if not os.path.exists(file):
+            return None
+        df = pd.read_csv(file, index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True).tz_convert(EXCHANGE_TZ)
+        return df
+
+    def _path(self, symbol, interval, end):
+        """Generated bars through `end`, generated once per exchange day and reused"""
+        key = (symbol, interval)
+        with self._lock:
+            cached = self._paths.get(key)
+            if cached is not None and end <= cached[0]:
+                self._paths.move_to_end(key)
+                return cached[1]
+        # Up to the end of the exchange day, so a clock-driven `end` keeps hitting it;
+        # a longer path extends a shorter one, so bars before `end` are the same
+        covered = end.tz_convert(EXCHANGE_TZ).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1)
+        df = self._generated(symbol, interval, covered)
+        with self._lock:
+            self._paths[key] = (covered, df)
+            self._paths.move_to_end(key)
+            while len(self._paths) > MAX_GENERATED:
+                self._paths.popitem(last=False)
+        return df
+
+    def _generated(self, symbol, interval, end):
+        kind = 'daily' if interval in DAILY else 'intraday'
+        index = bar_index(interval, self.origin[kind], end)
+        if interval in DAILY:
+            per_year = TRADING_DAYS / DAILY[interval]
+        else:
+            per_year = TRADING_DAYS * -(-SESSION_MINUTES // INTRADAY[interval])
+        rng = _generator(f"{symbol}@{interval}", self.seed)
+        price = 50 * np.exp(rng.uniform(0, 4))   # 50 to ~2700, fixed per symbol
+        df = gbm_ohlcv(len(index), rng, price, self.drift, self.volatility, per_year)
+        df.index = index
+        return df
+
+    def _bars(self, symbol, interval):
+        end = pd.Timestamp(self.end if self.end is not None else time.time(), unit='s', tz='UTC')
+        df = self._recorded(symbol, interval)
+        if df is None:
+            df = self._path(symbol, interval, end)
+        return df, end
+
+    def history(self, symbol, interval='1d', period=None, start=None):
+        df, end = self._bars(symbol, interval)
+        df = df[df.index <= end]
+        if start is None:
+            start = end - _period_offset(period or '1mo', end)
+        start = pd.Timestamp(start)
+        if start.tzinfo is None:
+            start = start.tz_localize(EXCHANGE_TZ)
+        return df[df.index >= start]
+
+    def ltp(self, symbols):
+        prices = {}
+        for symbol in symbols:
+            # The last daily close up to now, without slicing a window
+            df, end = self._bars(symbol, '1d')
+            last = df.index.searchsorted(end, side='right') - 1
+            if last >= 0:
+                prices[symbol] = float(df['Close'].iloc[last])
+        return prices
+
+    def ticks(self, n, instruments=500, per_message=100, rate=2000, start=None):
+        """KiteTicker-style messages from this provider's seed"""
+        return synthetic_ticks(n, instruments, per_message, rate, seed=self.seed,
+                               volatility=self.volatility, start=start)
+
+
+def _safe(symbol):
+    return ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in symbol)
+
+
+def record_history(provider, symbols, path, interval='1d', period='1y'):
+    """Save bars from any provider as CSVs a ReplayProvider(path) serves offline"""
+    os.makedirs(path, exist_ok=True)
+    for symbol in symbols:
+        df = provider.history(symbol, interval=interval, period=period)
+        df[['Open', 'High', 'Low', 'Close', 'Volume']].to_csv(
+            os.path.join(path, f"{_safe(symbol)}@{interval}.csv"))
+
+
+def synthetic_ticks(n, instruments=500, per_message=100, rate=2000, seed=7, volatility=0.25,
+                    start=1_700_000_000):
+    """`n` ticks at `rate` ticks/s over `instruments`, each instrument on its own GBM path"""
+    rng = np.random.default_rng(seed)
+    start = time.time() if start is None else start
+    tokens = rng.integers(0, instruments, n)
+    ts = start + np.arange(n) / rate
+    # Per-tick volatility: a tick is about instruments / rate seconds of trading
+    step = volatility * np.sqrt(instruments / rate / (TRADING_DAYS * SESSION_MINUTES * 60))
+    moves = rng.normal(0, step, n)
+    quantities = rng.integers(1, 100, n)
+    # Cumulative sums per instrument, in tick order
+    order = np.argsort(tokens, kind='stable')
+    boundaries = np.flatnonzero(np.diff(tokens[order])) + 1
+    log_price = np.empty(n)
+    day_volume = np.empty(n, dtype=np.int64)
+    for group in np.split(order, boundaries):
+        log_price[group] = np.cumsum(moves[group])
+        day_volume[group] = np.cumsum(quantities[group])
+    base = 100 + np.arange(instruments) * 10.0
+    price = (base[tokens] * np.exp(log_price)).round(2)
+
+    messages = []
+    for i in range(0, n, per_message):
+        messages.append([{'instrument_token': token, 'last_price': p, 'last_quantity': q,
+                          'volume_traded': v, 'exchange_timestamp': t}
+                         for token, p, q, v, t in zip(tokens[i:i + per_message].tolist(),
+                                                      price[i:i + per_message].tolist(),
+                                                      quantities[i:i + per_message].tolist(),
+                                                      day_volume[i:i + per_message].tolist(),
+                                                      ts[i:i + per_message].tolist())])
+    return messages
+
+
+def get_provider(name=None):
+    """Provider named by `name` or $CHART_PROVIDER: 'yfinance' (default) or 'replay'"""
+    name = name or os.environ.get('CHART_PROVIDER', 'yfinance')
+    if name == 'replay':
+        return ReplayProvider(path=os.environ.get('CHART_REPLAY_DIR'))
+    if name == 'yfinance':
+        return YFinanceProvider()
+    raise ValueError(f"Unknown provider: {name}")
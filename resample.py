@@ -0,0 +1,288 @@
+"""Higher-timeframe bars derived locally from one base series.
+
+A Resampler holds the base bars (say 5m) and builds 15m, 1h, 1d or 1w bars
+from them on request. A timeframe is built once with segment reductions
+over the sorted base: each bar's label is computed for every base bar, the
+label changes give the segment starts, and open/high/low/close/volume are a
+take, np.maximum.reduceat, np.minimum.reduceat, a take and np.add.reduceat.
+Built timeframes stay cached; when base bars arrive only the last (still
+open) higher-timeframe bar and the new ones are recomputed, so switching
+timeframe or extending a live series never goes back to the network.
+
+Intraday bars are anchored at the 09:15 session open like the exchange's
+own (09:15, 10:15, ... for 1h); weeks start on Monday.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+MINUTE_NS = 60 * 10 ** 9
+DAY_NS = 1440 * MINUTE_NS
+SESSION_OPEN_NS = (9 * 60 + 15) * MINUTE_NS
+
+# Bar width in minutes; '1d' and '1w' are calendar bins
+TIMEFRAMES = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '1h': 60, '1d': 1440, '1w': 7 * 1440}
+ALIASES = {'60m': '1h', '1wk': '1w'}
+
+
+def timeframe_name(interval):
+    """Canonical timeframe name for a yfinance/Kite-style interval"""
+    name = ALIASES.get(interval, interval)
+    if name not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {interval}")
+    return name
+
+
+def timeframes_for(base_interval):
+    """Timeframes that can be built from bars of `base_interval`"""
+    base = TIMEFRAMES[timeframe_name(base_interval)]
+    return [name for name, width in TIMEFRAMES.items()
+            if width >= base and (width % base == 0 or width >= 1440)]
+
+
+def bar_labels(wall_ns, timeframe):
+    """Opening time (wall-clock ns) of the `timeframe` bar each timestamp falls in"""
+    width = TIMEFRAMES[timeframe_name(timeframe)]
+    day = wall_ns // DAY_NS * DAY_NS
+    if width == 1440:
+        return day
+    if width == 7 * 1440:
+        weekday = (wall_ns // DAY_NS + 3) % 7   # 1970-01-01 was a Thursday
+        return day - weekday * DAY_NS
+    width *= MINUTE_NS
+    since_open = wall_ns - day - SESSION_OPEN_NS
+    return day + SESSION_OPEN_NS + since_open // width * width
+
+
+def reduce_segments(labels, open_, high, low, close, volume):
+    """Label, OHLCV and start position of each run of equal labels in sorted input"""
+    starts = np.flatnonzero(np.diff(labels)) + 1
+    starts = np.concatenate(([0], starts)) if len(labels) else starts
+    ends = np.append(starts[1:], len(labels)) - 1
+    return (labels[starts], open_[starts], np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts), close[ends], np.add.reduceat(volume, starts), starts)
+
+
+def _wall(index):
+    """Wall-clock int64 ns of a DatetimeIndex (the exchange's local time)"""
+    index = pd.DatetimeIndex(index).as_unit('ns')
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8
+
+
+def resample(df, timeframe):
+    """One-shot resample of an OHLCV frame"""
+    resampler = Resampler.from_frame(df)
+    return resampler.bars(timeframe)
+
+
+class _Columns:
+    """Growable time + OHLCV arrays (amortized O(1) appends)"""
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.time = np.empty(capacity, dtype=np.int64)
+        self.data = {name: np.empty(capacity) for name in OHLCV}
+
+    def truncate(self, n):
+        self.n = n
+
+    def append(self, time, columns):
+        end = self.n + len(time)
+        if end > len(self.time):
+            capacity = max(end, 2 * len(self.time))
+            self.time = np.resize(self.time, capacity)
+            self.data = {name: np.resize(values, capacity) for name, values in self.data.items()}
+        self.time[self.n:end] = time
+        for name, values in zip(OHLCV, columns):
+            self.data[name][self.n:end] = values
+        self.n = end
+
+    def __getitem__(self, name):
+        if name == 'time':
+            return self.time[:self.n]
+        return self.data[name][:self.n]
+
+
+class Resampler:
+    """A base bar series and its cached higher-timeframe aggregates
+
+    r = Resampler.from_frame(get_history('INFY.NS', '60d', '5m'), '5m')
+    r.bars('1h')                 # built once, then cached
+    r.extend(new_5m_bars)        # updates the cached 1h bars incrementally
+    """
+
+    def __init__(self, base_interval='1m', tz=None):
+        self.base_interval = timeframe_name(base_interval)
+        self.tz = tz
+        self._base = _Columns()
+        # timeframe -> (aggregate columns, base position where its last bar starts,
+        #               base bars folded in so far)
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, base_interval='1m'):
+        tz = pd.DatetimeIndex(df.index).tz
+        resampler = cls(base_interval, str(tz) if tz is not None else None)
+        resampler.extend(df)
+        return resampler
+
+    def __len__(self):
+        return self._base.n
+
+    @property
+    def timeframes(self):
+        return timeframes_for(self.base_interval)
+
+    @property
+    def cached(self):
+        """Timeframes built so far"""
+        return list(self._aggregates)
+
+    # ------ base updates ------
+    def extend(self, df):
+        """Append base bars; a bar at the last timestamp replaces it (a live bar's update)"""
+        if len(df) == 0:
+            return
+        self.append(_wall(df.index), *(df[name].to_numpy(dtype=np.float64) for name in OHLCV))
+
+    def append(self, time, open_, high, low, close, volume):
+        """Append base bars given as wall-clock ns and OHLCV arrays"""
+        time = np.asarray(time, dtype=np.int64)
+        columns = [np.asarray(values, dtype=np.float64) for values in (open_, high, low, close, volume)]
+        with self._lock:
+            base = self._base
+            if base.n:
+                last = base.time[base.n - 1]
+                # Older bars are late; a bar at `last` is the current bar's newer state
+                keep = time >= last
+                time, columns = time[keep], [values[keep] for values in columns]
+                if len(time) and time[0] == last:
+                    base.truncate(base.n - 1)
+            if not len(time):
+                return
+            changed = base.n
+            base.append(time, columns)
+            for timeframe in self._aggregates:
+                self._update(timeframe, changed)
+
+    def append_bar(self, bar):
+        """A completed ticks.Bar of the base timeframe (start in epoch seconds)"""
+        ts = pd.Timestamp(bar.start, unit='s', tz='UTC')
+        wall = ts.tz_convert(self.tz).tz_localize(None) if self.tz else ts.tz_localize(None)
+        self.append([wall.value], [bar.open], [bar.high], [bar.low], [bar.close], [bar.volume])
+
+    def sync(self, df):
+        """Bring the base up to date with a freshly loaded frame of the same series
+
+        Newer bars are appended; a frame reaching further back than the base
+        (a longer period was asked for) rebuilds it.
+        """
+        if len(df) == 0:
+            return
+        time = _wall(df.index)
+        base = self._base
+        if base.n and time[0] >= base.time[0]:
+            self.extend(df.iloc[int(np.searchsorted(time, base.time[base.n - 1])):])
+            return
+        with self._lock:
+            self._base = _Columns(max(len(df), 1024))
+            built = list(self._aggregates)
+            self._aggregates = {}
+        self.extend(df)
+        with self._lock:
+            for timeframe in built:
+                self._update(timeframe)
+
+    # ------ aggregates ------
+    def _update(self, timeframe, changed=None):
+        """Fold base bars from `changed` on into the aggregate
+
+        New bars are reduced on their own and the first segment is merged
+        into the open aggregate bar. If a bar already folded in was replaced,
+        the open bar is rebuilt from its first base bar instead.
+        """
+        aggregate, position, done = self._aggregates.get(timeframe) or (_Columns(), 0, 0)
+        base = self._base
+        if changed is not None and changed < done:
+            if aggregate.n:
+                aggregate.truncate(aggregate.n - 1)
+            done = position
+        if done >= base.n:
+            self._aggregates[timeframe] = (aggregate, position, done)
+            return
+        tail = slice(done, base.n)
+        labels = bar_labels(base['time'][tail], timeframe)
+        time, *columns, starts = reduce_segments(labels, *(base[name][tail] for name in OHLCV))
+        merged = bool(aggregate.n) and time[0] == aggregate.time[aggregate.n - 1]
+        if merged:
+            last, data = aggregate.n - 1, aggregate.data
+            _, high, low, close, volume = (values[0] for values in columns)
+            data['High'][last] = np.maximum(data['High'][last], high)
+            data['Low'][last] = np.minimum(data['Low'][last], low)
+            data['Close'][last] = close
+            data['Volume'][last] += volume
+            time, columns = time[1:], [values[1:] for values in columns]
+        aggregate.append(time, columns)
+        if not (merged and len(starts) == 1):
+            position = done + int(starts[-1])
+        self._aggregates[timeframe] = (aggregate, position, base.n)
+
+    def bars(self, timeframe, start=None):
+        """`timeframe` bars as a DataFrame, from the bar containing `start` if given"""
+        timeframe = timeframe_name(timeframe)
+        if timeframe not in self.timeframes:
+            raise ValueError(f"Can't build {timeframe} bars from {self.base_interval} bars")
+        with self._lock:
+            if timeframe == self.base_interval:
+                columns = self._base
+            else:
+                if timeframe not in self._aggregates:
+                    self._update(timeframe)
+                columns = self._aggregates[timeframe][0]
+            time = columns['time']
+            lo = 0
+            if start is not None:
+                first = bar_labels(_wall(pd.DatetimeIndex([start])), timeframe)[0]
+                lo = int(np.searchsorted(time, first))
+            data = {name: columns[name][lo:].copy() for name in OHLCV}
+            index = pd.DatetimeIndex(time[lo:].copy().view('M8[ns]'))
+        if np.isfinite(data['Volume']).all():
+            data['Volume'] = data['Volume'].astype(np.int64)
+        if self.tz:
+            index = index.tz_localize(self.tz)
+        return pd.DataFrame(data, index=index)
+
+
+_resamplers = {}
+_resamplers_lock = threading.Lock()
+
+
+def get_resampler(symbol, base_interval):
+    """Process-wide Resampler for (symbol, base interval), shared by every session"""
+    key = (symbol, timeframe_name(base_interval))
+    with _resamplers_lock:
+        resampler = _resamplers.get(key)
+        if resampler is None:
+            resampler = _resamplers[key] = Resampler(base_interval)
+        return resampler
+
+
+def timeframe_bars(symbol, df, base_interval, timeframe, start=None):
+    """`timeframe` bars of `symbol` from its freshly loaded base frame `df`
+
+    The shared resampler is synced with `df` (usually a no-op or a few new
+    bars) and the bars from `start` (default: the frame's first bar) on are
+    returned.
+    """
+    if len(df) == 0:
+        return df
+    resampler = get_resampler(symbol, base_interval)
+    if resampler.tz is None and pd.DatetimeIndex(df.index).tz is not None:
+        resampler.tz = str(df.index.tz)
+    resampler.sync(df)
+    return resampler.bars(timeframe, start=df.index[0] if start is None else start)
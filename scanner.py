@@ -0,0 +1,168 @@
+"""Technical scanner: RSI / volume filters across a stock universe.
+
+Symbols are scanned in chunks on a process pool. Each chunk loads its bars
+from the OHLCV cache into (symbols x bars) matrices and evaluates the
+criteria for the whole chunk at once; matches are yielded as chunks finish.
+The pool is started once per process and reused by every scan, since a
+worker's start (importing pandas and NumPy) costs more than a chunk.
+Universes of up to IN_PROCESS_MAX symbols, or any universe on a single
+core, are scanned in the caller's process instead.
+"""
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from indicators import rsi_2d, sma_2d
+
+# Used when no NIFTY 500 constituents file is available
+NIFTY_50 = [
+    'ADANIENT', 'ADANIPORTS', 'APOLLOHOSP', 'ASIANPAINT', 'AXISBANK',
+    'BAJAJ-AUTO', 'BAJFINANCE', 'BAJAJFINSV', 'BEL', 'BPCL',
+    'BHARTIARTL', 'BRITANNIA', 'CIPLA', 'COALINDIA', 'DRREDDY',
+    'EICHERMOT', 'GRASIM', 'HCLTECH', 'HDFCBANK', 'HDFCLIFE',
+    'HEROMOTOCO', 'HINDALCO', 'HINDUNILVR', 'ICICIBANK', 'INDUSINDBK',
+    'INFY', 'ITC', 'JSWSTEEL', 'KOTAKBANK', 'LT',
+    'M&M', 'MARUTI', 'NESTLEIND', 'NTPC', 'ONGC',
+    'POWERGRID', 'RELIANCE', 'SBILIFE', 'SBIN', 'SHRIRAMFIN',
+    'SUNPHARMA', 'TATACONSUM', 'TATAMOTORS', 'TATASTEEL', 'TCS',
+    'TECHM', 'TITAN', 'TRENT', 'ULTRACEMCO', 'WIPRO',
+]
+
+RSI_WINDOW = 14
+VOLUME_WINDOW = 20
+LOOKBACK = 100
+# Below this, starting to use the pool costs more than it saves
+IN_PROCESS_MAX = 100
+
+ScanChunk = namedtuple('ScanChunk', ['matches', 'scanned', 'errors'])
+
+MATCH_COLUMNS = ['Symbol', 'Close', 'Change %', 'RSI', 'Volume Ratio']
+
+
+def load_universe(path=None):
+    """Yahoo symbols of the scan universe
+
+    Reads NSE's index constituents CSV (e.g. ind_nifty500list.csv, with a
+    `Symbol` column) from `path` or $NIFTY500_CSV, else falls back to NIFTY 50.
+    """
+    path = path or os.environ.get('NIFTY500_CSV')
+    if path and os.path.exists(path):
+        symbols = pd.read_csv(path)['Symbol'].dropna().astype(str).str.strip()
+    else:
+        symbols = NIFTY_50
+    return [f"{symbol}.NS" for symbol in symbols]
+
+
+def build_matrix(frames, lookback=LOOKBACK):
+    """Stack the last `lookback` bars of each frame into close/volume matrices
+
+    Shorter histories are right-aligned and padded with their first bar
+    (a flat price adds no RSI movement); `bars` holds each row's real length.
+    """
+    n = len(frames)
+    close = np.empty((n, lookback))
+    volume = np.empty((n, lookback))
+    bars = np.empty(n, dtype=np.int64)
+    for row, df in enumerate(frames):
+        c = df['Close'].to_numpy()[-lookback:]
+        v = df['Volume'].to_numpy()[-lookback:]
+        k = len(c)
+        bars[row] = k
+        close[row, lookback - k:] = c
+        volume[row, lookback - k:] = v
+        close[row, :lookback - k] = c[0]
+        volume[row, :lookback - k] = v[0]
+    return close, volume, bars
+
+
+def evaluate(close, volume, bars, rsi_min, rsi_max, volume_multiplier):
+    """Boolean match mask plus the per-symbol metrics it was based on"""
+    rsi = rsi_2d(close, RSI_WINDOW)[:, -1]
+    volume_sma = sma_2d(volume, VOLUME_WINDOW)[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = volume[:, -1] / volume_sma
+        change_pct = (close[:, -1] / close[:, -2] - 1) * 100
+    enough = bars > max(RSI_WINDOW, VOLUME_WINDOW)
+    mask = (enough & (rsi >= rsi_min) & (rsi <= rsi_max) &
+            (volume_ratio >= volume_multiplier))
+    return mask, rsi, volume_ratio, change_pct
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_root):
+    global _worker_cache
+    from data_cache import OHLCVCache
+
+    _worker_cache = OHLCVCache(root=cache_root)
+
+
+def _scan_chunk(symbols, criteria, period, cache=None):
+    """Worker: load one chunk of symbols and return (match rows, scanned, errors)"""
+    cache = cache or _worker_cache
+    loaded, frames, errors = [], [], {}
+    for symbol in symbols:
+        try:
+            df = cache.history(symbol, period=period)
+        except Exception as e:
+            errors[symbol] = str(e)
+            continue
+        if len(df) < 2:
+            errors[symbol] = 'not enough data'
+            continue
+        loaded.append(symbol)
+        frames.append(df)
+
+    rows = []
+    if frames:
+        close, volume, bars = build_matrix(frames)
+        mask, rsi, volume_ratio, change_pct = evaluate(close, volume, bars, **criteria)
+        for i in np.flatnonzero(mask):
+            rows.append((loaded[i], close[i, -1], change_pct[i], rsi[i], volume_ratio[i]))
+    return rows, len(symbols), errors
+
+
+_pools = {}   # (cache root, max_workers) -> ProcessPoolExecutor kept for the process
+_pools_lock = threading.Lock()
+
+
+def _get_pool(cache_root, max_workers):
+    key = (cache_root, max_workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or getattr(pool, '_broken', False):
+            pool = _pools[key] = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                                     initargs=(cache_root,))
+        return pool
+
+
+def scan_universe(symbols, rsi_min, rsi_max, volume_multiplier, period='6mo',
+                  chunk_size=50, max_workers=None, cache_root=None):
+    """Scan `symbols` on the process pool, yielding a ScanChunk as each chunk completes"""
+    from data_cache import OHLCVCache, get_cache
+
+    criteria = {'rsi_min': rsi_min, 'rsi_max': rsi_max, 'volume_multiplier': volume_multiplier}
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    workers = max_workers or os.cpu_count() or 1
+    if len(symbols) <= IN_PROCESS_MAX or workers < 2:
+        cache = OHLCVCache(root=cache_root) if cache_root else get_cache()
+        for chunk in chunks:
+            rows, scanned, errors = _scan_chunk(chunk, criteria, period, cache)
+            yield ScanChunk(pd.DataFrame(rows, columns=MATCH_COLUMNS), scanned, errors)
+        return
+
+    pool = _get_pool(cache_root or get_cache().root, workers)
+    futures = [pool.submit(_scan_chunk, chunk, criteria, period) for chunk in chunks]
+    try:
+        for future in as_completed(futures):
+            rows, scanned, errors = future.result()
+            yield ScanChunk(pd.DataFrame(rows, columns=MATCH_COLUMNS), scanned, errors)
+    finally:
+        # A scan abandoned by its session (rerun) doesn't keep the workers busy
+        for future in futures:
+            future.cancel()
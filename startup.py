@@ -0,0 +1,97 @@
+"""Lazy page loading and process-level warm-up for the Streamlit entry points.
+
+The entry scripts only import streamlit, profiling and this module. A page
+lives in a page module (market_pages, varsity_pages) that is imported the
+first time one of its pages is shown, so the Learning Center never loads
+pandas or Plotly and a fresh container serves its first page sooner:
+
+    startup.render(st, 'market_pages', 'market_overview', page)
+    startup.warm_up(['market_pages', 'varsity_pages'])   # end of the script
+
+After the first render, warm_up() imports the other page modules and runs
+their warm() (index, breadth and default-stock data into the shared caches)
+in one background thread per process, so the next session's pages are hot.
+CHART_WARMUP=0 turns that off. Import and first-render times are kept per
+process and shown in the debug timings panel (see report()).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+from profiling import stage
+
+PROCESS_STARTED = time.time()
+WARMUP = os.environ.get('CHART_WARMUP', '1') not in ('', '0')
+
+IMPORTS = {}          # page module -> seconds its import took
+FIRST_RENDERS = {}    # page -> seconds of its first render in this process
+WARMED = {}           # page module -> seconds its warm() took, or the error
+
+_lock = threading.Lock()
+_warmer = None
+
+
+def load(module):
+    """Import a page module, timing the import the first time
+
+    Always goes through import_module(): while the warm-up thread is still
+    importing a module, sys.modules already holds it half-initialized, and
+    the import lock makes a session wait for it to finish.
+    """
+    if module in sys.modules:
+        return importlib.import_module(module)
+    t0 = time.perf_counter()
+    with stage('import', module):
+        loaded = importlib.import_module(module)
+    with _lock:
+        IMPORTS.setdefault(module, time.perf_counter() - t0)
+    return loaded
+
+
+def render(st, module, function, page=None):
+    """Call `module.function(st)`, importing the page module on first use"""
+    t0 = time.perf_counter()
+    getattr(load(module), function)(st)
+    with _lock:
+        FIRST_RENDERS.setdefault(page or f"{module}.{function}", time.perf_counter() - t0)
+
+
+def _warm(modules):
+    for module in modules:
+        t0 = time.perf_counter()
+        try:
+            warm = getattr(load(module), 'warm', None)
+            if warm is not None:
+                warm()
+            result = time.perf_counter() - t0
+        except Exception as e:
+            # Offline or rate limited: the page fetches on demand instead
+            result = repr(e)
+        with _lock:
+            WARMED[module] = result
+
+
+def warm_up(modules, enabled=None):
+    """Warm the page modules' caches in a background thread, once per process"""
+    global _warmer
+    if not (WARMUP if enabled is None else enabled):
+        return None
+    with _lock:
+        if _warmer is None:
+            _warmer = threading.Thread(target=_warm, args=(list(modules),),
+                                       name='chart-warm-up', daemon=True)
+            _warmer.start()
+        return _warmer
+
+
+def report():
+    """Process uptime, page-module import times, first renders and warm-up results"""
+    with _lock:
+        return {
+            'uptime': time.time() - PROCESS_STARTED,
+            'imports': dict(IMPORTS),
+            'first_renders': dict(FIRST_RENDERS),
+            'warmed': dict(WARMED),
+        }
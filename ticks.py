@@ -0,0 +1,311 @@
+"""Live tick ingestion and bar aggregation.
+
+Ticks arrive as messages (lists of KiteTicker-style tick dicts) from a
+websocket or a replay file, go through a bounded queue, and are folded into
+1m/5m/15m OHLCV bars by a single consumer thread. Completed bars are pushed
+to subscribers, e.g. LiveSeries, which keeps recent bars and indicators per
+instrument for the charts. Batch subscribers (e.g. alerts.AlertEngine) get
+the bars each message or flush completed as one list, to process them
+vectorized.
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+import pandas as pd
+
+from indicators import IndicatorEngine, compute_indicators
+
+TIMEFRAMES = {'1m': 60, '5m': 300, '15m': 900}
+
+# start is the bar's opening time in epoch seconds
+Bar = namedtuple('Bar', ['token', 'timeframe', 'start', 'open', 'high', 'low', 'close', 'volume'])
+
+_STOP = object()
+
+
+def _timestamp(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class BarAggregator:
+    """Fold ticks of many instruments into OHLCV bars for several timeframes"""
+
+    def __init__(self, timeframes=('1m', '5m', '15m'), on_bar=None):
+        self.timeframes = [(name, TIMEFRAMES[name]) for name in timeframes]
+        self.on_bar = on_bar or (lambda bar: None)
+        # (token, timeframe) -> [start, open, high, low, close, volume]
+        self._bars = {}
+        # (token, timeframe) -> start of the last bar emitted; ticks up to it are late
+        self._emitted = {}
+        # token -> last cumulative day volume, to turn volume_traded into deltas
+        self._day_volume = {}
+        self.ticks = 0
+        self.late_ticks = 0
+        self.last_ts = float('-inf')   # latest exchange timestamp seen
+
+    def add_ticks(self, ticks):
+        for tick in ticks:
+            # KiteTicker sends last_traded_quantity; recorded and replay ticks last_quantity
+            quantity = tick.get('last_traded_quantity')
+            if quantity is None:
+                quantity = tick.get('last_quantity', 0)
+            self.add(tick['instrument_token'], _timestamp(tick.get('exchange_timestamp')),
+                     tick['last_price'], tick.get('volume_traded'), quantity)
+
+    def add(self, token, ts, price, day_volume=None, quantity=0):
+        """Add one trade; day_volume is the exchange's cumulative volume if known"""
+        self.ticks += 1
+        if ts > self.last_ts:
+            self.last_ts = ts
+        if day_volume is not None:
+            last = self._day_volume.get(token)
+            self._day_volume[token] = day_volume
+            volume = day_volume - last if last is not None and day_volume >= last else 0
+        else:
+            volume = quantity
+
+        for name, seconds in self.timeframes:
+            start = ts - ts % seconds
+            key = (token, name)
+            bar = self._bars.get(key)
+            if bar is None:
+                if start <= self._emitted.get(key, float('-inf')):
+                    # Its bar was already flushed
+                    self.late_ticks += 1
+                    continue
+                self._bars[key] = [start, price, price, price, price, volume]
+            elif start > bar[0]:
+                self._emit(token, name, bar)
+                self._bars[key] = [start, price, price, price, price, volume]
+            elif start < bar[0]:
+                self.late_ticks += 1
+            else:
+                if price > bar[2]:
+                    bar[2] = price
+                elif price < bar[3]:
+                    bar[3] = price
+                bar[4] = price
+                bar[5] += volume
+
+    def flush(self, now=None):
+        """Emit every bar whose period has ended by `now` (all open bars if None)
+
+        `now` is on the exchange clock, e.g. `last_ts`, so recorded ticks
+        replayed long after the fact aggregate the same as live ones.
+        """
+        for (token, name), bar in list(self._bars.items()):
+            if now is None or bar[0] + TIMEFRAMES[name] <= now:
+                self._emit(token, name, bar)
+                del self._bars[(token, name)]
+
+    def _emit(self, token, name, bar):
+        self._emitted[(token, name)] = bar[0]
+        self.on_bar(Bar(token, name, *bar))
+
+
+class TickPipeline:
+    """Bounded queue between a tick source and a BarAggregator
+
+    overflow='block' makes producers wait when the queue is full
+    (backpressure); overflow='drop' discards the oldest queued message
+    instead, which suits a websocket thread that must never block.
+    """
+
+    def __init__(self, timeframes=('1m', '5m', '15m'), maxsize=1000, overflow='block',
+                 flush_interval=1.0):
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflow = overflow
+        self.flush_interval = flush_interval
+        self.aggregator = BarAggregator(timeframes, on_bar=self._publish)
+        self.subscribers = []
+        self.batch_subscribers = []
+        self._completed = []    # bars completed since the last batch was published
+        self.dropped = 0
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Call `callback(bar)` for every completed bar"""
+        self.subscribers.append(callback)
+
+    def subscribe_batch(self, callback):
+        """Call `callback(bars)` with the bars completed by each message or flush"""
+        self.batch_subscribers.append(callback)
+
+    def _publish(self, bar):
+        for callback in self.subscribers:
+            callback(bar)
+        if self.batch_subscribers:
+            self._completed.append(bar)
+
+    def _publish_batch(self):
+        if self._completed:
+            bars, self._completed = self._completed, []
+            for callback in self.batch_subscribers:
+                callback(bars)
+
+    def put(self, ticks):
+        """Queue one message (a list of ticks)"""
+        if self.overflow == 'block':
+            self.queue.put(ticks)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(ticks)
+                return
+            except queue.Full:
+                try:
+                    self.dropped += len(self.queue.get_nowait())
+                except queue.Empty:
+                    pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='tick-pipeline', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        """Drain the queue, stop the consumer and optionally emit open bars"""
+        self.queue.put(_STOP)
+        self._thread.join()
+        if flush:
+            self.aggregator.flush()
+        self._publish_batch()
+
+    def run(self, source):
+        """Feed every message of `source` into the pipeline, then stop it"""
+        self.start()
+        for message in source:
+            self.put(message)
+        self.stop()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                ticks = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                ticks = None
+            if ticks is _STOP:
+                return
+            if ticks:
+                self.aggregator.add_ticks(ticks)
+            # Close bars on the exchange clock too, so quiet instruments still
+            # complete once any instrument has ticked past their period
+            if time.monotonic() >= next_flush:
+                self.aggregator.flush(self.aggregator.last_ts)
+                next_flush = time.monotonic() + self.flush_interval
+            self._publish_batch()
+
+
+class LiveSeries:
+    """Pipeline subscriber keeping recent bars and indicators per instrument"""
+
+    def __init__(self, max_bars=500):
+        self.max_bars = max_bars
+        self._bars = {}
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def seed(self, token, timeframe, df):
+        """Start an instrument from historical bars (OHLCV frame)"""
+        engine = IndicatorEngine.from_frame(df)
+        # The same values the engine would have produced bar by bar
+        history = compute_indicators(df)[IndicatorEngine.COLUMNS].tail(self.max_bars)
+        recent = df.tail(self.max_bars)
+        index = recent.index if isinstance(recent.index, pd.DatetimeIndex) else pd.DatetimeIndex(recent.index)
+        # Live bars are stamped in UTC; a naive history is taken as UTC
+        index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        rows = deque(maxlen=self.max_bars)
+        for ts, bar, values in zip(index, recent[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False),
+                                   history.to_dict('records')):
+            rows.append((ts, *bar, values))
+        with self._lock:
+            self._engines[(token, timeframe)] = engine
+            self._bars[(token, timeframe)] = rows
+
+    def __call__(self, bar):
+        key = (bar.token, bar.timeframe)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._engines[key] = IndicatorEngine()
+                self._bars[key] = deque(maxlen=self.max_bars)
+            values = engine.update({'Close': bar.close, 'Volume': bar.volume})
+            ts = pd.Timestamp(bar.start, unit='s', tz='UTC')
+            self._bars[key].append((ts, bar.open, bar.high, bar.low, bar.close, bar.volume, dict(values)))
+
+    def frame(self, token, timeframe='1m'):
+        """Recent bars with indicator columns, ready for the chart code"""
+        with self._lock:
+            rows = list(self._bars.get((token, timeframe), ()))
+        df = pd.DataFrame([r[1:6] for r in rows], columns=['Open', 'High', 'Low', 'Close', 'Volume'],
+                          index=pd.DatetimeIndex([r[0] for r in rows]))
+        indicators = pd.DataFrame([r[6] for r in rows], index=df.index, columns=IndicatorEngine.COLUMNS)
+        return df.join(indicators)
+
+
+class ReplaySource:
+    """Replay ticks recorded as JSON lines, one websocket message (list of ticks) per line
+
+    speed=None replays as fast as possible; speed=1.0 keeps the recorded pacing.
+    """
+
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+
+    def __iter__(self):
+        first_ts = started = None
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if isinstance(message, dict):
+                    message = [message]
+                if self.speed and message:
+                    ts = _timestamp(message[0].get('exchange_timestamp'))
+                    if first_ts is None:
+                        first_ts, started = ts, time.monotonic()
+                    delay = (ts - first_ts) / self.speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                yield message
+
+
+def record(messages, path):
+    """Write messages (lists of ticks) to a replay file"""
+    with open(path, 'w') as f:
+        for message in messages:
+            f.write(json.dumps(message, default=str) + '\n')
+
+
+def connect_kite_ticker(pipeline, api_key, access_token, tokens, mode='full'):
+    """Stream KiteTicker ticks for `tokens` into `pipeline`; returns the running ticker"""
+    from kiteconnect import KiteTicker
+
+    ticker = KiteTicker(api_key, access_token)
+
+    def on_connect(ws, response):
+        ws.subscribe(tokens)
+        ws.set_mode(getattr(ws, f"MODE_{mode.upper()}"), tokens)
+
+    def on_ticks(ws, ticks):
+        pipeline.put(ticks)
+
+    ticker.on_connect = on_connect
+    ticker.on_ticks = on_ticks
+    ticker.connect(threaded=True)
+    return ticker
@@ -0,0 +1,400 @@
+"""Pages of the Varsity Chart Analyzer (the second app in streamlit_app.py).
+
+Like market_pages, each page is a function of the `streamlit` module and
+this module is only imported once one of its pages is shown.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+from analysis_service import analysis_series
+from backtest import GRIDS, RULES
+from downsample import DEFAULT_WIDTH, chart_frame, chart_line, chart_volume, max_candles
+from indicators import IndicatorEngine
+from levels import DEFAULT_ORDER, DEFAULT_TOLERANCE, find_levels, nearest_levels
+from memo import fingerprint, memoize
+from patterns import identify_candlestick_patterns
+from profiling import show_chart, stage
+from volume_profile import calculate_volume_profile, value_area
+
+# The analysed stock lives in a shared, compact BarSeries (see barstore.py);
+# pages read a DataFrame built from it with the indicator columns they use
+ANALYSIS_COLUMNS = IndicatorEngine.COLUMNS + ['Support', 'Resistance']
+DEFAULT_SYMBOL = "RELIANCE.NS"
+
+
+def analysed_frame(series):
+    """Bars, indicators and rolling support/resistance of a BarSeries, memoized"""
+    return memoize('stock_frame', series.key(), lambda: series.to_frame(ANALYSIS_COLUMNS))
+
+
+def stock_frame(session_state):
+    """analysed_frame() of the session's analysed stock"""
+    with stage('compute', 'indicators'):
+        return analysed_frame(session_state.stock_data)
+
+
+def zoom_range(st, hist, key):
+    """(start, end) from a zoom slider above the chart; None when every bar fits unbucketed
+
+    Plotly's own zoom happens in the browser on the downsampled bars, so
+    zooming here re-buckets the visible bars at full chart width.
+    """
+    if len(hist) <= max_candles():
+        return None
+    dates = list(hist.index)
+    start, end = st.select_slider("Zoom", options=dates, value=(dates[0], dates[-1]),
+                                  format_func=lambda ts: ts.strftime('%Y-%m-%d %H:%M'), key=key)
+    if start == dates[0] and end == dates[-1]:
+        return None
+    return (start, end)
+
+
+# ------ figure builders (results are memoized per data fingerprint) ------
+
+def build_analysis_figure(hist, symbol, x_range=None):
+    """Candles with SMA 20/50 and Bollinger Bands"""
+    fig = go.Figure()
+    
+    # Candlestick
+    candles = chart_frame(hist, x_range=x_range)
+    fig.add_trace(go.Candlestick(
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
+        name="Price"
+    ))
+    
+    # Moving averages and Bollinger Bands
+    overlays = [
+        ('SMA_20', 'SMA 20', dict(color='orange')),
+        ('SMA_50', 'SMA 50', dict(color='red')),
+        ('BB_Upper', 'BB Upper', dict(color='gray', dash='dash')),
+        ('BB_Lower', 'BB Lower', dict(color='gray', dash='dash')),
+    ]
+    for column, name, style in overlays:
+        series = chart_line(hist[column], x_range=x_range)
+        fig.add_trace(go.Scatter(x=series.index, y=series, name=name, line=style))
+    
+    fig.update_layout(title=f"{symbol} - Technical Analysis",
+                    xaxis_rangeslider_visible=False)
+    return fig
+
+
+def build_volume_figure(hist):
+    """Volume bars with their 20-bar average"""
+    fig_volume = go.Figure()
+    # Bucketed bars show each bucket's total volume and the average scaled to match
+    volume = chart_volume(hist[['Volume', 'Volume_SMA']], width=DEFAULT_WIDTH // 2)
+    fig_volume.add_trace(go.Bar(x=volume.index, y=volume['Volume'], name='Volume', 
+                              marker_color='lightblue'))
+    fig_volume.add_trace(go.Scatter(x=volume.index, y=volume['Volume_SMA'], 
+                                  name='Volume SMA', line=dict(color='red')))
+    fig_volume.update_layout(title="Volume Analysis")
+    return fig_volume
+
+
+def build_profile_figure(volume_profile, poc, value_low, value_high):
+    """Horizontal volume profile with point of control and value area"""
+    fig_profile = go.Figure(go.Bar(
+        x=volume_profile['volume'],
+        y=volume_profile['price'],
+        orientation='h',
+        marker_color='lightgreen'
+    ))
+    # Value area (70% of volume) and point of control
+    fig_profile.add_hrect(y0=value_low, y1=value_high, fillcolor='lightblue', opacity=0.2,
+                          line_width=0, annotation_text="Value Area")
+    fig_profile.add_hline(y=poc, line_color='red', annotation_text=f"POC ₹{poc:.2f}")
+    fig_profile.update_layout(title="Volume Profile", 
+                            xaxis_title="Volume", 
+                            yaxis_title="Price Level")
+    return fig_profile
+
+
+def build_support_resistance_figure(hist, levels, x_range=None):
+    """Candles with the strongest pivot levels as horizontal lines"""
+    fig = go.Figure()
+    candles = chart_frame(hist, x_range=x_range)
+    fig.add_trace(go.Candlestick(
+        x=candles.index, open=candles['Open'], high=candles['High'], low=candles['Low'], close=candles['Close']
+    ))
+    current_price = hist['Close'].iloc[-1]
+    for level in levels.itertuples():
+        color = 'green' if level.price <= current_price else 'red'
+        fig.add_hline(y=level.price, line=dict(color=color, dash='dash'),
+                      annotation_text=f"{level.price:.2f} ({level.touches}x)")
+    fig.update_layout(title="Support & Resistance Levels")
+    return fig
+
+
+def analyze_volume_profile(hist, bins, distribute):
+    """Volume profile with its point of control and value area"""
+    volume_profile = calculate_volume_profile(hist, bins=bins, distribute=distribute)
+    return volume_profile, value_area(volume_profile)
+
+
+def stock_analysis(st):
+    st.header("📊 Comprehensive Stock Analysis")
+    
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        stock_symbol = st.text_input("NSE Symbol (e.g., RELIANCE.NS, TCS.NS):", DEFAULT_SYMBOL)
+        period = st.selectbox("Time Period", ["1mo", "3mo", "6mo", "1y", "2y"])
+        
+        if st.button("Analyze Stock"):
+            try:
+                # Get stock data with its indicators, from the shared analysis
+                # service if one is configured (see analysis_service.py)
+                with stage('fetch', stock_symbol):
+                    series = analysis_series(stock_symbol, period=period, indicators=ANALYSIS_COLUMNS)
+                
+                if len(series):
+                    st.session_state.stock_data = series
+                    st.session_state.stock_symbol = stock_symbol
+                    st.success("✅ Analysis Complete!")
+                
+            except Exception as e:
+                st.error(f"Error: {e}")
+    
+    with col2:
+        if 'stock_data' in st.session_state:
+            hist = stock_frame(st.session_state)
+            
+            # Current price metrics
+            current_price = hist['Close'][-1]
+            prev_price = hist['Close'][-2]
+            change = current_price - prev_price
+            change_pct = (change / prev_price) * 100
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Current Price", f"₹{current_price:.2f}")
+            with col2:
+                st.metric("Change", f"₹{change:.2f}", f"{change_pct:.2f}%")
+            with col3:
+                st.metric("RSI", f"{hist['RSI'][-1]:.1f}")
+            with col4:
+                volume_ratio = hist['Volume'][-1] / hist['Volume_SMA'][-1]
+                st.metric("Volume Ratio", f"{volume_ratio:.2f}x")
+            
+            # Main chart with indicators
+            symbol = st.session_state.stock_symbol
+            x_range = zoom_range(st, hist, 'analysis_zoom')
+            with stage('figure', 'analysis'):
+                fig = memoize('analysis_figure', fingerprint(hist, symbol, x_range),
+                              lambda: build_analysis_figure(hist, symbol, x_range))
+            show_chart(st, fig, 'analysis')
+
+
+def volume_analysis(st):
+    st.header("📈 Volume Analysis (Varsity Concept)")
+    
+    if 'stock_data' in st.session_state:
+        hist = stock_frame(st.session_state)
+        key = fingerprint(hist, st.session_state.stock_symbol)
+        
+        st.subheader("Volume-Price Relationship")
+        
+        profile_col1, profile_col2 = st.columns(2)
+        with profile_col1:
+            profile_bins = st.slider("Price Levels", 10, 100, 20)
+        with profile_col2:
+            spread_volume = st.checkbox("Spread each bar's volume across its High-Low range", value=True)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Volume chart
+            with stage('figure', 'volume'):
+                fig_volume = memoize('volume_figure', key, lambda: build_volume_figure(hist))
+            show_chart(st, fig_volume, 'volume')
+        
+        with col2:
+            # Volume profile
+            profile_key = key + (profile_bins, spread_volume)
+            with stage('compute', 'volume profile'):
+                volume_profile, (poc, value_low, value_high) = memoize(
+                    'volume_profile', profile_key,
+                    lambda: analyze_volume_profile(hist, profile_bins, spread_volume))
+            with stage('figure', 'volume profile'):
+                fig_profile = memoize('profile_figure', profile_key,
+                                      lambda: build_profile_figure(volume_profile, poc, value_low, value_high))
+            show_chart(st, fig_profile, 'volume profile')
+        
+        # Volume analysis insights
+        st.subheader("📋 Volume Insights (Varsity Principles)")
+        
+        current_volume = hist['Volume'][-1]
+        avg_volume = hist['Volume_SMA'][-1]
+        volume_ratio = current_volume / avg_volume
+        
+        if volume_ratio > 2:
+            st.success("**High Volume Alert**: Significant trading activity detected!")
+            st.write("**Varsity Tip**: High volume with price movement confirms trend strength")
+        elif volume_ratio < 0.5:
+            st.warning("**Low Volume**: Limited trading interest")
+            st.write("**Varsity Tip**: Low volume moves are less reliable")
+        
+        if hist['Close'][-1] > hist['Close'][-2] and volume_ratio > 1.5:
+            st.info("**Bullish Signal**: Price up with above-average volume")
+        elif hist['Close'][-1] < hist['Close'][-2] and volume_ratio > 1.5:
+            st.error("**Bearish Signal**: Price down with above-average volume")
+
+
+def support_resistance(st):
+    st.header("🛡️ Support & Resistance Levels")
+    
+    if 'stock_data' in st.session_state:
+        hist = stock_frame(st.session_state)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            order = st.slider("Pivot Width (bars each side)", 2, 20, DEFAULT_ORDER)
+        with col2:
+            tolerance = st.slider("Level Tolerance (%)", 0.2, 3.0, DEFAULT_TOLERANCE * 100, 0.1) / 100
+        with col3:
+            n_levels = st.slider("Levels Shown", 2, 12, 6)
+        
+        key = fingerprint(hist, st.session_state.stock_symbol, order, tolerance)
+        with stage('compute', 'levels'):
+            levels = memoize('levels', key, lambda: find_levels(hist, order=order, tolerance=tolerance))
+        
+        current_price = hist['Close'].iloc[-1]
+        support, resistance = nearest_levels(levels, current_price)
+        # Too little history for a pivot on one side: fall back to the rolling range
+        if np.isnan(support):
+            support = hist['Support'].iloc[-1]
+        if np.isnan(resistance):
+            resistance = hist['Resistance'].iloc[-1]
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Current Price", f"₹{current_price:.2f}")
+        with col2:
+            st.metric("Support Level", f"₹{support:.2f}")
+        with col3:
+            st.metric("Resistance Level", f"₹{resistance:.2f}")
+        
+        # Support/Resistance chart
+        x_range = zoom_range(st, hist, 'levels_zoom')
+        with stage('figure', 'support/resistance'):
+            fig = memoize('support_resistance_figure', key + (n_levels, x_range),
+                          lambda: build_support_resistance_figure(hist, levels.head(n_levels), x_range))
+        show_chart(st, fig, 'support/resistance')
+        
+        with st.expander("All Levels"):
+            st.dataframe(levels.drop(columns='last_touch').round(2), use_container_width=True)
+        
+        # Trading signals based on S/R
+        distance_to_resistance = resistance - current_price
+        distance_to_support = current_price - support
+        
+        st.subheader("📊 Trading Signals")
+        
+        if distance_to_resistance < current_price * 0.02:  # Within 2% of resistance
+            st.warning("**Near Resistance**: Consider taking profits or tightening stops")
+        elif distance_to_support < current_price * 0.02:  # Within 2% of support
+            st.info("**Near Support**: Potential buying opportunity if support holds")
+
+
+def candlestick_patterns(st):
+    st.header("🕯️ Candlestick Pattern Recognition")
+    
+    if 'stock_data' in st.session_state:
+        hist = stock_frame(st.session_state)
+        
+        with stage('compute', 'patterns'):
+            patterns = memoize('patterns', fingerprint(hist, st.session_state.stock_symbol),
+                               lambda: identify_candlestick_patterns(hist))
+        
+        st.subheader("Detected Patterns")
+        
+        if patterns:
+            for date, pattern, signal in patterns[-5:]:  # Show last 5 patterns
+                col1, col2, col3 = st.columns([2, 2, 1])
+                with col1:
+                    st.write(f"**{pattern}**")
+                with col2:
+                    st.write(date.strftime('%Y-%m-%d'))
+                with col3:
+                    st.write(signal)
+        else:
+            st.info("No significant candlestick patterns detected in recent data")
+        
+        # Candlestick pattern education
+        st.subheader("🎓 Varsity Candlestick Guide")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("""
+            **Bullish Patterns:**
+            - 🟢 **Bullish Engulfing**: Small red candle followed by large green candle
+            - 🟢 **Hammer**: Small body with long lower wick at bottom
+            - 🟢 **Morning Star**: Downtrend reversal pattern
+            - 🟢 **Three White Soldiers**: Three rising green candles
+            
+            **Trading View**: Look for confirmation with volume
+            """)
+        
+        with col2:
+            st.markdown("""
+            **Bearish Patterns:**
+            - 🔴 **Bearish Engulfing**: Small green candle followed by large red candle  
+            - 🔴 **Shooting Star**: Small body with long upper wick at top
+            - 🔴 **Evening Star**: Uptrend reversal pattern
+            - 🔴 **Three Black Crows**: Three falling red candles
+            
+            **Trading View**: Combine with resistance levels
+            """)
+
+
+def backtest(st):
+    st.header("🧪 Signal Backtest")
+    
+    if 'stock_data' in st.session_state:
+        hist = stock_frame(st.session_state)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            rule = st.selectbox("Signal Rule", ["rsi", "sr"],
+                                format_func=lambda r: {"rsi": "RSI + SMA (Analysis tab)",
+                                                       "sr": "Near Support/Resistance"}[r])
+        with col2:
+            cost_bps = st.number_input("Cost per side (bps)", 0.0, 100.0, 5.0, 1.0)
+        
+        key = fingerprint(hist, st.session_state.stock_symbol, rule, cost_bps)
+        with stage('compute', f"backtest {rule}"):
+            results = memoize('backtest', key, lambda: RULES[rule](hist, GRIDS[rule], cost_bps / 10000))
+        
+        # The thresholds the pages use today
+        if rule == "rsi":
+            current = results.query("rsi_buy == 30 and rsi_sell == 70 and sma_window == 20")
+        else:
+            current = results[np.isclose(results['proximity'], 0.02) & (results['order'] == DEFAULT_ORDER)]
+        row = current.iloc[0]
+        buy_hold = hist['Close'].iloc[-1] / hist['Close'].iloc[0] - 1
+        
+        st.subheader("Current Rule")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Return", f"{row['total_return']:.1%}", f"{row['total_return'] - buy_hold:.1%} vs hold")
+        with col2:
+            st.metric("Max Drawdown", f"{row['max_drawdown']:.1%}")
+        with col3:
+            st.metric("Trades", f"{int(row['trades'])}")
+        with col4:
+            st.metric("Hit Rate", "N/A" if np.isnan(row['hit_rate']) else f"{row['hit_rate']:.0%}")
+        
+        st.subheader(f"Best of {len(results):,} Parameter Combinations")
+        best = results[results['trades'] > 0].nlargest(10, 'total_return')
+        st.dataframe(best.round(4), use_container_width=True)
+        st.caption("In-sample: the best combinations are fitted to this history and will look better than they trade.")
+
+
+def warm(symbol=DEFAULT_SYMBOL, period="1mo"):
+    """Load and analyse the default stock so its first analysis is a cache hit"""
+    analysed_frame(analysis_series(symbol, period=period, indicators=ANALYSIS_COLUMNS))
@@ -0,0 +1,86 @@
+"""Volume profile: how much volume traded at each price level.
+
+Both modes are single vectorized passes, so months of minute or tick bars
+are fine:
+
+- close: each bar's volume goes to the bin of its close (np.histogram)
+- distribute: each bar's volume is spread evenly over its High-Low range,
+  using the piecewise-linear cumulative volume curve evaluated at the bin
+  edges (sorted lows/highs + searchsorted), O(n log n) instead of bars x bins
+"""
+import numpy as np
+import pandas as pd
+
+
+def _cumulative_volume(low, high, density, edges):
+    """Volume below each edge when bar i spreads `density` per price unit over [low, high]"""
+    order = np.argsort(low)
+    low_sorted = low[order]
+    d = density[order]
+    cum_d = np.concatenate(([0.0], np.cumsum(d)))
+    cum_dl = np.concatenate(([0.0], np.cumsum(d * low_sorted)))
+    k = np.searchsorted(low_sorted, edges, side='left')
+    below = edges * cum_d[k] - cum_dl[k]
+
+    order = np.argsort(high)
+    high_sorted = high[order]
+    d = density[order]
+    cum_d = np.concatenate(([0.0], np.cumsum(d)))
+    cum_dh = np.concatenate(([0.0], np.cumsum(d * high_sorted)))
+    k = np.searchsorted(high_sorted, edges, side='left')
+    # Bars entirely below the edge stop contributing above their high
+    return below - (edges * cum_d[k] - cum_dh[k])
+
+
+def calculate_volume_profile(df, bins=20, distribute=False):
+    """Calculate volume-based support/resistance
+
+    Returns a frame with the `price` (bin centre) and `volume` of each bin.
+    """
+    low = df['Low'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    volume = df['Volume'].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(low) | np.isnan(high) | np.isnan(close) | np.isnan(volume))
+    low, high, close, volume = low[valid], high[valid], close[valid], volume[valid]
+
+    if len(close) == 0:
+        return pd.DataFrame({'price': [], 'volume': []})
+    edges = np.linspace(low.min(), high.max(), bins + 1)
+
+    if not distribute:
+        profile, _ = np.histogram(close, bins=edges, weights=volume)
+    else:
+        spread = high > low
+        density = volume[spread] / (high[spread] - low[spread])
+        profile = np.diff(_cumulative_volume(low[spread], high[spread], density, edges))
+        # Bars with no range put all their volume at their close
+        flat, _ = np.histogram(close[~spread], bins=edges, weights=volume[~spread])
+        profile = np.maximum(profile, 0.0) + flat
+
+    return pd.DataFrame({'price': (edges[:-1] + edges[1:]) / 2, 'volume': profile})
+
+
+def value_area(profile, pct=0.7):
+    """Point of control and the (low, high) value area holding `pct` of the volume
+
+    Grows from the point of control one bin at a time towards the side with
+    more volume, as in the usual market-profile definition.
+    """
+    volume = profile['volume'].to_numpy()
+    price = profile['price'].to_numpy()
+    if len(volume) == 0 or volume.sum() == 0:
+        return np.nan, np.nan, np.nan
+    poc = int(np.argmax(volume))
+    lo = hi = poc
+    total, target = volume[poc], pct * volume.sum()
+    while total < target:
+        below = volume[lo - 1] if lo > 0 else -1.0
+        above = volume[hi + 1] if hi < len(volume) - 1 else -1.0
+        if above >= below:
+            hi += 1
+            total += above
+        else:
+            lo -= 1
+            total += below
+    return price[poc], price[lo], price[hi]